@@ -1,24 +1,49 @@
 from __future__ import annotations
 
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
 
-from .routers import auth, sync, metrics, matches, health
+from core.config import get_config
+from core.riot import aclose_async_pool
+from core.store import Store, close_pools
+
+from .cron.ingestor import start_ingestor
+from .cron.recompressor import start_recompressor
+from .cron.retention import start_retention
+from .cron.sweeper import start_sweeper
+from .responses import CodecJSONResponse
+from .routers import assets, auth, health, matches, metrics, sync
 from .routers import gis as gis_router
 from .routers import live as live_router
-from .routers import assets
-from .cron.sweeper import start_sweeper
-from .cron.ingestor import start_ingestor
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    # Apply pending schema migrations once, before the first request
+    store = Store()
+    # Opt-in one-off switch to incremental vacuum; a full VACUUM, so never from a cron
+    if (get_config().get("retention") or {}).get("convert_auto_vacuum"):
+        store.enable_incremental_vacuum()
+    yield
+    # Drain the shared Riot keep-alive pool and the pooled SQLite connections on shutdown
+    await aclose_async_pool()
+    close_pools()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="LoL Stat-Tracker", version="1.1.0")
+    # Every endpoint returns a JSON envelope; encode it with the shared codec
+    app = FastAPI(
+        title="LoL Stat-Tracker",
+        version="1.1.0",
+        lifespan=_lifespan,
+        default_response_class=CodecJSONResponse,
+    )
 
     app.add_middleware(
         CORSMiddleware,
@@ -40,7 +65,7 @@ def create_app() -> FastAPI:
 
     # WebSocket route for live under /ws defined in router module
     from .live.socket import register_ws
-    
+
     register_ws(app)
     # Background sweeper for precomputing advanced metrics (hourly, low-power)
     try:
@@ -53,11 +78,25 @@ def create_app() -> FastAPI:
         start_ingestor()
     except Exception:
         pass
+    # Background recompression of raw match/timeline payloads (resumable)
+    try:
+        start_recompressor()
+    except Exception:
+        pass
+    # Timeline retention: archive cold timelines, then shrink the DB (daily)
+    try:
+        start_retention()
+    except Exception:
+        pass
 
     # Global error handler → uniform envelope
     @app.exception_handler(Exception)
     async def on_error(request: Request, exc: Exception):
-        return JSONResponse({"ok": False, "error": {"code": "INTERNAL", "message": str(exc)}}, status_code=500, headers={"Cache-Control": "no-store"})
+        return CodecJSONResponse(
+            {"ok": False, "error": {"code": "INTERNAL", "message": str(exc)}},
+            status_code=500,
+            headers={"Cache-Control": "no-store"},
+        )
 
     # Add Cache-Control no-store for API responses
     @app.middleware("http")
@@ -3,13 +3,14 @@ from __future__ import annotations
 import threading
 import time
 
-from core.store import Store
-from core.metrics import ingest_and_compute_recent
-from core.riot import RiotClient
-from ..deps import config as get_cfg
+from core.config import roster_puuids
 from core.live import LiveClient
+from core.metrics import ingest_roster
+from core.riot import RiotClient
+from core.store import Store
 from core.windows import rebuild_windows
 
+from ..deps import config as get_cfg
 
 _STARTED = False
 _INTERVAL_SEC = 300  # 5 minutes
@@ -43,8 +44,8 @@ def _tick():
     except Exception:
         pass
     cfg = get_cfg()
-    puuid = (cfg.get("player", {}) or {}).get("puuid")
-    if not puuid:
+    puuids = roster_puuids(cfg)
+    if not puuids:
         return
     store = Store()
     try:
@@ -52,7 +53,7 @@ def _tick():
     except Exception:
         return
     # Ingest a tiny slice to catch fresh matches
-    n = ingest_and_compute_recent(rc, store, puuid, since="2h", count=5, queue_filter=None)
+    n = ingest_roster(rc, store, puuids, since="2h", count=5, queue_filter=None)
     if n > 0:
         try:
             rebuild_windows(store, cfg)
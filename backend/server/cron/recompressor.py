@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from core.compact import compact_frames_events, legacy_tables
+from core.live import LiveClient
+from core.store import Store
+
+_STARTED = False
+_INTERVAL_SEC = 6 * 3600  # new rows are already packed; this only catches stragglers
+_BATCHES_PER_TICK = 25    # 25 × 200 rows, then yield
+_PAUSE_SEC = 0.05
+
+
+def start_recompressor() -> None:
+    global _STARTED
+    if _STARTED:
+        return
+    _STARTED = True
+    th = threading.Thread(target=_loop, daemon=True)
+    th.start()
+
+
+def _loop():
+    # let the sweeper/ingestor startup work go first
+    time.sleep(60)
+    while True:
+        try:
+            while _tick():
+                pass
+        except Exception:
+            pass
+        time.sleep(_INTERVAL_SEC)
+
+
+def _tick() -> bool:
+    """Recompress (then move to segments) one slice of raw payloads.
+
+    True while there is more to do.
+    """
+    try:
+        if LiveClient().status().startswith("in_game"):
+            return False
+    except Exception:
+        pass
+    store = Store()
+    # One-off after the schema 9 upgrade: dedupe the keyless frames/events rows first
+    if legacy_tables(store):
+        compact_frames_events(store, max_batches=_BATCHES_PER_TICK)
+        return True
+    store.train_blob_dicts()
+    before = {t: store.get_meta(f"codec:recompress:{t}") for t in ("matches", "timelines")}
+    store.recompress_raw(max_batches=_BATCHES_PER_TICK, pause_s=_PAUSE_SEC)
+    after = {t: store.get_meta(f"codec:recompress:{t}") for t in ("matches", "timelines")}
+    if before != after:
+        return True
+    # Then move large pre-schema-11 rows out to the segment files
+    return not store.segment_raw(max_batches=_BATCHES_PER_TICK)["done"]
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Tuple
+
+from core.config import get_config
+from core.live import LiveClient
+from core.store import Store
+
+_STARTED = False
+_INTERVAL_SEC = 24 * 3600
+_BATCHES_PER_TICK = 10  # 10 × 100 timelines, then yield
+
+
+def start_retention() -> None:
+    global _STARTED
+    if _STARTED:
+        return
+    _STARTED = True
+    th = threading.Thread(target=_loop, daemon=True)
+    th.start()
+
+
+def _loop():
+    # after the recompressor's first pass
+    time.sleep(120)
+    while True:
+        try:
+            archived = 0
+            while True:
+                more, n = _tick()
+                archived += n
+                if not more:
+                    break
+            Store().compact_segments()
+            if archived:
+                while _vacuum():
+                    pass
+        except Exception:
+            pass
+        time.sleep(_INTERVAL_SEC)
+
+
+def _tick() -> Tuple[bool, int]:
+    """Archive one slice of cold timelines; (more to do, timelines archived)."""
+    try:
+        if LiveClient().status().startswith("in_game"):
+            return False, 0
+    except Exception:
+        pass
+    cfg = get_config()
+    ret = (cfg.get("retention") or {})
+    report = Store().archive_timelines(
+        keep_days=ret.get("timeline_days"),
+        keep_last=ret.get("timeline_keep_last"),
+        max_batches=_BATCHES_PER_TICK,
+        gis_queues=(cfg.get("gis") or {}).get("rankedQueues") or [420, 440],
+    )
+    return not report["done"], int(report["archived"])
+
+
+def _vacuum() -> bool:
+    """Return one slice of free pages to the filesystem; True while more are left.
+
+    Never converts the database: without auto_vacuum=INCREMENTAL this is a no-op
+    (see Store.enable_incremental_vacuum).
+    """
+    vac = Store().incremental_vacuum()
+    return bool(vac["freed_pages"]) and vac["freelist_pages"] > 0
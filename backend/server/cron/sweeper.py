@@ -1,16 +1,17 @@
 from __future__ import annotations
 
-import json
 import threading
 import time
 from typing import Any
 
-from core.store import Store
+from core.live import LiveClient
 from core.metrics_extras import compute_extras
+from core.schema import Match, Timeline
+from core.store import Store
+from core.timeline import ParsedTimeline
+
 from ..deps import config as get_cfg
 from ..ingest.ddragon import ensure_ddragon, load_items_json
-from core.live import LiveClient
-
 
 _STARTED = False
 _INTERVAL_SEC = 3600  # 1 hour
@@ -52,6 +53,11 @@ def _run_once():
         pass
 
     store = Store()
+    # Player rows stored before match_context (schema 12) existed
+    try:
+        store.backfill_match_context(max_batches=1)
+    except Exception:
+        pass
     ver = ensure_ddragon()
     items = load_items_json(ver)
     # Fetch a small batch of most recent matches missing extras
@@ -61,7 +67,7 @@ def _run_once():
             """
             SELECT m.match_id, m.raw_json, t.raw_json as timeline_raw
             FROM matches m
-            LEFT JOIN metrics_extras ex ON ex.match_id = m.match_id
+            LEFT JOIN metrics_extras ex ON ex.match_id = m.match_id AND ex.puuid = m.puuid
             LEFT JOIN timelines t ON t.match_id = m.match_id
             WHERE m.puuid=? AND ex.match_id IS NULL
             ORDER BY m.game_creation_ms DESC
@@ -80,10 +86,16 @@ def _run_once():
                     return
             except Exception:
                 pass
-            match = json.loads(r["raw_json"]) if r["raw_json"] else {}
-            timeline = json.loads(r["timeline_raw"]) if r["timeline_raw"] else {"info": {"frames": []}}
-            computed = compute_extras(match, timeline, items, puuid)
-            store.upsert_metrics_extras(r["match_id"], {"match_id": r["match_id"], **computed["extras_row"]})
+            match = store.loads_raw(r["raw_json"], {}, Match)
+            timeline = store.loads_raw(
+                r["timeline_raw"] or store.load_timeline_raw(r["match_id"]), None, Timeline
+            ) or {"info": {"frames": []}}
+            pt = ParsedTimeline.build(match, timeline)
+            store.use_match_context(r["match_id"], puuid, pt)
+            computed = compute_extras(match, timeline, items, puuid, parsed=pt)
+            store.upsert_metrics_extras(
+                r["match_id"], {"match_id": r["match_id"], **computed["extras_row"]}
+            )
         except Exception:
             # continue with next
             pass
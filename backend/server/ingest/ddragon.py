@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-import json
 import time
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 import httpx
 
+from core import codec
+
 ROOT = Path(__file__).resolve().parents[2]
 CACHE = ROOT / ".cache" / "ddragon"
 CACHE.mkdir(parents=True, exist_ok=True)
@@ -66,7 +67,7 @@ def champ_id_to_name(ver: str, champ_id: int) -> Optional[str]:
     p = d / "champion.json"
     if not p.exists():
         ensure_ddragon()
-    data = json.loads(p.read_text(encoding="utf-8"))
+    data = codec.json_loads(p.read_bytes())
     # map via 'key' -> 'id'
     for name, obj in data.get("data", {}).items():
         try:
@@ -83,7 +84,7 @@ def load_items_json(ver: str) -> Dict[str, Any]:
     if not p.exists():
         ensure_ddragon()
     try:
-        return json.loads(p.read_text(encoding="utf-8"))
+        return codec.json_loads(p.read_bytes())
     except Exception:
         return {"data": {}}
 
@@ -94,7 +95,7 @@ def load_runes_json(ver: str) -> Dict[str, Any]:
     if not p.exists():
         ensure_ddragon()
     try:
-        return json.loads(p.read_text(encoding="utf-8"))
+        return codec.json_loads(p.read_bytes())
     except Exception:
         return {}
 
@@ -153,7 +154,7 @@ def spell_id_to_name(ver: str, spell_id: int) -> Optional[str]:
     p = d / "summoner.json"
     if not p.exists():
         ensure_ddragon()
-    data = json.loads(p.read_text(encoding="utf-8"))
+    data = codec.json_loads(p.read_bytes())
     for name, obj in data.get("data", {}).items():
         try:
             if int(obj.get("key")) == spell_id:
@@ -1,20 +1,22 @@
 from __future__ import annotations
 
-import json
 import asyncio
+import threading
 import time
 from typing import Any
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 
-from .poller import stream_live_payloads
-import threading
-from ..deps import config as get_cfg
-from core.store import Store
+from core import codec
+from core.config import roster_puuids
 from core.metrics import ingest_and_compute_recent
 from core.riot import RiotClient
+from core.store import Store
 from core.windows import rebuild_windows
 
+from ..deps import config as get_cfg
+from .poller import stream_live_payloads
+
 
 async def ws_live_endpoint(websocket: WebSocket):
     await websocket.accept()
@@ -22,16 +24,16 @@ async def ws_live_endpoint(websocket: WebSocket):
     try:
         for payload in stream_live_payloads():
             now = time.time()
-            await websocket.send_text(json.dumps(payload))
+            await websocket.send_text(codec.json_dumps(payload))
             if now - last_hb >= 5:
-                await websocket.send_text(json.dumps({"event": "hb"}))
+                await websocket.send_text(codec.json_dumps({"event": "hb"}))
                 last_hb = now
             await asyncio.sleep(0)
     except WebSocketDisconnect:
         pass
     finally:
         try:
-            await websocket.send_text(json.dumps({"event": "live_end"}))
+            await websocket.send_text(codec.json_dumps({"event": "live_end"}))
         except Exception:
             pass
         # On live end, kick a light background ingest for freshness
@@ -46,11 +48,21 @@ async def ws_live_endpoint(websocket: WebSocket):
                     rc = RiotClient.from_config(cfg, kind="bg")
                 except Exception:
                     return
-                n = ingest_and_compute_recent(rc, store, puuid, since="2h", count=5, queue_filter=None)
+                # Only this player's list is polled; roster mates in the same game get rows too
+                n = ingest_and_compute_recent(
+                    rc,
+                    store,
+                    puuid,
+                    since="2h",
+                    count=5,
+                    queue_filter=None,
+                    roster=roster_puuids(cfg),
+                )
                 if n > 0:
                     rebuild_windows(store, cfg)
             except Exception:
                 pass
+
         threading.Thread(target=_post_live, daemon=True).start()
 
 
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from core import codec
+
+
+class CodecJSONResponse(JSONResponse):
+    """JSONResponse rendered through core.codec (orjson when installed).
+
+    The app's default response class.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return codec.json_dumpb(content)
+
+
+__all__ = ["CodecJSONResponse"]
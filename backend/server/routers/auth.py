@@ -4,16 +4,16 @@ from typing import Any, Dict
 
 from fastapi import APIRouter, HTTPException
 
-from ..deps import get_config, save_config, set_api_key
-from core.riot import RiotClient
+from core.riot import AsyncRiotClient
 
+from ..deps import get_config, save_config, set_api_key
 
 router = APIRouter()
 config_router = APIRouter()
 
 
 @router.post("/riot-key")
-def set_riot_key(payload: Dict[str, str]):
+async def set_riot_key(payload: Dict[str, str]):
     key = payload.get("key")
     if not key:
         return {"ok": False, "error": {"code": "INVALID_INPUT", "message": "Riot API key required"}}
@@ -22,8 +22,8 @@ def set_riot_key(payload: Dict[str, str]):
     # Validate key against Riot status endpoint
     try:
         cfg = get_config()
-        rc = RiotClient.from_config(cfg)
-        is_valid = rc.verify_key()
+        rc = AsyncRiotClient.from_config(cfg)
+        is_valid = await rc.verify_key()
         if not is_valid:
             return {"ok": False, "error": {"code": "INVALID_INPUT", "message": "Invalid or expired Riot API key"}}
     except Exception as e:
@@ -33,22 +33,22 @@ def set_riot_key(payload: Dict[str, str]):
 
 
 @router.post("/riot-id")
-def set_riot_id(payload: Dict[str, str]):
+async def set_riot_id(payload: Dict[str, str]):
     riot_id = payload.get("riot_id")
     if not riot_id or "#" not in riot_id:
         return {"ok": False, "error": {"code": "INVALID_INPUT", "message": "Use GameName#TAG"}}
     cfg = get_config()
     # Pre-req: API key must be present/valid
     try:
-        rc = RiotClient.from_config(cfg)
-        if not rc.verify_key():
+        rc = AsyncRiotClient.from_config(cfg)
+        if not await rc.verify_key():
             return {"ok": False, "error": {"code": "MISSING_PREREQ", "message": "Add a valid Riot API key first."}}
     except Exception:
         return {"ok": False, "error": {"code": "MISSING_PREREQ", "message": "Add a valid Riot API key first."}}
     cfg.setdefault("player", {})["riot_id"] = riot_id
     game, tag = riot_id.split("#", 1)
-    rc = RiotClient.from_config(cfg)
-    acct = rc.resolve_account(game, tag)
+    rc = AsyncRiotClient.from_config(cfg)
+    acct = await rc.resolve_account(game, tag)
     cfg["player"]["puuid"] = acct.get("puuid")
     save_config(cfg)
     return {"ok": True, "data": {"puuid": acct.get("puuid"), "region": cfg["riot"]["region"], "platform": cfg["riot"]["platform"]}}
@@ -1,17 +1,18 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, List
-import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Query
-import logging, time
 
-from ..deps import config as get_cfg
-from core.store import Store
-from core.gis import ROLE_DOMAIN_WEIGHTS, DOMAINS, achilles_and_secondary, load_role_weights
-from core import gis as _gis
-from core.windows import rebuild_windows as _rebuild_windows
+from core import codec
+from core import gis as _gis
+from core.gis import DOMAINS, ROLE_DOMAIN_WEIGHTS, achilles_and_secondary, load_role_weights
+from core.store import Store
+from core.windows import rebuild_windows as _rebuild_windows
 
+from ..deps import config as get_cfg
 
 router = APIRouter()
 
@@ -52,7 +53,8 @@ def gis_summary(queue: Optional[int] = Query(None), role: Optional[str] = Query(
     q_for_overall = q if q is not None else cfg_queue
     overall = store.load_overall_score(puuid, q_for_overall, resolved_role) or 50.0
     # Domain smoothed values
-    domains = {d: (store.load_domain_score(puuid, q_for_overall, role, d) or 50.0) for d in DOMAINS}
+    scored = store.load_gis_state(puuid, q_for_overall, role).domains
+    domains = {d: (scored.get(d) or 50.0) for d in DOMAINS}
     # Delta vs last 5 matches: compute inst overall average of last 5 minus previous 5
     with store.connect() as con:
         con.row_factory = __import__('sqlite3').Row
@@ -60,7 +62,7 @@ def gis_summary(queue: Optional[int] = Query(None), role: Optional[str] = Query(
             """
             SELECT i.match_id, i.domain, i.inst_score, i.z_metrics, m.game_creation_ms
             FROM inst_contrib i
-            JOIN matches m ON m.match_id = i.match_id
+            JOIN matches m ON m.match_id = i.match_id AND m.puuid = i.puuid
             WHERE i.puuid=? AND (? IS NULL OR m.queue_id=?) AND (? IS NULL OR m.role=?)
             ORDER BY m.game_creation_ms DESC
             LIMIT 100
@@ -71,7 +73,7 @@ def gis_summary(queue: Optional[int] = Query(None), role: Optional[str] = Query(
     for r in rows:
         by_match.setdefault(r["match_id"], {"ms": int(r["game_creation_ms"] or 0), "domains": {}, "z": {}})["domains"][r["domain"]] = float(r["inst_score"])
         try:
-            z = json.loads(r["z_metrics"]) if r["z_metrics"] else {}
+            z = codec.json_loads(r["z_metrics"]) if r["z_metrics"] else {}
             by_match[r["match_id"]]["z"][r["domain"]] = z
         except Exception:
             pass
@@ -258,7 +260,9 @@ def put_weights(payload: Dict[str, Any]):
     if not isinstance(roles, dict) or not roles:
         return {"ok": False, "error": {"code": "INVALID", "message": "roles map required"}}
     # Normalize and validate
-    from core.gis import _normalize_role_map as _norm, DOMAINS as _DOMS, _weights_path as _wpath
+    from core.gis import DOMAINS as _DOMS
+    from core.gis import _normalize_role_map as _norm
+    from core.gis import _weights_path as _wpath
     norm = _norm(roles)
     # Validate required roles present
     required_roles = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
@@ -274,14 +278,15 @@ def put_weights(payload: Dict[str, Any]):
         if unknown:
             return {"ok": False, "error": {"code": "INVALID", "message": f"unknown domains {unknown}"}}
     # Persist to weights.json
-    import json, logging, os
+    import logging
+    import os
     path = _wpath()
     try:
         # diff old→new for log
         old = load_role_weights()
         os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump({"roles": roles}, f, indent=2)
+        with open(path, "wb") as f:
+            f.write(codec.json_dumpb({"roles": roles}, indent=True))
         logging.getLogger(__name__).info("weights updated at %s", path)
         # Return effective roles
         return get_weights()
@@ -314,8 +319,11 @@ def backfill_inst(limit: int = 200, queue: Optional[int] = Query(None)):
                 continue
             # Use the same function that persists inst_contrib and smoothed scores
             try:
-                from core.gis import update_scores_for_match as _update
-                res = _update(store, puuid, mid)
+                from core.gis import prefetch_mastery
+                from core.gis import update_scores_for_match as _update
+                prefetch_mastery(store, puuid)
+                with store.transaction():
+                    res = _update(store, puuid, mid)
                 if res is not None:
                     count += 1
             except Exception:
@@ -342,13 +350,13 @@ def rebuild_all(clear: bool = Query(True), queue: Optional[int] = Query(None)):
     cleared = {"inst": 0, "domain": 0, "overall": 0, "norm": 0, "windows": 0}
     if clear:
         try:
-            with store.connect() as con:
+            with store.transaction(), store.connect() as con:
                 c1 = con.execute("DELETE FROM inst_contrib WHERE puuid=?", (puuid,)).rowcount or 0
+                con.execute("UPDATE match_summary SET domain_badges=NULL WHERE puuid=?", (puuid,))
                 c2 = con.execute("DELETE FROM score_domain WHERE player_id=?", (puuid,)).rowcount or 0
                 c3 = con.execute("DELETE FROM score_overall WHERE player_id=?", (puuid,)).rowcount or 0
                 c4 = con.execute("DELETE FROM norm_state WHERE player_id=?", (puuid,)).rowcount or 0
                 c5 = con.execute("DELETE FROM windows WHERE key LIKE ?", (f"puuid:{puuid}:%",)).rowcount or 0
-                con.commit()
                 cleared = {"inst": c1, "domain": c2, "overall": c3, "norm": c4, "windows": c5}
         except Exception:
             pass
@@ -367,7 +375,9 @@ def rebuild_all(clear: bool = Query(True), queue: Optional[int] = Query(None)):
             except Exception:
                 pass
             # Then, update smoothed scores (ranked gating included)
-            res = _gis.update_scores_for_match(store, puuid, mid)
+            _gis.prefetch_mastery(store, puuid)
+            with store.transaction():
+                res = _gis.update_scores_for_match(store, puuid, mid)
             if res is not None:
                 smoothed += 1
         except Exception:
@@ -447,8 +457,10 @@ def gis_match(match_id: str, recompute: Optional[bool] = Query(False), debug: Op
             try:
                 store = Store()
                 with store.connect() as con:
-                    row = con.execute("SELECT role FROM matches WHERE match_id=?", (match_id,)).fetchone()
-                role_resolved = (row[0] if row and row[0] else None)
+                    row = con.execute(
+                        "SELECT role FROM matches WHERE match_id=? AND puuid=?", (match_id, puuid)
+                    ).fetchone()
+                role_resolved = row[0] if row and row[0] else None
             except Exception:
                 role_resolved = None
             z_count = 0
@@ -462,7 +474,7 @@ def gis_match(match_id: str, recompute: Optional[bool] = Query(False), debug: Op
                     "matchId": match_id,
                     "puuid": puuid,
                     "roleResolved": role_resolved,
-                    "domainsInstJSON": json.dumps(cached.get("domains") or {}),
+                    "domainsInstJSON": codec.json_dumps(cached.get("domains") or {}),
                     "zMetricsCount": int(z_count),
                     "computed": False,
                     "ms": round(ms, 1),
@@ -479,8 +491,10 @@ def gis_match(match_id: str, recompute: Optional[bool] = Query(False), debug: Op
         try:
             store = Store()
             with store.connect() as con:
-                row = con.execute("SELECT role FROM matches WHERE match_id=?", (match_id,)).fetchone()
-            role_resolved = (row[0] if row and row[0] else None)
+                row = con.execute(
+                    "SELECT role FROM matches WHERE match_id=? AND puuid=?", (match_id, puuid)
+                ).fetchone()
+            role_resolved = row[0] if row and row[0] else None
         except Exception:
             role_resolved = None
         z_count = 0
@@ -491,7 +505,14 @@ def gis_match(match_id: str, recompute: Optional[bool] = Query(False), debug: Op
         # Extra debug: attach domains debug summary to response and log clearly to console
         try:
             zmap = payload.get("z") or {}
-            dbg = {d: {"inputs": len((zmap.get(d) or {})), "metrics": list((zmap.get(d) or {}).keys()), "value": float(payload.get("domains", {}).get(d, 0.0))} for d in (payload.get("domains") or {}).keys()}
+            dbg = {
+                d: {
+                    "inputs": len((zmap.get(d) or {})),
+                    "metrics": list((zmap.get(d) or {}).keys()),
+                    "value": float(payload.get("domains", {}).get(d, 0.0)),
+                }
+                for d in (payload.get("domains") or {}).keys()
+            }
             payload["debug"] = dbg
             # Always emit a concise, copy/paste-friendly line via uvicorn.access
             try:
@@ -500,7 +521,10 @@ def gis_match(match_id: str, recompute: Optional[bool] = Query(False), debug: Op
                 parts = []
                 for d in sorted(dbg.keys()):
                     ent = dbg[d]
-                    parts.append(f"{d}: inputs={ent['inputs']} value={ent['value']:.2f} metrics={','.join(ent['metrics']) if ent['metrics'] else '-'}")
+                    parts.append(
+                        f"{d}: inputs={ent['inputs']} value={ent['value']:.2f} "
+                        f"metrics={','.join(ent['metrics']) if ent['metrics'] else '-'}"
+                    )
                 elog.info("/gis/match debug matchId=%s %s", match_id, " | ".join(parts))
             except Exception:
                 pass
@@ -514,7 +538,7 @@ def gis_match(match_id: str, recompute: Optional[bool] = Query(False), debug: Op
                 "matchId": match_id,
                 "puuid": puuid,
                 "roleResolved": role_resolved,
-                "domainsInstJSON": json.dumps(payload.get("domains") or {}),
+                "domainsInstJSON": codec.json_dumps(payload.get("domains") or {}),
                 "zMetricsCount": int(z_count),
                 "computed": True,
                 "ms": round(ms, 1),
@@ -524,9 +548,19 @@ def gis_match(match_id: str, recompute: Optional[bool] = Query(False), debug: Op
     except Exception as e:
         # Map common errors: not found vs other
         from fastapi import HTTPException
+
         msg = str(e)
         if "not found" in msg.lower() or "404" in msg or "invalid" in msg.lower():
-            raise HTTPException(status_code=404, detail={"code": "not_found", "message": "matchId not found; pass metadata.matchId (like NA1_123...)."})
+            raise HTTPException(
+                status_code=404,
+                detail={
+                    "code": "not_found",
+                    "message": "matchId not found; pass metadata.matchId (like NA1_123...).",
+                },
+            )
         # Unknown failure
         logger.exception("/gis/match error for %s", match_id)
-        raise HTTPException(status_code=500, detail={"code": "compute_failed", "message": "Failed to compute contributions."})
+        raise HTTPException(
+            status_code=500,
+            detail={"code": "compute_failed", "message": "Failed to compute contributions."},
+        )
@@ -1,16 +1,18 @@
 from __future__ import annotations
 
-from fastapi import APIRouter
-import time
 import sqlite3
+import time
+
+from fastapi import APIRouter
 
+from core.decoded import decoded_cache
 from core.live import LiveClient
-from core.riot import RiotClient
-from core.store import Store
+from core.riot import RiotClient, scheduler_stats
+from core.store import SCHEMA_VERSION, Store, pool_stats
+
 from ..deps import config as get_cfg
 from ..ingest.ddragon import ensure_ddragon, latest_version
 
-
 router = APIRouter()
 
 _RIOT_HEALTH = {"status": "down", "ts": 0}
@@ -20,16 +22,20 @@ _RIOT_HEALTH = {"status": "down", "ts": 0}
 def health():
     t0 = time.time()
     # DB
-    store = Store()
-    schema_version = 3
+    schema_version = SCHEMA_VERSION
     try:
-        with store.connect() as con:
-            con.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
-            con.execute("INSERT OR IGNORE INTO meta(key,value) VALUES('schema_version','3')")
-            con.commit()
-            row = con.execute("SELECT value FROM meta WHERE key='schema_version'").fetchone()
-            schema_version = int(row[0]) if row else 3
-        db_resp = {"ok": True, "schema_version": schema_version}
+        # Read-only: migrations ran when the app started
+        store = Store()
+        schema_version = int(store.get_meta("schema_version") or 0)
+        db_resp = {
+            "ok": True,
+            "schema_version": schema_version,
+            "connections": pool_stats().get(store.db_path),
+            "raw_compression": store.recompress_report(),
+            "timeline_archive": store.archive.stats(),
+            "segments": store.segment_stats(),
+            "decoded_cache": decoded_cache().stats(),
+        }
     except Exception:
         db_resp = {"ok": False, "schema_version": schema_version}
 
@@ -44,7 +50,11 @@ def health():
         except Exception:
             status = "down"
         _RIOT_HEALTH.update({"status": status, "ts": now})
-    riot_resp = {"status": status, "last_check_epoch": int(_RIOT_HEALTH["ts"]) }
+    riot_resp = {
+        "status": status,
+        "last_check_epoch": int(_RIOT_HEALTH["ts"]),
+        "scheduler": scheduler_stats(),
+    }
 
     # Live client
     live_status = "down"
@@ -60,9 +70,10 @@ def health():
     # DDragon
     try:
         ver = latest_version()
-        assets_cached = ( (Store.__module__) is not None)  # dummy to avoid flake
+        assets_cached = (Store.__module__) is not None  # dummy to avoid flake
         # quick: check champion.json exists
         from ..ingest.ddragon import _ver_dir
+
         d = _ver_dir(ver)
         assets_cached = (d / "champion.json").exists()
         ddragon = {"version": ver, "assets_cached": assets_cached}
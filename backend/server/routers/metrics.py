@@ -2,11 +2,13 @@ from __future__ import annotations
 
 from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 
-from ..deps import config as get_cfg, save_config as save_cfg
+from core import codec
 from core.store import Store
 
+from ..deps import config as get_cfg
+from ..deps import save_config as save_cfg
 
 router = APIRouter()
 
@@ -39,8 +41,13 @@ def metrics_rolling(
     # If any segment filter is specified, compute on-the-fly; otherwise use cached windows for the configured queue
     use_dynamic = any(v is not None and v != "" for v in [queue, role, champion, patch])
     out: Dict[str, Dict[str, Any]] = {}
-    import sqlite3, time
-    from core.windows import value_of as w_value_of, ewma as w_ewma, sparkline as w_sparkline, summarize as w_summarize
+    import sqlite3
+    import time
+
+    from core.windows import ewma as w_ewma
+    from core.windows import sparkline as w_sparkline
+    from core.windows import summarize as w_summarize
+    from core.windows import value_of as w_value_of
     counts = [int(x) for x in (windows.split(',') if windows else []) if x]
     days_list = [int(x) for x in (days.split(',') if days else []) if x]
 
@@ -263,7 +270,8 @@ def get_targets():
         pass
 
     # Load all metric rows in context (ranked + queue + role)
-    import sqlite3, statistics as stats
+    import sqlite3
+    import statistics as stats
     with store.connect() as con:
         con.row_factory = sqlite3.Row
         qbase = "SELECT * FROM metrics WHERE puuid=?"
@@ -298,11 +306,10 @@ def get_targets():
         return arr
 
     # Load ratchet state
-    import json
     key_state = f"goals:ratchet:{puuid}"
     try:
         raw = store.get_meta(key_state)
-        state = json.loads(raw) if raw else {"targets": {}}
+        state = codec.json_loads(raw) if raw else {"targets": {}}
     except Exception:
         state = {"targets": {}}
     last_targets: Dict[str, float] = dict(state.get("targets") or {})
@@ -441,7 +448,7 @@ def get_targets():
 
     # Save ratchet state
     try:
-        store.set_meta(key_state, json.dumps({"targets": last_targets}))
+        store.set_meta(key_state, codec.json_dumps({"targets": last_targets}))
     except Exception:
         pass
 
@@ -1,20 +1,23 @@
 from __future__ import annotations
 
-from typing import Optional
 import sqlite3
+from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Query
 
-from ..deps import config as get_cfg
-from core.store import Store
-from core.metrics import ingest_and_compute_recent
-from core.riot import RiotClient
-from core.windows import rebuild_windows
+from core.config import roster_puuids
 from core.gis import process_new_matches
-from core.metrics_extras import compute_extras
-from ..ingest.ddragon import ensure_ddragon, load_items_json
 from core.live import LiveClient
+from core.metrics import IngestStats, ingest_roster
+from core.metrics_extras import compute_extras
+from core.riot import AsyncRiotClient, RiotClient
+from core.schema import Match, Timeline
+from core.store import Store
+from core.timeline import ParsedTimeline
+from core.windows import rebuild_windows
 
+from ..deps import config as get_cfg
+from ..ingest.ddragon import ensure_ddragon, load_items_json
 
 router = APIRouter()
 
@@ -27,38 +30,63 @@ def pull(since: Optional[str] = Query(None), count: int = Query(20), queue: Opti
         return {"ok": False, "error": {"code": "no_puuid", "message": "Set Riot ID first"}}
     store = Store()
     rc = RiotClient.from_config(cfg, kind="bg")
-    import time, logging
+    import logging
+    import time
     t0 = time.time()
-    n = ingest_and_compute_recent(rc, store, puuid, since=since, count=count, queue_filter=queue)
+    stats = IngestStats()
+    n = ingest_roster(
+        rc, store, roster_puuids(cfg), since=since, count=count, queue_filter=queue, stats=stats
+    )
     rebuild_windows(store, cfg)
     # Compute GIS for any new matches (chronological to respect smoothing)
     try:
         t1 = time.time()
-        m = process_new_matches(store, puuid, queue_filter=queue)
-        logging.getLogger(__name__).debug("pull: ingested=%s, gis_matches=%s, ingest_ms=%.1f, gis_ms=%.1f", n, m, (t1-t0)*1000, (time.time()-t1)*1000)
+        m = sum(process_new_matches(store, pu, queue_filter=queue) for pu in roster_puuids(cfg))
+        logging.getLogger(__name__).debug(
+            "pull: ingested=%s, gis_matches=%s, ingest_ms=%.1f, gis_ms=%.1f",
+            n,
+            m,
+            (t1 - t0) * 1000,
+            (time.time() - t1) * 1000,
+        )
     except Exception:
         pass
     _kickoff_precompute_missing(puuid)
-    return {"ok": True, "data": {"ingested": n}}
+    return {"ok": True, "data": {"ingested": n, "stats": stats.as_dict()}}
+
 
 # Bootstrap + status (background)
-import threading, time
+import threading
+import time
+
 from ..ingest.ddragon import ensure_ddragon
 
 _BOOT_TASKS = {}
 
 
 @router.post("/bootstrap")
-def bootstrap():
+async def bootstrap():
     cfg = get_cfg()
     puuid = cfg.get("player", {}).get("puuid")
     # Pre-validate: API key + puuid required
     try:
-        rc = RiotClient.from_config(cfg)
-        if not rc.verify_key() or not puuid:
-            return {"ok": False, "error": {"code": "MISSING_PREREQ", "message": "Add your Riot API key and Riot ID in Settings."}}
+        arc = AsyncRiotClient.from_config(cfg)
+        if not await arc.verify_key() or not puuid:
+            return {
+                "ok": False,
+                "error": {
+                    "code": "MISSING_PREREQ",
+                    "message": "Add your Riot API key and Riot ID in Settings.",
+                },
+            }
     except Exception:
-        return {"ok": False, "error": {"code": "MISSING_PREREQ", "message": "Add your Riot API key and Riot ID in Settings."}}
+        return {
+            "ok": False,
+            "error": {
+                "code": "MISSING_PREREQ",
+                "message": "Add your Riot API key and Riot ID in Settings.",
+            },
+        }
     task_id = f"boot-{int(time.time())}"
     _BOOT_TASKS[task_id] = {"phase": "queued", "progress": 0.0, "detail": ""}
 
@@ -70,8 +98,17 @@ def bootstrap():
             store = Store()
             rc = RiotClient.from_config(cfg, kind="bg")
             # ingest last 14d or 20 matches
+            stats = IngestStats()
             try:
-                n_total = ingest_and_compute_recent(rc, store, puuid, since="14d", count=50, queue_filter=None)
+                n_total = ingest_roster(
+                    rc,
+                    store,
+                    roster_puuids(cfg),
+                    since="14d",
+                    count=50,
+                    queue_filter=None,
+                    stats=stats,
+                )
             except Exception as e:
                 # Map rate limit
                 msg = str(e)
@@ -80,19 +117,36 @@ def bootstrap():
                     return
                 _BOOT_TASKS[task_id] = {"phase": "error", "progress": 1.0, "detail": "INGEST_ERROR"}
                 return
-            _BOOT_TASKS[task_id] = {"phase": "computing", "progress": 0.9, "detail": f"{n_total} matches"}
+            _BOOT_TASKS[task_id] = {
+                "phase": "computing",
+                "progress": 0.9,
+                "detail": f"{n_total} matches",
+            }
             rebuild_windows(store, cfg)
             # Compute GIS for matches
             try:
                 t2 = time.time()
-                m = process_new_matches(store, puuid, queue_filter=None)
+                m = sum(
+                    process_new_matches(store, pu, queue_filter=None) for pu in roster_puuids(cfg)
+                )
                 import logging as _logging
-                _logging.getLogger(__name__).debug("bootstrap: matches=%s, gis_matches=%s, gis_ms=%.1f", n_total, m, (time.time()-t2)*1000)
+
+                _logging.getLogger(__name__).debug(
+                    "bootstrap: matches=%s, gis_matches=%s, gis_ms=%.1f",
+                    n_total,
+                    m,
+                    (time.time() - t2) * 1000,
+                )
             except Exception:
                 pass
             # Opportunistically kick precompute of any missing extras (skip if in live game)
             _kickoff_precompute_missing(puuid)
-            _BOOT_TASKS[task_id] = {"phase": "done", "progress": 1.0, "detail": f"{n_total} matches"}
+            _BOOT_TASKS[task_id] = {
+                "phase": "done",
+                "progress": 1.0,
+                "detail": f"{n_total} matches",
+                "stats": stats.as_dict(),
+            }
         except Exception as e:
             _BOOT_TASKS[task_id] = {"phase": "error", "progress": 1.0, "detail": "INGEST_ERROR"}
 
@@ -108,6 +162,87 @@ def status(id: str):
     return {"ok": True, "data": s}
 
 
+# Full-history backfill (background, resumable via meta cursor)
+_BACKFILL_TASKS = {}
+
+
+@router.post("/backfill")
+def backfill(queue: Optional[int] = Query(None), restart: bool = Query(False)):
+    cfg = get_cfg()
+    puuid = cfg.get("player", {}).get("puuid")
+    if not puuid:
+        return {
+            "ok": False,
+            "error": {"code": "MISSING_PREREQ", "message": "Add your Riot ID in Settings."},
+        }
+    t = _BACKFILL_TASKS.get(puuid)
+    if t and t["thread"].is_alive():
+        return {"ok": True, "data": {"running": True}}
+    stop = threading.Event()
+    state = {"phase": "running", "detail": "", "stop": stop}
+
+    def run():
+        from core.backfill import run_backfill
+
+        store = Store()
+        rc = RiotClient.from_config(cfg, kind="bulk")
+        stats = IngestStats()
+        try:
+            cur = run_backfill(
+                rc, store, puuid, queue_filter=queue, stats=stats, stop=stop, restart=restart
+            )
+            state["phase"] = "done" if cur.done else "stopped"
+            state["detail"] = f"{cur.ingested} matches"
+            rebuild_windows(store, cfg)
+            try:
+                process_new_matches(store, puuid, queue_filter=queue)
+            except Exception:
+                pass
+        except Exception as e:
+            state["phase"] = "error"
+            state["detail"] = "RIOT_429" if "429" in str(e) else "INGEST_ERROR"
+        state["stats"] = stats.as_dict()
+
+    th = threading.Thread(target=run, daemon=True)
+    state["thread"] = th
+    _BACKFILL_TASKS[puuid] = state
+    th.start()
+    return {"ok": True, "data": {"running": True}}
+
+
+@router.post("/backfill/stop")
+def backfill_stop():
+    puuid = get_cfg().get("player", {}).get("puuid")
+    t = _BACKFILL_TASKS.get(puuid)
+    if t:
+        t["stop"].set()
+    return {"ok": True, "data": {"stopping": bool(t and t["thread"].is_alive())}}
+
+
+@router.get("/backfill/status")
+def backfill_status():
+    from core.backfill import status as cursor_status
+
+    cfg = get_cfg()
+    puuid = cfg.get("player", {}).get("puuid")
+    if not puuid:
+        return {
+            "ok": False,
+            "error": {"code": "MISSING_PREREQ", "message": "Add your Riot ID in Settings."},
+        }
+    s = cursor_status(RiotClient.from_config(cfg, kind="bulk"), Store(), puuid)
+    if s is None:
+        return {"ok": False, "error": {"code": "not_found", "message": "no backfill yet"}}
+    t = _BACKFILL_TASKS.get(puuid)
+    s["running"] = bool(t and t["thread"].is_alive())
+    if t:
+        s["phase"] = t["phase"]
+        s["detail"] = t["detail"]
+        if "stats" in t:
+            s["stats"] = t["stats"]
+    return {"ok": True, "data": s}
+
+
 def _kickoff_precompute_missing(puuid: str, limit: int = 150) -> None:
     # Don't start if live game
     try:
@@ -115,6 +250,7 @@ def _kickoff_precompute_missing(puuid: str, limit: int = 150) -> None:
             return
     except Exception:
         pass
+
     def run():
         try:
             store = Store()
@@ -126,7 +262,7 @@ def _kickoff_precompute_missing(puuid: str, limit: int = 150) -> None:
                     """
                     SELECT m.match_id, m.raw_json, t.raw_json as timeline_raw
                     FROM matches m
-                    LEFT JOIN metrics_extras ex ON ex.match_id = m.match_id
+                    LEFT JOIN metrics_extras ex ON ex.match_id = m.match_id AND ex.puuid = m.puuid
                     LEFT JOIN timelines t ON t.match_id = m.match_id
                     WHERE m.puuid=? AND ex.match_id IS NULL
                     ORDER BY m.game_creation_ms DESC
@@ -141,13 +277,19 @@ def _kickoff_precompute_missing(puuid: str, limit: int = 150) -> None:
                         return
                 except Exception:
                     pass
-                import json as _json
-                match = _json.loads(r["raw_json"]) if r["raw_json"] else {}
-                timeline = _json.loads(r["timeline_raw"]) if r["timeline_raw"] else {"info": {"frames": []}}
-                computed = compute_extras(match, timeline, items, puuid)
-                store.upsert_metrics_extras(r["match_id"], {"match_id": r["match_id"], **computed["extras_row"]})
+                match = store.loads_raw(r["raw_json"], {}, Match)
+                timeline = store.loads_raw(
+                    r["timeline_raw"] or store.load_timeline_raw(r["match_id"]), None, Timeline
+                ) or {"info": {"frames": []}}
+                pt = ParsedTimeline.build(match, timeline)
+                store.use_match_context(r["match_id"], puuid, pt)
+                computed = compute_extras(match, timeline, items, puuid, parsed=pt)
+                store.upsert_metrics_extras(
+                    r["match_id"], {"match_id": r["match_id"], **computed["extras_row"]}
+                )
         except Exception:
             pass
+
     threading.Thread(target=run, daemon=True).start()
 
 
@@ -160,11 +302,20 @@ def precompute_extras(limit: int = Query(100), force: bool = Query(False)):
     cfg = get_cfg()
     puuid = cfg.get("player", {}).get("puuid")
     if not puuid:
-        return {"ok": False, "error": {"code": "MISSING_PREREQ", "message": "Add your Riot ID in Settings."}}
+        return {
+            "ok": False,
+            "error": {"code": "MISSING_PREREQ", "message": "Add your Riot ID in Settings."},
+        }
     # Guard: do not run while in live match
     try:
         if LiveClient().status().startswith("in_game"):
-            return {"ok": False, "error": {"code": "IN_GAME", "message": "Currently in a live match. Try again later."}}
+            return {
+                "ok": False,
+                "error": {
+                    "code": "IN_GAME",
+                    "message": "Currently in a live match. Try again later.",
+                },
+            }
     except Exception:
         pass
     task_id = f"precomp-{int(time.time())}"
@@ -180,7 +331,8 @@ def precompute_extras(limit: int = Query(100), force: bool = Query(False)):
                 base_sql = (
                     "SELECT m.match_id, m.raw_json, t.raw_json as timeline_raw "
                     "FROM matches m "
-                    "LEFT JOIN metrics_extras ex ON ex.match_id = m.match_id "
+                    "LEFT JOIN metrics_extras ex "
+                    "ON ex.match_id = m.match_id AND ex.puuid = m.puuid "
                     "LEFT JOIN timelines t ON t.match_id = m.match_id "
                     "WHERE m.puuid=? "
                 )
@@ -194,17 +346,30 @@ def precompute_extras(limit: int = Query(100), force: bool = Query(False)):
                 # Check early whether live state changed; abort if so
                 try:
                     if LiveClient().status().startswith("in_game"):
-                        _PRECOMP_TASKS[task_id] = {"phase": "stopped", "progress": done/max(n,1), "detail": "IN_GAME"}
+                        _PRECOMP_TASKS[task_id] = {
+                            "phase": "stopped",
+                            "progress": done / max(n, 1),
+                            "detail": "IN_GAME",
+                        }
                         return
                 except Exception:
                     pass
-                import json as _json
-                match = _json.loads(r["raw_json"]) if r["raw_json"] else {}
-                timeline = _json.loads(r["timeline_raw"]) if r["timeline_raw"] else {"info": {"frames": []}}
-                computed = compute_extras(match, timeline, items, puuid)
-                store.upsert_metrics_extras(r["match_id"], {"match_id": r["match_id"], **computed["extras_row"]})
+                match = store.loads_raw(r["raw_json"], {}, Match)
+                timeline = store.loads_raw(
+                    r["timeline_raw"] or store.load_timeline_raw(r["match_id"]), None, Timeline
+                ) or {"info": {"frames": []}}
+                pt = ParsedTimeline.build(match, timeline)
+                store.use_match_context(r["match_id"], puuid, pt)
+                computed = compute_extras(match, timeline, items, puuid, parsed=pt)
+                store.upsert_metrics_extras(
+                    r["match_id"], {"match_id": r["match_id"], **computed["extras_row"]}
+                )
                 done += 1
-                _PRECOMP_TASKS[task_id] = {"phase": "running", "progress": done / max(n, 1), "detail": f"{done}/{n}"}
+                _PRECOMP_TASKS[task_id] = {
+                    "phase": "running",
+                    "progress": done / max(n, 1),
+                    "detail": f"{done}/{n}",
+                }
             _PRECOMP_TASKS[task_id] = {"phase": "done", "progress": 1.0, "detail": f"{done}/{n}"}
         except Exception as e:
             _PRECOMP_TASKS[task_id] = {"phase": "error", "progress": 1.0, "detail": str(e)}
@@ -0,0 +1,128 @@
+"""Cold archive for raw timelines.
+
+Timelines are only read again for drill-downs and forced recomputes once their
+frames, events, metrics and GIS rows exist, so the retention job
+(Store.archive_timelines) moves old ones out of the main database into a sibling
+SQLite file, `<db>.archive`, as the packed blob they were stored as. Store reads
+fall through to the archive when the hot row is gone.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from . import codec
+
+ARCHIVE_SUFFIX = ".archive"
+
+ARCHIVE_DDL = """
+    CREATE TABLE IF NOT EXISTS timelines (
+        match_id TEXT PRIMARY KEY,
+        raw_json BLOB,
+        archived_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def archive_path(db_path: str) -> str:
+    # In-memory databases (file:...?mode=memory) get an in-memory archive alongside
+    if db_path.startswith("file:"):
+        name, _, query = db_path.partition("?")
+        return f"{name}{ARCHIVE_SUFFIX}?{query}"
+    return db_path + ARCHIVE_SUFFIX
+
+
+class TimelineArchive:
+    """One connection to the archive file, opened on first use and shared behind a lock."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.memory = path.startswith("file:")
+        self.lock = threading.Lock()
+        self._con: Optional[sqlite3.Connection] = None
+
+    def exists(self) -> bool:
+        return self._con is not None or (not self.memory and Path(self.path).exists())
+
+    def _connect(self) -> sqlite3.Connection:
+        # Caller holds self.lock
+        if self._con is None:
+            con = sqlite3.connect(self.path, check_same_thread=False, uri=self.memory)
+            con.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute(ARCHIVE_DDL)
+            con.commit()
+            self._con = con
+        return self._con
+
+    def put_many(self, rows: Iterable[Tuple[str, codec.Packed]]) -> int:
+        """Store (match_id, packed raw_json) rows; committed before returning."""
+        rows = list(rows)
+        if not rows:
+            return 0
+        with self.lock:
+            con = self._connect()
+            con.executemany(
+                """
+                INSERT INTO timelines(match_id, raw_json, archived_at) VALUES(?,?,datetime('now'))
+                ON CONFLICT(match_id) DO UPDATE SET
+                    raw_json=excluded.raw_json, archived_at=excluded.archived_at
+                """,
+                rows,
+            )
+            con.commit()
+        return len(rows)
+
+    def get(self, match_id: str) -> codec.Packed:
+        if not self.exists():
+            return None
+        with self.lock:
+            row = (
+                self._connect()
+                .execute("SELECT raw_json FROM timelines WHERE match_id=?", (match_id,))
+                .fetchone()
+            )
+        return row[0] if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.exists():
+            return {"timelines": 0, "bytes": 0}
+        with self.lock:
+            con = self._connect()
+            n = con.execute("SELECT COUNT(*) FROM timelines").fetchone()[0]
+            page_size, pages, free = (
+                con.execute(f"PRAGMA {p}").fetchone()[0]
+                for p in ("page_size", "page_count", "freelist_count")
+            )
+        return {"timelines": n, "bytes": page_size * (pages - free)}
+
+    def close(self) -> None:
+        with self.lock:
+            if self._con is not None:
+                try:
+                    self._con.close()
+                except Exception:
+                    pass
+                self._con = None
+
+
+_ARCHIVES: Dict[str, TimelineArchive] = {}
+_ARCHIVES_LOCK = threading.Lock()
+
+
+def archive_for(db_path: str) -> TimelineArchive:
+    a = _ARCHIVES.get(db_path)
+    if a is None:
+        with _ARCHIVES_LOCK:
+            a = _ARCHIVES.get(db_path)
+            if a is None:
+                a = _ARCHIVES[db_path] = TimelineArchive(archive_path(db_path))
+    return a
+
+
+def close_archives() -> None:
+    for a in list(_ARCHIVES.values()):
+        a.close()
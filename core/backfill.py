@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from . import codec
+from .metrics import FETCH_WORKERS, IngestStats, ingest_match_ids
+from .riot import RiotClient
+from .store import Store
+
+_log = logging.getLogger(__name__)
+
+# Match-V5 only serves match-id history from this point on (epoch seconds)
+HISTORY_FLOOR_S = 1623801600
+PAGE_SIZE = 100  # Match-V5 max `count`
+CHUNK_DAYS = 30
+DAY_S = 86400
+# One match costs a getMatch + getTimeline call against the same app bucket
+CALLS_PER_MATCH = 2
+
+
+def cursor_key(puuid: str) -> str:
+    return f"backfill:{puuid}"
+
+
+@dataclass
+class BackfillCursor:
+    """Resumable position in a player's match history, persisted in `meta`.
+
+    History is walked newest → oldest in fixed [start_time, end_time) windows so
+    the `start` offset stays stable even while new games are being played.
+    """
+
+    end_time: int
+    chunk_s: int = CHUNK_DAYS * DAY_S
+    start: int = 0
+    floor: int = HISTORY_FLOOR_S
+    listed: int = 0
+    ingested: int = 0
+    skipped: int = 0
+    done: bool = False
+    started_at: float = field(default_factory=time.time)
+    updated_at: float = 0.0
+
+    @property
+    def start_time(self) -> int:
+        return max(self.floor, self.end_time - self.chunk_s)
+
+    def progress(self, now: Optional[int] = None) -> float:
+        if self.done:
+            return 1.0
+        span = max(1, int(now or time.time()) - self.floor)
+        covered = int(now or time.time()) - self.end_time
+        return round(min(1.0, max(0.0, covered / span)), 4)
+
+    def to_json(self) -> str:
+        return codec.json_dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, raw: str) -> "BackfillCursor":
+        data = codec.json_loads(raw)
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+def load_cursor(store: Store, puuid: str) -> Optional[BackfillCursor]:
+    raw = store.get_meta(cursor_key(puuid))
+    if not raw:
+        return None
+    try:
+        return BackfillCursor.from_json(raw)
+    except Exception:
+        return None
+
+
+def save_cursor(store: Store, puuid: str, cur: BackfillCursor) -> None:
+    cur.updated_at = time.time()
+    store.set_meta(cursor_key(puuid), cur.to_json())
+
+
+def estimate_eta(rc: RiotClient, cur: BackfillCursor, now: Optional[int] = None) -> Optional[float]:
+    """Seconds left, from the match density seen so far and the current rate-limit budget."""
+    if cur.done:
+        return 0.0
+    now = int(now or time.time())
+    # Mid-window, the listed ids are spread over (at most) the whole current window
+    covered_s = now - (cur.start_time if cur.start else cur.end_time)
+    remaining_s = max(0, (cur.start_time if cur.start else cur.end_time) - cur.floor)
+    if covered_s <= 0 or cur.listed <= 0:
+        return None
+    remaining_matches = cur.listed / covered_s * remaining_s
+    try:
+        rate = min(rc.budget("match-v5.getMatch"), rc.budget("match-v5.getTimeline"))
+    except Exception:
+        return None
+    if not rate or rate == float("inf"):
+        return None
+    return round(remaining_matches * CALLS_PER_MATCH / rate, 1)
+
+
+def status(rc: RiotClient, store: Store, puuid: str) -> Optional[Dict[str, Any]]:
+    cur = load_cursor(store, puuid)
+    if cur is None:
+        return None
+    return {
+        "done": cur.done,
+        "progress": cur.progress(),
+        "cursor": {"end_time": cur.end_time, "start": cur.start},
+        "listed": cur.listed,
+        "ingested": cur.ingested,
+        "skipped": cur.skipped,
+        "eta_s": estimate_eta(rc, cur),
+        "updated_at": cur.updated_at,
+    }
+
+
+def run_backfill(
+    rc: RiotClient,
+    store: Store,
+    puuid: str,
+    queue_filter: Optional[int] = None,
+    chunk_days: int = CHUNK_DAYS,
+    workers: int = FETCH_WORKERS,
+    stats: Optional[IngestStats] = None,
+    stop: Optional[threading.Event] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    restart: bool = False,
+) -> BackfillCursor:
+    """Import a player's full match history, resuming from the cursor in `meta`.
+
+    Each page of up to PAGE_SIZE ids is ingested through the staged pipeline and the
+    cursor is checkpointed only after the page is written, so an interrupted run
+    re-lists at most one page on resume (upserts make the replay harmless).
+    """
+    cur = None if restart else load_cursor(store, puuid)
+    if cur is None:
+        cur = BackfillCursor(end_time=int(time.time()), chunk_s=max(1, chunk_days) * DAY_S)
+        save_cursor(store, puuid, cur)
+    st = stats if stats is not None else IngestStats()
+    while not cur.done:
+        if stop is not None and stop.is_set():
+            break
+        ids = rc.match_ids_by_puuid(
+            puuid,
+            start=cur.start,
+            count=PAGE_SIZE,
+            start_time=cur.start_time,
+            end_time=cur.end_time,
+        )
+        seen = store.known_match_ids(ids, puuid)
+        todo = [mid for mid in ids if mid not in seen]
+        n = ingest_match_ids(
+            rc, store, puuid, todo, queue_filter=queue_filter, workers=workers, stats=st
+        )
+        cur.listed += len(ids)
+        cur.ingested += n
+        cur.skipped += len(ids) - n
+        if len(ids) >= PAGE_SIZE:
+            cur.start += len(ids)
+        else:
+            # Window exhausted: step back one chunk, or finish at the history floor
+            if cur.start_time <= cur.floor:
+                cur.done = True
+            else:
+                cur.end_time = cur.start_time
+                cur.start = 0
+        save_cursor(store, puuid, cur)
+        _log.debug(
+            "backfill: end_time=%s start=%s listed=%s ingested=%s",
+            cur.end_time,
+            cur.start,
+            cur.listed,
+            cur.ingested,
+        )
+        if on_progress is not None:
+            on_progress(
+                {
+                    "progress": cur.progress(),
+                    "listed": cur.listed,
+                    "ingested": cur.ingested,
+                    "eta_s": estimate_eta(rc, cur),
+                }
+            )
+    return cur
@@ -0,0 +1,306 @@
+"""Storage codec: JSON encoding for everything the app persists or serves, and
+compression for raw Riot payloads (matches/timelines raw_json).
+
+JSON goes through json_loads/json_dumps/json_dumpb, backed by orjson when it is
+installed (a backend dependency) and by the stdlib otherwise. Output is compact
+UTF-8 either way. Non-string dict keys are stringified and NumPy values are
+serialised as plain numbers/lists.
+
+Blobs are self-describing: one tag byte, an optional 4-byte dictionary id, then
+the compressed body. Legacy rows are plain JSON text (str) and pass through
+unchanged, so readers never need to know whether a row was recompressed yet.
+
+    tag 0x01  zlib
+    tag 0x02  zlib + preset dictionary (zdict)
+    tag 0x03  zstd               (needs the optional `zstandard` package)
+    tag 0x04  zstd + dictionary
+    tag 0x10  reference to a payload in the segment files (core/segments.py);
+              resolved by Store.raw_bytes, never by this module
+
+Dictionaries are trained from stored payloads (see Store.train_blob_dicts), kept
+in the `blob_dicts` table and registered here by id (crc32 of codec + bytes), so
+one process can read several databases without id clashes.
+"""
+from __future__ import annotations
+
+import json
+import re
+import struct
+import threading
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+try:  # optional: better ratio and much faster decode than zlib
+    import zstandard as _zstd  # type: ignore
+except Exception:  # pragma: no cover - depends on environment
+    _zstd = None
+
+try:  # optional: several times faster JSON parse/serialise than the stdlib
+    import orjson as _orjson  # type: ignore
+except Exception:  # pragma: no cover - depends on environment
+    _orjson = None
+
+
+TAG_ZLIB = 0x01
+TAG_ZLIB_DICT = 0x02
+TAG_ZSTD = 0x03
+TAG_ZSTD_DICT = 0x04
+TAG_SEGMENT_REF = 0x10
+# digest, segment number, offset, length
+_REF = struct.Struct(">16sIQI")
+REF_BYTES = 1 + _REF.size
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+# zlib can only look back 32 KiB, so a larger preset dictionary is wasted
+ZLIB_DICT_SIZE = 32 * 1024
+ZSTD_DICT_SIZE = 112 * 1024
+# Payloads smaller than this are stored as text: the header would eat the gain
+MIN_PACK_BYTES = 64
+
+_DICTS: Dict[int, Tuple[str, bytes]] = {}
+_ZSTD_DICTS: Dict[int, Any] = {}
+_LOCK = threading.Lock()
+
+Packed = Union[str, bytes, None]
+
+
+# JSON
+if _orjson is not None:
+    _ORJSON_OPTS = _orjson.OPT_NON_STR_KEYS | _orjson.OPT_SERIALIZE_NUMPY
+
+
+def _json_default(obj: Any) -> Any:
+    # Stdlib fallback for what orjson serialises natively
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def json_dumpb(obj: Any, indent: bool = False) -> bytes:
+    """Object → compact UTF-8 JSON bytes (two-space indented with `indent`)."""
+    if _orjson is not None:
+        return _orjson.dumps(obj, option=_ORJSON_OPTS | (_orjson.OPT_INDENT_2 if indent else 0))
+    return json_dumps(obj, indent).encode("utf-8")
+
+
+def json_dumps(obj: Any, indent: bool = False) -> str:
+    """Object → JSON text; see json_dumpb."""
+    if _orjson is not None:
+        return json_dumpb(obj, indent).decode("utf-8")
+    return json.dumps(
+        obj, ensure_ascii=False, default=_json_default, indent=2 if indent else None,
+        separators=(",", ": ") if indent else (",", ":"),
+    )
+
+
+def json_loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """JSON text or UTF-8 bytes → object."""
+    if _orjson is not None:
+        try:
+            return _orjson.loads(data)
+        except _orjson.JSONDecodeError:
+            # Rows written by json.dumps may hold NaN/Infinity, which orjson rejects
+            pass
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
+
+
+def available_codecs() -> List[str]:
+    return ["zlib"] + (["zstd"] if _zstd is not None else [])
+
+
+def default_codec() -> str:
+    return "zstd" if _zstd is not None else "zlib"
+
+
+def dict_id(codec: str, data: bytes) -> int:
+    return zlib.crc32(codec.encode() + b"\0" + data) & 0xFFFFFFFF
+
+
+def register_dict(codec: str, data: bytes) -> int:
+    """Make a dictionary usable by pack/unpack in this process; returns its id."""
+    did = dict_id(codec, data)
+    with _LOCK:
+        _DICTS[did] = (codec, bytes(data))
+    return did
+
+
+def known_dict(did: Optional[int]) -> bool:
+    return did is not None and did in _DICTS
+
+
+def _zstd_dict(did: int):
+    d = _ZSTD_DICTS.get(did)
+    if d is None:
+        d = _ZSTD_DICTS[did] = _zstd.ZstdCompressionDict(_DICTS[did][1])
+    return d
+
+
+def pack(
+    text: Union[str, bytes, None], dict_id: Optional[int] = None, codec: Optional[str] = None
+) -> Packed:
+    """Compress a JSON payload for storage.
+
+    With `dict_id` the dictionary's codec wins over `codec`. Empty or tiny payloads
+    are returned as text so `if row[0]` checks and legacy readers keep working.
+    """
+    if text is None:
+        return None
+    raw = text.encode("utf-8") if isinstance(text, str) else bytes(text)
+    if len(raw) < MIN_PACK_BYTES:
+        return raw.decode("utf-8")
+    entry = _DICTS.get(dict_id) if dict_id is not None else None
+    codec = entry[0] if entry else (codec or default_codec())
+    if codec == "zstd" and _zstd is not None:
+        if entry:
+            body = _zstd.ZstdCompressor(level=ZSTD_LEVEL, dict_data=_zstd_dict(dict_id)).compress(
+                raw
+            )
+            return bytes([TAG_ZSTD_DICT]) + struct.pack(">I", dict_id) + body
+        return bytes([TAG_ZSTD]) + _zstd.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    if entry and entry[0] == "zlib":
+        c = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, 15, 9, zlib.Z_DEFAULT_STRATEGY, entry[1])
+        return bytes([TAG_ZLIB_DICT]) + struct.pack(">I", dict_id) + c.compress(raw) + c.flush()
+    return bytes([TAG_ZLIB]) + zlib.compress(raw, ZLIB_LEVEL)
+
+
+def unpack_bytes(value: Packed) -> Optional[bytes]:
+    """Stored value → raw UTF-8 JSON bytes (None stays None).
+
+    Buffers (e.g. a memoryview over a mapped segment) are decompressed in place,
+    without copying the compressed bytes first.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    if not isinstance(value, (bytes, memoryview)):
+        value = memoryview(value)
+    if not len(value):
+        return b""
+    tag = value[0]
+    if tag == TAG_SEGMENT_REF and len(value) == REF_BYTES:
+        raise ValueError("segment reference; read it through Store.raw_bytes")
+    if tag == TAG_ZLIB:
+        return zlib.decompress(value[1:])
+    if tag in (TAG_ZLIB_DICT, TAG_ZSTD_DICT):
+        (did,) = struct.unpack(">I", value[1:5])
+        if did not in _DICTS:
+            raise ValueError(f"unknown blob dictionary {did:#010x}")
+        if tag == TAG_ZLIB_DICT:
+            d = zlib.decompressobj(15, _DICTS[did][1])
+            return d.decompress(value[5:]) + d.flush()
+        if _zstd is None:
+            raise ValueError("zstd blob but the zstandard package is not installed")
+        return _zstd.ZstdDecompressor(dict_data=_zstd_dict(did)).decompress(value[5:])
+    if tag == TAG_ZSTD:
+        if _zstd is None:
+            raise ValueError("zstd blob but the zstandard package is not installed")
+        return _zstd.ZstdDecompressor().decompress(value[1:])
+    # Text that was stored through a BLOB binding
+    return bytes(value)
+
+
+def unpack(value: Packed) -> Optional[str]:
+    """Stored value → JSON text (for endpoints that hand the raw payload out)."""
+    raw = unpack_bytes(value)
+    return raw.decode("utf-8") if raw is not None else None
+
+
+def loads(value: Packed, default: Any = None) -> Any:
+    """Stored value → parsed JSON; `default` for NULL/empty rows."""
+    raw = unpack_bytes(value)
+    if not raw:
+        return default
+    return json_loads(raw)
+
+
+def is_packed(value: Packed) -> bool:
+    return (
+        isinstance(value, (bytes, bytearray, memoryview))
+        and len(value) > 0
+        and value[0] in (TAG_ZLIB, TAG_ZLIB_DICT, TAG_ZSTD, TAG_ZSTD_DICT)
+    )
+
+
+def make_ref(digest: bytes, segment: int, offset: int, length: int) -> bytes:
+    return bytes([TAG_SEGMENT_REF]) + _REF.pack(digest, segment, offset, length)
+
+
+def ref_location(value: Packed) -> Optional[Tuple[int, int, int]]:
+    """(segment, offset, length) of a segment reference; None for any other value."""
+    if (
+        isinstance(value, (bytes, bytearray, memoryview))
+        and len(value) == REF_BYTES
+        and value[0] == TAG_SEGMENT_REF
+    ):
+        _digest, seg, off, n = _REF.unpack(bytes(value[1:]))
+        return seg, off, n
+    return None
+
+
+def ref_digest(value: Packed) -> Optional[bytes]:
+    """Content digest of a segment reference; None for any other value."""
+    if (
+        isinstance(value, (bytes, bytearray, memoryview))
+        and len(value) == REF_BYTES
+        and value[0] == TAG_SEGMENT_REF
+    ):
+        return _REF.unpack(bytes(value[1:]))[0]
+    return None
+
+
+def packed_dict_id(value: Packed) -> Optional[int]:
+    if is_packed(value) and value[0] in (TAG_ZLIB_DICT, TAG_ZSTD_DICT):
+        return struct.unpack(">I", bytes(value[1:5]))[0]
+    return None
+
+
+# JSON keys and short string values; Riot payloads repeat the same few hundred
+_TOKEN_RE = re.compile(rb'"[^"\\]{1,48}"\s*:?')
+
+
+def train_dict(
+    samples: Iterable[bytes], codec: Optional[str] = None, size: Optional[int] = None
+) -> Optional[bytes]:
+    """Build a compression dictionary from sample payloads.
+
+    zstd uses its own trainer. For zlib (no trainer in the stdlib) the dictionary
+    is the most valuable repeated tokens by count × length, heaviest last since
+    deflate codes short distances cheaper. Returns None if there is too little data.
+    """
+    codec = codec or default_codec()
+    samples = [s for s in samples if s]
+    if len(samples) < 4:
+        return None
+    if codec == "zstd" and _zstd is not None:
+        try:
+            d = _zstd.train_dictionary(size or ZSTD_DICT_SIZE, samples)
+            return d.as_bytes()
+        except Exception:
+            return None
+    size = min(size or ZLIB_DICT_SIZE, ZLIB_DICT_SIZE)
+    counts: Counter = Counter()
+    for s in samples:
+        # Per-sample presence matters more than raw repeats inside one timeline
+        counts.update(set(_TOKEN_RE.findall(s)))
+        counts.update(_TOKEN_RE.findall(s[:4096]))
+    ranked = sorted(
+        ((tok, n) for tok, n in counts.items() if n >= 2),
+        key=lambda kv: kv[1] * len(kv[0]),
+        reverse=True,
+    )
+    picked: List[bytes] = []
+    used = 0
+    for tok, _n in ranked:
+        if used + len(tok) > size:
+            continue
+        picked.append(tok)
+        used += len(tok)
+    if not picked:
+        return None
+    picked.reverse()
+    return b"".join(picked)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import _event_rows
+from .store import LEGACY_SUFFIX, Store
+from .timeline import timeline_events
+
+_log = logging.getLogger(__name__)
+
+COMPACT_BATCH = 100  # matches per transaction
+
+_FRAME_COLS = "match_id, ts_ms, participant_id, total_gold, xp, cs, current_gold, x, y"
+_EVENT_COLS = "match_id, ts_ms, type, participant_id, killer_id, victim_id, item_id, ward_type"
+
+
+def legacy_tables(store: Store) -> List[str]:
+    with store.connect() as con:
+        rows = con.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name IN (?,?)",
+            (f"frames{LEGACY_SUFFIX}", f"events{LEGACY_SUFFIX}"),
+        ).fetchall()
+    return sorted(r[0] for r in rows)
+
+
+def _first_copy(rows: List[Tuple]) -> List[Tuple]:
+    """Undo repeated ingests: the shortest prefix the row list is an exact repetition of."""
+    n = len(rows)
+    for p in range(1, n // 2 + 1):
+        if n % p == 0 and rows == rows[:p] * (n // p):
+            return rows[:p]
+    return rows
+
+
+def _frames_for(rows: List[Tuple]) -> List[Tuple]:
+    # Natural key (ts_ms, participant_id); a later ingest wins over an earlier one
+    keyed: Dict[Tuple[Any, Any], Tuple] = {}
+    for r in rows:
+        keyed[(r[1], r[2])] = r
+    return list(keyed.values())
+
+
+def _events_for(store: Store, mid: str, rows: List[Tuple]) -> List[Tuple]:
+    # The stored timeline is authoritative; fall back to stripping repeated copies
+    timeline = store.load_timeline(mid)
+    if timeline:
+        try:
+            return _event_rows(mid, timeline_events(timeline))
+        except Exception:
+            pass
+    return _first_copy(rows)
+
+
+def compact_frames_events(
+    store: Store,
+    batch: int = COMPACT_BATCH,
+    stop: Optional[threading.Event] = None,
+    max_batches: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Drain the keyless pre-schema-9 frames/events tables into the keyed ones.
+
+    Each batch of matches is deduplicated, written with replace-by-match semantics
+    and deleted from the legacy table in one transaction, so the job resumes where
+    it stopped. A legacy table is dropped once empty. Matches that already have
+    rows in the keyed table (re-ingested since the upgrade) keep those.
+    """
+    report: Dict[str, Any] = {"matches": 0, "rows_before": 0, "rows_after": 0, "done": False}
+    batches = 0
+    for legacy in legacy_tables(store):
+        table = legacy[: -len(LEGACY_SUFFIX)]
+        cols = _FRAME_COLS if table == "frames" else _EVENT_COLS
+        while True:
+            if (stop is not None and stop.is_set()) or (
+                max_batches is not None and batches >= max_batches
+            ):
+                return report
+            with store.connect() as con:
+                mids = [
+                    r[0]
+                    for r in con.execute(
+                        f"SELECT DISTINCT match_id FROM {legacy} ORDER BY match_id LIMIT ?",
+                        (batch,),
+                    ).fetchall()
+                ]
+            if not mids:
+                break
+            with store.transaction(), store.connect() as con:
+                for mid in mids:
+                    rows = [
+                        tuple(r)
+                        for r in con.execute(
+                            f"SELECT {cols} FROM {legacy} WHERE match_id IS ? ORDER BY rowid",
+                            (mid,),
+                        ).fetchall()
+                    ]
+                    report["rows_before"] += len(rows)
+                    kept = con.execute(
+                        f"SELECT EXISTS(SELECT 1 FROM {table} WHERE match_id IS ?)", (mid,)
+                    ).fetchone()[0]
+                    if not kept and mid is not None:
+                        fresh = (
+                            _frames_for(rows)
+                            if table == "frames"
+                            else _events_for(store, mid, rows)
+                        )
+                        if table == "frames":
+                            store.replace_match_frames(mid, fresh)
+                        else:
+                            store.replace_match_events(mid, fresh)
+                        report["rows_after"] += len(fresh)
+                    con.execute(f"DELETE FROM {legacy} WHERE match_id IS ?", (mid,))
+                    report["matches"] += 1
+            batches += 1
+        with store.transaction(), store.connect() as con:
+            con.execute(f"DROP TABLE IF EXISTS {legacy}")
+        _log.info("compact: %s drained", legacy)
+    report["done"] = True
+    return report
@@ -10,7 +10,6 @@ from typing import Any, Dict
 import keyring
 import yaml
 
-
 APP_DIR_NAME = "loltrack"
 CONFIG_FILE_NAME = "config.yaml"
 DB_FILE_NAME = "loltrack.db"
@@ -27,6 +26,8 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         "riot_id": "",
         "puuid": "",
         "track_queues": [420],
+        # Extra PUUIDs ingested alongside the main player (shared games are fetched once)
+        "roster": [],
     },
     "windows": {
         "counts": [5, 10, 20],
@@ -75,6 +76,16 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         "maxNegativeImpactLowMastery": 3.0,
         # Floor for standardization sigma to avoid z=0 collapse early on
         "epsSigma": 0.5,
+    },
+    # Raw timelines move to the cold archive (<db>.archive) once every derived row
+    # exists and the match is older than timeline_days or outside the newest
+    # timeline_keep_last matches; 0 disables a rule. convert_auto_vacuum switches an
+    # existing database to incremental vacuum with a one-off full VACUUM at startup,
+    # before serving (slow on large files; new databases are created incremental)
+    "retention": {
+        "timeline_days": 90,
+        "timeline_keep_last": 200,
+        "convert_auto_vacuum": False,
     },
     # Goals configuration (targets + ratchet)
     "goals": {
@@ -176,6 +187,13 @@ def open_config_in_editor() -> bool:
         return False
 
 
+def roster_puuids(cfg: Dict[str, Any]) -> list[str]:
+    """Tracked players: the configured player first, then `player.roster`, deduplicated."""
+    player = cfg.get("player", {}) or {}
+    out = [player.get("puuid") or ""] + [str(p) for p in (player.get("roster") or [])]
+    return list(dict.fromkeys(p for p in out if p))
+
+
 def get_api_key() -> str | None:
     # prefer keyring
     key = keyring.get_password(KEYRING_SERVICE, "api_key")
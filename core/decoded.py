@@ -0,0 +1,115 @@
+"""Process-wide LRU of decoded match and timeline payloads.
+
+A match drill-down decodes the same raw match and timeline several times: the
+advanced view, the GIS breakdown and its feature extraction each load them again.
+Store.load_match / Store.load_timeline keep the parsed object here instead, keyed
+by (database, kind, match_id), so repeat reads skip unpacking and json parsing.
+
+The cache is bounded by an estimate of the decoded size (DECODED_BYTES_PER_BYTE
+times the JSON length) and evicts least-recently-used entries past
+DECODED_CACHE_BYTES. Upserts invalidate their key; the epoch check in put()
+keeps a reader that decoded the old payload from re-inserting it afterwards.
+
+Cached objects are shared between callers: treat them as read-only.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+Key = Tuple[str, str, str]  # (db_path, "match" | "timeline", match_id)
+
+DECODED_CACHE_BYTES = 128 * 1024 * 1024
+# Parsed Riot payloads take roughly 3x (matches) to 5x (timelines) their JSON size in Python objects
+DECODED_BYTES_PER_BYTE = 5
+# Recent invalidations remembered per key; older ones only raise the floor (see put())
+_EPOCH_KEYS = 4096
+
+_MISSING = object()
+
+
+class DecodedCache:
+    def __init__(self, max_bytes: int = DECODED_CACHE_BYTES) -> None:
+        self.max_bytes = int(max_bytes)
+        self.lock = threading.Lock()
+        self._entries: "OrderedDict[Key, Tuple[Any, int]]" = OrderedDict()
+        # Recently invalidated keys → invalidation counter at the time;
+        # _floor covers the forgotten ones
+        self._epochs: "OrderedDict[Key, int]" = OrderedDict()
+        self._floor = 0
+        self._clock = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Key, default: Any = _MISSING) -> Any:
+        with self.lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return hit[0]
+
+    def epoch(self) -> int:
+        """Token to pass to put(); take it before reading the payload from the database."""
+        with self.lock:
+            return self._clock
+
+    def put(self, key: Key, value: Any, json_bytes: int, epoch: int) -> None:
+        """Keep ``value``, decoded from ``json_bytes`` of JSON.
+
+        Dropped if ``key`` was invalidated since ``epoch``.
+        """
+        cost = max(1, int(json_bytes)) * DECODED_BYTES_PER_BYTE
+        with self.lock:
+            if self._floor > epoch or self._epochs.get(key, 0) > epoch or cost > self.max_bytes:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, cost)
+            self.bytes += cost
+            while self.bytes > self.max_bytes:
+                _, (_, c) = self._entries.popitem(last=False)
+                self.bytes -= c
+                self.evictions += 1
+
+    def invalidate(self, key: Key) -> None:
+        with self.lock:
+            self._clock += 1
+            self._epochs.pop(key, None)
+            self._epochs[key] = self._clock
+            if len(self._epochs) > _EPOCH_KEYS:
+                _, self._floor = self._epochs.popitem(last=False)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+
+    def clear(self) -> None:
+        with self.lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes_est": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+_CACHE = DecodedCache()
+
+
+def decoded_cache() -> DecodedCache:
+    return _CACHE
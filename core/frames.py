@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import struct
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Per-participant frame fields, in blob order
+INT_FIELDS = ("total_gold", "xp", "cs", "current_gold")
+POS_FIELDS = ("x", "y")
+FIELDS = INT_FIELDS + POS_FIELDS
+
+MAGIC = b"FM01"
+# magic, n_frames, n_participants; 8 bytes keeps every array 4-byte aligned
+_HEADER = struct.Struct("<4sHH")
+_TS_DTYPE = np.dtype("<i4")
+_INT_DTYPE = np.dtype("<i4")
+_POS_DTYPE = np.dtype("<f4")
+
+
+def _dtype(name: str) -> np.dtype:
+    return _POS_DTYPE if name in POS_FIELDS else _INT_DTYPE
+
+
+def nearest_index(ts: Sequence[int], ms: int) -> Optional[int]:
+    """Index of the timestamp nearest `ms` in ascending `ts`, by bisection.
+
+    Earliest on ties, like min() over the frame list: an exact midpoint goes to the
+    earlier frame and repeated timestamps resolve to their first occurrence.
+    """
+    n = len(ts)
+    if not n:
+        return None
+    i = bisect_left(ts, ms)
+    if i == n or (i > 0 and ms - ts[i - 1] <= ts[i] - ms):
+        i = bisect_left(ts, ts[i - 1])
+    return i
+
+
+@dataclass
+class FrameMatrix:
+    """Timeline frames as columns: `ts` is (frames,), every field is (frames, participants).
+
+    Column `pid - 1` holds participant `pid`. Missing participant frames read as 0,
+    missing positions as NaN. Matrices loaded from a blob are read-only views over
+    the stored bytes (no copy). Lookups by time bisect `ts`, which follows the
+    timeline's frame order (ascending).
+    """
+
+    ts: np.ndarray
+    total_gold: np.ndarray
+    xp: np.ndarray
+    cs: np.ndarray
+    current_gold: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    _ts_index: Optional[List[int]] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def n_frames(self) -> int:
+        return int(self.ts.shape[0])
+
+    @property
+    def n_participants(self) -> int:
+        return int(self.total_gold.shape[1])
+
+    @classmethod
+    def from_timeline(cls, timeline: Dict[str, Any], n_participants: int = 10) -> "FrameMatrix":
+        frames = (timeline or {}).get("info", {}).get("frames", []) or []
+        for fr in frames:
+            for k in (fr.get("participantFrames") or {}):
+                n_participants = max(n_participants, int(k))
+        n = len(frames)
+        ts = np.zeros(n, dtype=_TS_DTYPE)
+        cols = {
+            name: (np.full((n, n_participants), np.nan, dtype=_POS_DTYPE) if name in POS_FIELDS
+                   else np.zeros((n, n_participants), dtype=_INT_DTYPE))
+            for name in FIELDS
+        }
+        for i, fr in enumerate(frames):
+            ts[i] = int(fr.get("timestamp") or 0)
+            for k, pf in (fr.get("participantFrames") or {}).items():
+                j = int(k) - 1
+                if j < 0:
+                    continue
+                cols["total_gold"][i, j] = int(pf.get("totalGold") or 0)
+                cols["xp"][i, j] = int(pf.get("xp") or 0)
+                cols["cs"][i, j] = int(
+                    (pf.get("minionsKilled") or 0) + (pf.get("jungleMinionsKilled") or 0)
+                )
+                cols["current_gold"][i, j] = int(pf.get("currentGold") or 0)
+                pos = pf.get("position") or {}
+                if pos.get("x") is not None and pos.get("y") is not None:
+                    cols["x"][i, j] = float(pos["x"])
+                    cols["y"][i, j] = float(pos["y"])
+        return cls(ts=ts, **cols)
+
+    def to_blob(self) -> bytes:
+        parts = [
+            _HEADER.pack(MAGIC, self.n_frames, self.n_participants),
+            self.ts.astype(_TS_DTYPE).tobytes(),
+        ]
+        for name in FIELDS:
+            parts.append(np.ascontiguousarray(getattr(self, name), dtype=_dtype(name)).tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_blob(cls, buf: Any) -> "FrameMatrix":
+        magic, n, p = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError("not a frame matrix blob")
+        off = _HEADER.size
+        ts = np.frombuffer(buf, dtype=_TS_DTYPE, count=n, offset=off)
+        off += n * _TS_DTYPE.itemsize
+        cols = {}
+        for name in FIELDS:
+            dt = _dtype(name)
+            cols[name] = np.frombuffer(buf, dtype=dt, count=n * p, offset=off).reshape(n, p)
+            off += n * p * dt.itemsize
+        return cls(ts=ts, **cols)
+
+    # Lookups
+    @property
+    def ts_index(self) -> List[int]:
+        """Frame timestamps as a plain list, built once and shared by every lookup."""
+        if self._ts_index is None:
+            self._ts_index = self.ts.tolist()
+        return self._ts_index
+
+    def index_at(self, ms: int) -> Optional[int]:
+        """Nearest frame to `ms` (earliest on ties, like min() over the frame list)."""
+        return nearest_index(self.ts_index, int(ms))
+
+    def value_at(self, name: str, ms: int, pid: int, default: float = 0) -> float:
+        i = self.index_at(ms)
+        j = int(pid) - 1
+        if i is None or not 0 <= j < self.n_participants:
+            return default
+        return getattr(self, name)[i, j].item()
+
+    def interp_at(self, name: str, ms: int, pid: int, default: float = 0) -> float:
+        """`name` of pid linearly interpolated between the frames around `ms`.
+
+        Held flat past either end.
+        """
+        ts = self.ts_index
+        j = int(pid) - 1
+        if not ts or not 0 <= j < self.n_participants:
+            return default
+        col = getattr(self, name)
+        i = bisect_right(ts, ms)
+        if i == 0:
+            return col[0, j].item()
+        if i == len(ts) or ts[i] == ts[i - 1]:
+            return col[i - 1, j].item()
+        v0, v1 = col[i - 1, j].item(), col[i, j].item()
+        return v0 + (v1 - v0) * (ms - ts[i - 1]) / (ts[i] - ts[i - 1])
+
+    def indices_at(self, marks: Iterable[int]) -> np.ndarray:
+        """Vectorised index_at: nearest frame to each of `marks` (ms), same tie rules."""
+        m = np.fromiter((int(v) for v in marks), dtype=np.int64)
+        n = self.n_frames
+        if not n:
+            return np.zeros(0, dtype=np.intp)
+        ts = self.ts.astype(np.int64)
+        i = np.searchsorted(ts, m, side="left")
+        lo, hi = np.maximum(i - 1, 0), np.minimum(i, n - 1)
+        idx = np.where((i == n) | ((i > 0) & (m - ts[lo] <= ts[hi] - m)), lo, hi)
+        return np.searchsorted(ts, ts[idx], side="left")
+
+    def values_at(
+        self, name: str, marks: Iterable[int], pid: int, interpolate: bool = False
+    ) -> np.ndarray:
+        """`name` of pid at each of `marks` (ms): nearest frame, or interpolated.
+
+        Zeros when unknown.
+        """
+        marks = [int(m) for m in marks]
+        j = int(pid) - 1
+        if not self.n_frames or not 0 <= j < self.n_participants:
+            return np.zeros(len(marks), dtype=np.float64)
+        col = getattr(self, name)[:, j].astype(np.float64)
+        if interpolate:
+            return np.interp(marks, self.ts, col)
+        return col[self.indices_at(marks)]
+
+    # Position tracks
+    def track(self, pid: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(t, x, y) of pid over the frames where its position is known (float64)."""
+        j = int(pid) - 1
+        if not 0 <= j < self.n_participants:
+            empty = np.zeros(0, dtype=np.float64)
+            return empty, empty, empty
+        xs, ys = self.x[:, j].astype(np.float64), self.y[:, j].astype(np.float64)
+        known = ~(np.isnan(xs) | np.isnan(ys))
+        return self.ts[known].astype(np.float64), xs[known], ys[known]
+
+    def positions_at(
+        self, marks: Iterable[int], pid: int, interpolate: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """x, y of pid at each of `marks` (ms); NaN where unknown.
+
+        By default the nearest frame's position (as value_at); with `interpolate`, a
+        linear interpolation along the known track, held flat past either end.
+        """
+        marks = [int(m) for m in marks]
+        j = int(pid) - 1
+        if not self.n_frames or not 0 <= j < self.n_participants:
+            nan = np.full(len(marks), np.nan)
+            return nan, nan.copy()
+        if interpolate:
+            t, xs, ys = self.track(pid)
+            if not t.size:
+                nan = np.full(len(marks), np.nan)
+                return nan, nan.copy()
+            return np.interp(marks, t, xs), np.interp(marks, t, ys)
+        idx = self.indices_at(marks)
+        return self.x[idx, j].astype(np.float64), self.y[idx, j].astype(np.float64)
+
+    def distances_at(
+        self,
+        marks: Iterable[int],
+        pid: int,
+        xs: Sequence[float],
+        ys: Sequence[float],
+        interpolate: bool = False,
+    ) -> np.ndarray:
+        """Distance from pid to point k = (xs[k], ys[k]) at marks[k].
+
+        NaN when either position is unknown.
+        """
+        px, py = self.positions_at(marks, pid, interpolate)
+        dx, dy = px - np.asarray(xs, dtype=np.float64), py - np.asarray(ys, dtype=np.float64)
+        return np.sqrt(dx * dx + dy * dy)
+
+    def median_distances(
+        self, pid: int, others: Sequence[int], lo_ms: int, hi_ms: int
+    ) -> np.ndarray:
+        """Median distance from pid to each of `others` over frames in [lo_ms, hi_ms].
+
+        Only frames where both positions are known count; NaN for a pair that never has one.
+        """
+        out = np.full(len(others), np.nan)
+        j = int(pid) - 1
+        cols = [k for k, o in enumerate(others) if 0 <= int(o) - 1 < self.n_participants]
+        if not 0 <= j < self.n_participants or not cols:
+            return out
+        keep = (self.ts >= lo_ms) & (self.ts <= hi_ms)
+        oj = [int(others[k]) - 1 for k in cols]
+        dx = self.x[keep][:, oj].astype(np.float64) - self.x[keep, j].astype(np.float64)[:, None]
+        dy = self.y[keep][:, oj].astype(np.float64) - self.y[keep, j].astype(np.float64)[:, None]
+        d = np.sqrt(dx * dx + dy * dy)
+        missing = np.isnan(d)
+        if not missing.any():
+            out[cols] = np.median(d, axis=0)
+            return out
+        # Gaps in a track: take each pair's median over the frames where both are known
+        for k, col, gap in zip(cols, d.T, missing.T):
+            if not gap.all():
+                out[k] = np.median(col[~gap])
+        return out
+
+    def diff_at(self, name: str, ms: int, pid: int, other: Optional[int]) -> int:
+        """`name` of pid minus `name` of other at the nearest frame (0 when either is unknown)."""
+        if not other:
+            return 0
+        return int(self.value_at(name, ms, pid) - self.value_at(name, ms, other))
+
+    def path_length(self, pid: int, until_ms: int) -> float:
+        """Distance travelled through the known per-frame positions up to `until_ms`."""
+        j = int(pid) - 1
+        if not 0 <= j < self.n_participants:
+            return 0.0
+        keep = self.ts <= until_ms
+        xs, ys = self.x[keep, j], self.y[keep, j]
+        known = ~(np.isnan(xs) | np.isnan(ys))
+        xs, ys = xs[known].astype(np.float64), ys[known].astype(np.float64)
+        if xs.size < 2:
+            return 0.0
+        return float(np.hypot(np.diff(xs), np.diff(ys)).sum())
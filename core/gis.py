@@ -1,16 +1,18 @@
 from __future__ import annotations
 
-import json
+import threading
+import time
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
-import threading, time
 
-from .store import Store
-from .metrics import MS, find_frame_at, lane_opponent_id, participant_by_puuid
+from . import codec
+from .config import get_config
+from .metrics import MS, participant_by_puuid
 from .metrics_extras import compute_extras
-from .config import get_config
 from .riot import RiotClient
-
+from .schema import Match, Timeline
+from .store import GisState, Store
+from .timeline import ParsedTimeline
 
 DOMAINS = [
     "laning",
@@ -59,27 +61,14 @@ def _team_damage_share(match: Dict[str, Any], puuid: str) -> float:
     return max(0.0, min(100.0, (my / team) * 100.0))
 
 
-def _early_deaths_pre(match: Dict[str, Any], timeline: Dict[str, Any], pid: int, minute: int = 10) -> int:
-    count = 0
-    for fr in timeline.get("info", {}).get("frames", []) or []:
-        for ev in fr.get("events", []) or []:
-            if ev.get("type") == "CHAMPION_KILL" and int(ev.get("victimId") or 0) == pid and int(ev.get("timestamp") or 0) < minute * 60 * MS:
-                count += 1
-    return count
-
+def _early_deaths_pre(pt: ParsedTimeline, pid: int, minute: int = 10) -> int:
+    return sum(1 for ev in pt.deaths_of(pid) if int(ev.get("timestamp") or 0) < minute * 60 * MS)
 
-def _cs_from_pf(pf: Dict[str, Any]) -> int:
-    return int((pf.get("minionsKilled") or 0) + (pf.get("jungleMinionsKilled") or 0))
 
-
-def _csd_at(match: Dict[str, Any], timeline: Dict[str, Any], pid: int, minute: int) -> Optional[int]:
-    opp = lane_opponent_id(match, timeline, pid)
-    fr = find_frame_at(timeline, minute * 60 * MS)
-    pfs = fr.get("participantFrames", {}) if fr else {}
-    me = pfs.get(str(pid), {})
+def _csd_at(pt: ParsedTimeline, pid: int, minute: int) -> Optional[int]:
+    opp = pt.lane_opponent(pid)
     if opp:
-        op = pfs.get(str(opp), {})
-        return int(_cs_from_pf(me) - _cs_from_pf(op))
+        return pt.frames.diff_at("cs", minute * 60 * MS, pid, opp)
     # Without opponent, fallback to cs itself as neutral (diff ~ 0) by returning None
     return None
 
@@ -93,65 +82,35 @@ def _time_dead_per_min(match: Dict[str, Any], puuid: str) -> float:
     return dead_s / dur_min
 
 
-def _obj_near_count(match: Dict[str, Any], timeline: Dict[str, Any], pid: int) -> int:
+def _obj_near_count(pt: ParsedTimeline, pid: int) -> int:
     # Count objective events where we are within ~2500 units
-    info = match.get("info", {})
-    parts = info.get("participants", [])
-    me = next((p for p in parts if p.get("participantId") == pid), None) or {}
-    my_team = int(me.get("teamId") or 0)
-    def pos_near(ts: int) -> Optional[Tuple[float, float]]:
-        frames = timeline.get("info", {}).get("frames", []) or []
-        if not frames:
-            return None
-        fr = min(frames, key=lambda f: abs(int(f.get("timestamp") or 0) - ts))
-        pf = fr.get("participantFrames", {}).get(str(pid), {})
-        pos = pf.get("position") or {}
-        x = pos.get("x"); y = pos.get("y")
-        if x is None or y is None:
-            return None
-        return float(x), float(y)
-    near = 0
-    for fr in timeline.get("info", {}).get("frames", []) or []:
-        for ev in fr.get("events", []) or []:
-            typ = ev.get("type")
-            if typ in ("ELITE_MONSTER_KILL", "BUILDING_KILL"):
-                killer = int(ev.get("killerId") or 0)
-                kteam = None
-                for p in parts:
-                    if int(p.get("participantId") or 0) == killer:
-                        kteam = int(p.get("teamId") or 0)
-                        break
-                if kteam != my_team:
-                    continue
-                ts = int(ev.get("timestamp") or 0)
-                mp = pos_near(ts)
-                ep = ev.get("position") or {}
-                ex = ep.get("x"); ey = ep.get("y")
-                if mp and ex is not None and ey is not None:
-                    dx = mp[0] - float(ex)
-                    dy = mp[1] - float(ey)
-                    if (dx * dx + dy * dy) ** 0.5 <= 2500:
-                        near += 1
-    return near
-
-
-def _is_low_mastery(puuid: str, champion_id: int) -> bool:
+    my_team = pt.team_of(pid) or 0
+    events = [
+        ev for typ in ("ELITE_MONSTER_KILL", "BUILDING_KILL") for ev in pt.of_type(typ)
+        if pt.team_of(ev.get("killerId")) == my_team
+    ]
+    return int(pt.near(pid, events, 2500).sum())
+
+
+def _is_low_mastery(puuid: str, champion_id: int, store: Optional[Store] = None) -> bool:
     """Best-effort check for low mastery on a champion.
 
     Uses cached meta if available; otherwise fetches champion masteries and caches a low-masteries set.
     Low mastery if champion mastery points in bottom 20% or level <= 4.
+    Never calls Riot inside a Store transaction (it would hold the writer lock while
+    waiting on the rate limiter): callers run prefetch_mastery() before opening one.
     """
-    from .store import Store as _Store
-    st = _Store()
+    st = store if store is not None else Store()
     key_low = f"mastery_low:{puuid}"
     raw = st.get_meta(key_low)
-    import json as _json
     if raw:
         try:
-            low_set = set(_json.loads(raw) or [])
+            low_set = set(codec.json_loads(raw) or [])
             return int(champion_id) in low_set
         except Exception:
             pass
+    if st.in_transaction():
+        return False
     # Build cache
     try:
         cfg = get_config()
@@ -171,61 +130,72 @@ def _is_low_mastery(puuid: str, champion_id: int) -> bool:
             pts = int(x.get("championPoints") or 0)
             if lvl <= 4 or pts <= thr:
                 low_ids.append(pid)
-        st.set_meta(key_low, _json.dumps(low_ids))
+        st.set_meta(key_low, codec.json_dumps(low_ids))
         return int(champion_id) in set(low_ids)
     except Exception:
         # On any failure, avoid applying the guardrail (false)
         return False
 
 
-def _load_match_and_timeline(store: Store, match_id: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
-    with store.connect() as con:
-        row_m = con.execute("SELECT raw_json FROM matches WHERE match_id=?", (match_id,)).fetchone()
-        row_t = con.execute("SELECT raw_json FROM timelines WHERE match_id=?", (match_id,)).fetchone()
-    match = json.loads(row_m[0]) if row_m and row_m[0] else {}
-    timeline = json.loads(row_t[0]) if row_t and row_t[0] else {"info": {"frames": []}}
+def prefetch_mastery(store: Store, puuid: str) -> None:
+    """Fill the low-mastery cache for `puuid` outside any transaction (see _is_low_mastery)."""
+    _is_low_mastery(puuid, 0, store)
+
+
+def _load_match_and_timeline(store: Store, match_id: str) -> Tuple[Match, Timeline]:
+    # Decoded-cache hits when the advanced view or another domain pass just loaded the match
+    match = store.load_match(match_id) or {}
+    timeline = store.load_timeline(match_id) or {"info": {"frames": []}}
     return match, timeline
 
 
 def _extract_features(store: Store, match_id: str, puuid: str) -> Tuple[Dict[str, float], Dict[str, Any]]:
     match, timeline = _load_match_and_timeline(store, match_id)
     info = match.get("info", {})
-    parts = info.get("participants", [])
     mep = participant_by_puuid(match, puuid)
     pid = int(mep.get("participantId") or 0)
     duration_s = int(info.get("gameDuration") or 0)
+    pt = ParsedTimeline.build(match, timeline, store.load_frame_matrix(match_id))
+    store.use_match_context(match_id, puuid, pt)
+    fm = pt.frames
 
     # Compute extras (from cache or on-the-fly); store cache if missing
     # Attempt to fetch cached row for speed
     import sqlite3 as _sqlite3
     with store.connect() as con:
         con.row_factory = _sqlite3.Row
-        ex = con.execute("SELECT * FROM metrics_extras WHERE match_id=?", (match_id,)).fetchone()
-        mx = con.execute("SELECT * FROM metrics WHERE match_id=?", (match_id,)).fetchone()
+        ex = con.execute(
+            "SELECT * FROM metrics_extras WHERE match_id=? AND puuid=?", (match_id, puuid)
+        ).fetchone()
+        mx = con.execute(
+            "SELECT * FROM metrics WHERE match_id=? AND puuid=?", (match_id, puuid)
+        ).fetchone()
     if ex is None:
-        computed = compute_extras(match, timeline, None, puuid)
+        computed = compute_extras(match, timeline, None, puuid, parsed=pt)
         store.upsert_metrics_extras(match_id, {"match_id": match_id, **computed["extras_row"]})
         # Re-fetch row to use consistent access pattern
         with store.connect() as con:
-            ex = con.execute("SELECT * FROM metrics_extras WHERE match_id=?", (match_id,)).fetchone()
+            ex = con.execute(
+                "SELECT * FROM metrics_extras WHERE match_id=? AND puuid=?", (match_id, puuid)
+            ).fetchone()
     # Guard for missing metrics
     # Build values
     vals: Dict[str, float] = {}
     # Laning diffs
     try:
-        f10 = find_frame_at(timeline, 10 * 60 * MS)
-        f15 = find_frame_at(timeline, 15 * 60 * MS)
-        pf10 = f10.get("participantFrames", {}).get(str(pid), {})
-        pf15 = f15.get("participantFrames", {}).get(str(pid), {})
-        opp = lane_opponent_id(match, timeline, pid)
-        op10 = f10.get("participantFrames", {}).get(str(opp), {}) if opp else {}
-        op15 = f15.get("participantFrames", {}).get(str(opp), {}) if opp else {}
-        vals["gd10"] = float((pf10.get("totalGold") or 0) - (op10.get("totalGold") or 0))
-        vals["xpd10"] = float((pf10.get("xp") or 0) - (op10.get("xp") or 0))
-        vals["gd15"] = float((pf15.get("totalGold") or 0) - (op15.get("totalGold") or 0))
-        vals["xpd15"] = float((pf15.get("xp") or 0) - (op15.get("xp") or 0))
-        csd10 = _csd_at(match, timeline, pid, 10)
-        csd14 = _csd_at(match, timeline, pid, 14)
+        opp = pt.lane_opponent(pid)
+        for name, key, minute in (
+            ("gd10", "total_gold", 10),
+            ("xpd10", "xp", 10),
+            ("gd15", "total_gold", 15),
+            ("xpd15", "xp", 15),
+        ):
+            ms = minute * 60 * MS
+            vals[name] = float(
+                fm.value_at(key, ms, pid) - (fm.value_at(key, ms, opp) if opp else 0)
+            )
+        csd10 = _csd_at(pt, pid, 10)
+        csd14 = _csd_at(pt, pid, 14)
         if csd10 is not None:
             vals["csd10"] = float(csd10)
         if csd14 is not None:
@@ -234,14 +204,13 @@ def _extract_features(store: Store, match_id: str, puuid: str) -> Tuple[Dict[str
         pass
     # Early deaths and plates
     try:
-        vals["early_deaths_pre10"] = float(_early_deaths_pre(match, timeline, pid, 10))
+        vals["early_deaths_pre10"] = float(_early_deaths_pre(pt, pid, 10))
         # Plates pre-14 credited if killerId is me (simple heuristic)
-        plates = 0
-        for fr in timeline.get("info", {}).get("frames", []) or []:
-            for ev in fr.get("events", []) or []:
-                if ev.get("type") == "TURRET_PLATE_DESTROYED" and int(ev.get("timestamp") or 0) < 14 * 60 * MS:
-                    if int(ev.get("killerId") or 0) == pid:
-                        plates += 1
+        plates = sum(
+            1
+            for ev in pt.of("TURRET_PLATE_DESTROYED", pid)
+            if int(ev.get("timestamp") or 0) < 14 * 60 * MS
+        )
         vals["plates_pre14"] = float(plates)
     except Exception:
         pass
@@ -249,24 +218,38 @@ def _extract_features(store: Store, match_id: str, puuid: str) -> Tuple[Dict[str
     try:
         vals["dpm"] = float(ex["dpm"]) if ex and ex["dpm"] is not None else 0.0
         vals["gpm"] = float(ex["gpm"]) if ex and ex["gpm"] is not None else 0.0
-        vals["obj_participation"] = float(ex["obj_participation"]) if ex and ex["obj_participation"] is not None else 0.0
+        vals["obj_participation"] = (
+            float(ex["obj_participation"]) if ex and ex["obj_participation"] is not None else 0.0
+        )
         vals["dmg_obj"] = float(ex["dmg_obj"]) if ex and ex["dmg_obj"] is not None else 0.0
-        vals["dmg_turrets"] = float(ex["dmg_turrets"]) if ex and ex["dmg_turrets"] is not None else 0.0
+        vals["dmg_turrets"] = (
+            float(ex["dmg_turrets"]) if ex and ex["dmg_turrets"] is not None else 0.0
+        )
         mythic_at_s = int(ex["mythic_at_s"]) if ex and ex["mythic_at_s"] is not None else 0
         two_item_at_s = int(ex["two_item_at_s"]) if ex and ex["two_item_at_s"] is not None else 0
         if mythic_at_s:
             vals["mythic_at_s"] = float(mythic_at_s)
         if two_item_at_s:
             vals["two_item_at_s"] = float(two_item_at_s)
-        vals["vision_per_min"] = float(ex["vision_per_min"]) if ex and ex["vision_per_min"] is not None else 0.0
-        vals["wards_killed"] = float(ex["wards_killed"]) if ex and ex["wards_killed"] is not None else 0.0
-        vals["roam_distance_pre14"] = float(ex["roam_distance_pre14"]) if ex and ex["roam_distance_pre14"] is not None else 0.0
+        vals["vision_per_min"] = (
+            float(ex["vision_per_min"]) if ex and ex["vision_per_min"] is not None else 0.0
+        )
+        vals["wards_killed"] = (
+            float(ex["wards_killed"]) if ex and ex["wards_killed"] is not None else 0.0
+        )
+        vals["roam_distance_pre14"] = (
+            float(ex["roam_distance_pre14"])
+            if ex and ex["roam_distance_pre14"] is not None
+            else 0.0
+        )
     except Exception:
         pass
     # From metrics row
     try:
         if mx is not None:
-            vals["ctrl_wards_pre14"] = float(mx["ctrl_wards_pre14"]) if mx["ctrl_wards_pre14"] is not None else 0.0
+            vals["ctrl_wards_pre14"] = (
+                float(mx["ctrl_wards_pre14"]) if mx["ctrl_wards_pre14"] is not None else 0.0
+            )
             vals["csmin14"] = float(mx["csmin14"]) if mx["csmin14"] is not None else 0.0
             vals["kp_early"] = float(mx["kp_early"]) if mx["kp_early"] is not None else 0.0
     except Exception:
@@ -275,7 +258,7 @@ def _extract_features(store: Store, match_id: str, puuid: str) -> Tuple[Dict[str
     try:
         vals["damage_share"] = _team_damage_share(match, puuid)
         vals["time_dead_per_min"] = _time_dead_per_min(match, puuid)
-        vals["obj_near"] = float(_obj_near_count(match, timeline, pid))
+        vals["obj_near"] = float(_obj_near_count(pt, pid))
     except Exception:
         pass
 
@@ -289,11 +272,51 @@ def _extract_features(store: Store, match_id: str, puuid: str) -> Tuple[Dict[str
 
 # Domain sub-metric weights (role-aware)
 ROLE_DOMAIN_WEIGHTS: Dict[str, Dict[str, float]] = {
-    "TOP": {"laning": .30, "economy": .20, "damage": .15, "macro": .15, "objectives": .10, "vision": .05, "discipline": .05},
-    "JUNGLE": {"objectives": .30, "macro": .20, "laning": .10, "economy": .10, "damage": .10, "vision": .10, "discipline": .10},
-    "MIDDLE": {"laning": .28, "damage": .20, "economy": .18, "macro": .14, "objectives": .10, "vision": .05, "discipline": .05},
-    "BOTTOM": {"economy": .25, "damage": .22, "laning": .22, "objectives": .12, "macro": .09, "vision": .05, "discipline": .05},
-    "UTILITY": {"vision": .28, "objectives": .20, "macro": .14, "laning": .14, "damage": .12, "economy": .06, "discipline": .06},
+    "TOP": {
+        "laning": 0.30,
+        "economy": 0.20,
+        "damage": 0.15,
+        "macro": 0.15,
+        "objectives": 0.10,
+        "vision": 0.05,
+        "discipline": 0.05,
+    },
+    "JUNGLE": {
+        "objectives": 0.30,
+        "macro": 0.20,
+        "laning": 0.10,
+        "economy": 0.10,
+        "damage": 0.10,
+        "vision": 0.10,
+        "discipline": 0.10,
+    },
+    "MIDDLE": {
+        "laning": 0.28,
+        "damage": 0.20,
+        "economy": 0.18,
+        "macro": 0.14,
+        "objectives": 0.10,
+        "vision": 0.05,
+        "discipline": 0.05,
+    },
+    "BOTTOM": {
+        "economy": 0.25,
+        "damage": 0.22,
+        "laning": 0.22,
+        "objectives": 0.12,
+        "macro": 0.09,
+        "vision": 0.05,
+        "discipline": 0.05,
+    },
+    "UTILITY": {
+        "vision": 0.28,
+        "objectives": 0.20,
+        "macro": 0.14,
+        "laning": 0.14,
+        "damage": 0.12,
+        "economy": 0.06,
+        "discipline": 0.06,
+    },
 }
 
 # Per-domain metric weights (weights sum does not need to be 1; normalized)
@@ -338,17 +361,58 @@ DOMAIN_METRIC_WEIGHTS: Dict[str, Dict[str, float]] = {
 # Role domain weights: default presets
 # Role domain weights: default presets + balanced fallback
 _DEFAULT_ROLE_WEIGHTS: Dict[str, Dict[str, float]] = {
-    "TOP": {"laning": .30, "economy": .20, "damage": .15, "macro": .15, "objectives": .10, "vision": .05, "discipline": .05},
-    "JUNGLE": {"objectives": .30, "macro": .20, "laning": .10, "economy": .10, "damage": .10, "vision": .10, "discipline": .10},
-    "MIDDLE": {"laning": .28, "damage": .20, "economy": .18, "macro": .14, "objectives": .10, "vision": .05, "discipline": .05},
-    "BOTTOM": {"economy": .25, "damage": .22, "laning": .22, "objectives": .12, "macro": .09, "vision": .05, "discipline": .05},
-    "UTILITY": {"vision": .28, "objectives": .20, "macro": .14, "laning": .14, "damage": .12, "economy": .06, "discipline": .06},
+    "TOP": {
+        "laning": 0.30,
+        "economy": 0.20,
+        "damage": 0.15,
+        "macro": 0.15,
+        "objectives": 0.10,
+        "vision": 0.05,
+        "discipline": 0.05,
+    },
+    "JUNGLE": {
+        "objectives": 0.30,
+        "macro": 0.20,
+        "laning": 0.10,
+        "economy": 0.10,
+        "damage": 0.10,
+        "vision": 0.10,
+        "discipline": 0.10,
+    },
+    "MIDDLE": {
+        "laning": 0.28,
+        "damage": 0.20,
+        "economy": 0.18,
+        "macro": 0.14,
+        "objectives": 0.10,
+        "vision": 0.05,
+        "discipline": 0.05,
+    },
+    "BOTTOM": {
+        "economy": 0.25,
+        "damage": 0.22,
+        "laning": 0.22,
+        "objectives": 0.12,
+        "macro": 0.09,
+        "vision": 0.05,
+        "discipline": 0.05,
+    },
+    "UTILITY": {
+        "vision": 0.28,
+        "objectives": 0.20,
+        "macro": 0.14,
+        "laning": 0.14,
+        "damage": 0.12,
+        "economy": 0.06,
+        "discipline": 0.06,
+    },
     # Balanced: equal weights across domains
     "BALANCED": {d: (1.0 / len(DOMAINS)) for d in DOMAINS},
 }
 
-import os, json as _json
+import os
 from pathlib import Path as _Path
+
 from .config import _user_config_dir as _cfgdir  # type: ignore
 
 
@@ -379,7 +443,7 @@ def load_role_weights() -> Dict[str, Dict[str, float]]:
         p = _Path(path)
         if not p.exists():
             return _DEFAULT_ROLE_WEIGHTS
-        data = _json.loads(p.read_text(encoding="utf-8"))
+        data = codec.json_loads(p.read_bytes())
         roles = data.get("roles") if isinstance(data, dict) else data
         if not isinstance(roles, dict):
             return _DEFAULT_ROLE_WEIGHTS
@@ -390,7 +454,8 @@ def load_role_weights() -> Dict[str, Dict[str, float]]:
             if tot <= 0:
                 return _DEFAULT_ROLE_WEIGHTS
         return out
-    except Exception:
+    except (OSError, ValueError, TypeError, AttributeError):
+        # Unreadable, malformed or non-numeric weights file
         return _DEFAULT_ROLE_WEIGHTS
 
 
@@ -402,7 +467,23 @@ def _huber_clip_z(z: float, k: float = 2.5) -> float:
     return _clip(z, -k, k)
 
 
-def _standardize(store: Store, puuid: str, queue: Optional[int], role: Optional[str], metrics: Dict[str, float], huber_k: float = 2.5) -> Tuple[Dict[str, float], Dict[str, Tuple[float, float]]]:
+def _standardize(
+    store: Store,
+    puuid: str,
+    queue: Optional[int],
+    role: Optional[str],
+    metrics: Dict[str, float],
+    huber_k: float = 2.5,
+    state: Optional[GisState] = None,
+) -> Tuple[Dict[str, float], Dict[str, Tuple[float, float]]]:
+    """z per metric against the player's EWMA baselines, updating them with this match.
+
+    With ``state`` the baselines are read from and recorded on it (the caller saves
+    it); otherwise they are loaded and written back here in one round-trip each.
+    """
+    own_state = state is None
+    if own_state:
+        state = store.load_gis_state(puuid, queue, role)
     out: Dict[str, float] = {}
     states: Dict[str, Tuple[float, float]] = {}
     alpha = _alpha_from_hl(HL_METRIC)
@@ -413,56 +494,57 @@ def _standardize(store: Store, puuid: str, queue: Optional[int], role: Optional[
         EPS_SIGMA = 0.5
     # Sensitivity floors for early calibration (smaller = more sensitive)
     eps_map = {
-        "gd10": 20.0, "gd15": 25.0, "xpd10": 20.0, "xpd15": 25.0,
-        "csd10": 0.5, "csd14": 0.5, "csmin14": 0.1,
-        "dpm": 20.0, "gpm": 10.0, "damage_share": 1.0,
-        "obj_participation": 2.0, "obj_near": 0.3,
-        "vision_per_min": 0.05, "wards_killed": 0.1, "ctrl_wards_pre14": 0.1,
-        "early_deaths_pre10": 0.1, "time_dead_per_min": 0.5,
-        "mythic_at_s": 15.0, "two_item_at_s": 15.0, "kp_early": 3.0,
-        "dmg_obj": 20.0, "dmg_turrets": 20.0,
+        "gd10": 20.0,
+        "gd15": 25.0,
+        "xpd10": 20.0,
+        "xpd15": 25.0,
+        "csd10": 0.5,
+        "csd14": 0.5,
+        "csmin14": 0.1,
+        "dpm": 20.0,
+        "gpm": 10.0,
+        "damage_share": 1.0,
+        "obj_participation": 2.0,
+        "obj_near": 0.3,
+        "vision_per_min": 0.05,
+        "wards_killed": 0.1,
+        "ctrl_wards_pre14": 0.1,
+        "early_deaths_pre10": 0.1,
+        "time_dead_per_min": 0.5,
+        "mythic_at_s": 15.0,
+        "two_item_at_s": 15.0,
+        "kp_early": 3.0,
+        "dmg_obj": 20.0,
+        "dmg_turrets": 20.0,
     }
-    def _load_norm_with_fallback(metric: str) -> Tuple[Optional[float], Optional[float]]:
-        # Try exact (queue, role), then relax role, then relax queue, then both
-        combos = [
-            (queue, role),
-            (None, role),
-            (queue, None),
-            (None, None),
-        ]
-        for q, r in combos:
-            mu, var = store.load_norm(puuid, q, r, metric)
-            if mu is not None and var is not None:
-                return mu, var
-        return None, None
-
     for m, x in metrics.items():
-        mu, var = store.load_norm(puuid, queue, role, m)
-        if mu is None or var is None:
-            # try fallback states
-            fmu, fvar = _load_norm_with_fallback(m)
-            if fmu is not None and fvar is not None:
-                mu, var = fmu, fvar
+        # Exact (queue, role), then relax role, then relax queue, then both
+        mu, var = state.norm(m)
         seeded = False
         if mu is None or var is None:
-            # Seed with current value and a small variance to avoid div-by-zero; we will warm over first few matches
+            # Seed with current value and a small variance to avoid div-by-zero;
+            # we will warm over first few matches
             mu = float(x)
             var = float(eps_map.get(m, 1.0)) ** 2
             seeded = True
         # Compute z against PRE-update state to avoid collapsing to zero for first/early matches
-        std_prev = (var ** 0.5) if var > 1e-6 else float(eps_map.get(m, 1.0))
+        std_prev = (var**0.5) if var > 1e-6 else float(eps_map.get(m, 1.0))
         sigma_prev = max(std_prev, EPS_SIGMA)
         z_prev = (float(x) - mu) / max(sigma_prev, 1e-6)
         out[m] = _huber_clip_z(z_prev, huber_k)
         # Update EWMA mean/var with current x (after z computed)
         mu_new = mu + alpha * (float(x) - mu)
         var_new = (1.0 - alpha) * (var + alpha * (float(x) - mu) ** 2)
-        store.upsert_norm(puuid, queue, role, m, mu_new, var_new)
+        state.set_norm(m, mu_new, var_new)
         states[m] = (mu_new, var_new)
+    if own_state:
+        store.save_gis_state(state)
     return out, states
 
 
-def _domain_inst_scores(role: Optional[str], z: Dict[str, float]) -> Tuple[Dict[str, float], Dict[str, Dict[str, float]]]:
+def _domain_inst_scores(
+    role: Optional[str], z: Dict[str, float]
+) -> Tuple[Dict[str, float], Dict[str, Dict[str, float]]]:
     """Compute per-domain instantaneous 0-100 scores and include per-metric contributions for debugging."""
     role_key = (role or "").upper()
     Wd = DOMAIN_METRIC_WEIGHTS
@@ -514,7 +596,10 @@ def update_scores_for_match(store: Store, puuid: str, match_id: str) -> Optional
     """
     # Load basic context
     with store.connect() as con:
-        m = con.execute("SELECT * FROM matches WHERE match_id=?", (match_id,)).fetchone()
+        con.row_factory = __import__("sqlite3").Row
+        m = con.execute(
+            "SELECT * FROM matches WHERE match_id=? AND puuid=?", (match_id, puuid)
+        ).fetchone()
         if not m:
             return None
     queue_id = int(m["queue_id"] or 0)
@@ -522,7 +607,9 @@ def update_scores_for_match(store: Store, puuid: str, match_id: str) -> Optional
     # Queue gating: only ranked SR by config (and skip ARAM/custom defensively)
     try:
         cfg_local = get_config()
-        ranked_qs = set(int(x) for x in (cfg_local.get("gis", {}).get("rankedQueues") or [420, 440]))
+        ranked_qs = set(
+            int(x) for x in (cfg_local.get("gis", {}).get("rankedQueues") or [420, 440])
+        )
     except Exception:
         ranked_qs = {420, 440}
     if (queue_id not in ranked_qs) or (queue_id in (450, 460, 490)):
@@ -539,20 +626,20 @@ def update_scores_for_match(store: Store, puuid: str, match_id: str) -> Optional
     try:
         key = f"patch_ease:{puuid}:{queue_id}:{role or ''}"
         raw = store.get_meta(key)
-        import json as _json
-        state = _json.loads(raw) if raw else None
+        state = codec.json_loads(raw) if raw else None
         if (state or {}).get("patch") != current_patch:
             state = {"patch": current_patch, "remain": 3}
         if (state or {}).get("remain", 0) > 0:
             huber_k = 3.0
             state["remain"] = int(state.get("remain", 0)) - 1
-        store.set_meta(key, _json.dumps(state))
+        store.set_meta(key, codec.json_dumps(state))
     except Exception:
         pass
 
     # Standardize vs personal baselines for this (queue, role)
     # Use queue exactly; do not bleed across queues
-    z, states = _standardize(store, puuid, queue_id, role, vals, huber_k=huber_k)
+    gs = store.load_gis_state(puuid, queue_id, role)
+    z, states = _standardize(store, puuid, queue_id, role, vals, huber_k=huber_k, state=gs)
 
     # Domain inst 0..100
     inst_domains, per_metric_contrib = _domain_inst_scores(role, z)
@@ -560,9 +647,11 @@ def update_scores_for_match(store: Store, puuid: str, match_id: str) -> Optional
     # Champion mastery guardrail: cap negative per-domain impact if champion is low mastery
     try:
         champ_id = int(m["champion_id"] or 0)
-        if champ_id and _is_low_mastery(puuid, champ_id):
+        if champ_id and _is_low_mastery(puuid, champ_id, store):
             try:
-                cap = float((get_config().get("gis", {}) or {}).get("maxNegativeImpactLowMastery", 3.0))
+                cap = float(
+                    (get_config().get("gis", {}) or {}).get("maxNegativeImpactLowMastery", 3.0)
+                )
             except Exception:
                 cap = 3.0
             for d in list(inst_domains.keys()):
@@ -573,23 +662,26 @@ def update_scores_for_match(store: Store, puuid: str, match_id: str) -> Optional
 
     # Smooth domain scores
     alpha_d = _alpha_from_hl(HL_DOMAIN)
+    z_by_domain: Dict[str, Dict[str, float]] = {}
     for d, inst_val in inst_domains.items():
-        prev = store.load_domain_score(puuid, queue_id, role, d) or 50.0
+        prev = gs.domains.get(d) or 50.0
         new = prev + r * alpha_d * (inst_val - prev)
-        store.upsert_domain_score(puuid, queue_id, role, d, new)
-        # Write inst contribution for drill-down, including z map of the metrics used in this domain
-        z_for_domain = {m: z[m] for m in DOMAIN_METRIC_WEIGHTS.get(d, {}).keys() if m in z}
-        store.upsert_inst_contrib(match_id, puuid, d, inst_val, json.dumps(z_for_domain))
+        gs.set_domain(d, new)
+        # Inst contribution for drill-down, including z map of the metrics used in this domain
+        z_by_domain[d] = {m: z[m] for m in DOMAIN_METRIC_WEIGHTS.get(d, {}).keys() if m in z}
 
     # Overall inst and smoothing with clamp on delta
     inst_overall = _overall_inst(role, inst_domains)
-    prev_overall = store.load_overall_score(puuid, queue_id, role) or 50.0
+    prev_overall = gs.overall or 50.0
     alpha_o = _alpha_from_hl(HL_OVERALL)
     # Clamp per-match overall delta before smoothing to +/- 6 points
     delta = inst_overall - prev_overall
     delta = _clip(delta, -6.0, 6.0)
     new_overall = prev_overall + r * alpha_o * delta
-    store.upsert_overall_score(puuid, queue_id, role, new_overall)
+    gs.set_overall(new_overall)
+    with store.transaction():
+        store.save_gis_state(gs)
+        store.upsert_inst_contrib_bulk(match_id, puuid, inst_domains, z_by_domain)
 
     return {
         "queue": queue_id,
@@ -609,29 +701,39 @@ def process_new_matches(store: Store, puuid: str, queue_filter: Optional[int] =
         mid = r["match_id"]
         if store.seen_inst_for_match(mid, puuid):
             continue
-        res = update_scores_for_match(store, puuid, mid)
+        prefetch_mastery(store, puuid)
+        with store.transaction():
+            res = update_scores_for_match(store, puuid, mid)
         if res is not None:
             done += 1
     return done
 
 
-def achilles_and_secondary(store: Store, puuid: str, queue: Optional[int], role: Optional[str], last_n: int = 8, ranked_queues: Optional[List[int]] = None) -> Dict[str, Any]:
+def achilles_and_secondary(
+    store: Store,
+    puuid: str,
+    queue: Optional[int],
+    role: Optional[str],
+    last_n: int = 8,
+    ranked_queues: Optional[List[int]] = None,
+) -> Dict[str, Any]:
     """Compute Achilles heel and secondary domains based on recent inst deficits with hysteresis-like rule.
 
     Uses last N matches' inst_contrib for this (player, queue, role).
     """
     import sqlite3
+
     with store.connect() as con:
         con.row_factory = sqlite3.Row
         base = (
             "SELECT i.match_id, i.domain, i.inst_score "
-            "FROM inst_contrib i JOIN matches m ON m.match_id = i.match_id "
+            "FROM inst_contrib i JOIN matches m ON m.match_id = i.match_id AND m.puuid = i.puuid "
             "WHERE i.puuid=? "
         )
         params: list[Any] = [puuid]
         rq = list(int(x) for x in (ranked_queues or [420, 440]))
         if rq:
-            base += f"AND m.queue_id IN ({','.join(['?']*len(rq))}) "
+            base += f"AND m.queue_id IN ({','.join(['?'] * len(rq))}) "
             params.extend(rq)
         if queue is not None:
             base += "AND m.queue_id=? "
@@ -680,7 +782,11 @@ def achilles_and_secondary(store: Store, puuid: str, queue: Optional[int], role:
         if val <= -4.0 and stable >= 3:
             primary = cand
     secondary = [d for d, v in ordered[1:3] if v <= -2.0]
-    return {"primary": primary, "secondary": secondary, "deficits": {d: round(v, 2) for d, v in ordered}}
+    return {
+        "primary": primary,
+        "secondary": secondary,
+        "deficits": {d: round(v, 2) for d, v in ordered},
+    }
 
 
 # ---- On-demand per-match computation (no ranked gating) ----
@@ -696,14 +802,17 @@ def role_of(match: Dict[str, Any], puuid: str) -> Optional[str]:
         return None
 
 
-def compute_z_for_match(match: Dict[str, Any], timeline: Dict[str, Any], puuid: str) -> Dict[str, float]:
+def compute_z_for_match(
+    match: Dict[str, Any], timeline: Dict[str, Any], puuid: str
+) -> Dict[str, float]:
     """Compute z-scores for metrics of a single match vs player's baselines.
 
     Internally persists updated EWMA state; deterministic for given inputs and baseline state.
     """
     # Temporarily persist raw to leverage existing feature extraction helpers
     st = Store()
-    # Try to get matchId from payload; if absent, caller should already have persisted or extracted features
+    # Try to get matchId from payload; if absent, caller should already have
+    # persisted or extracted features
     mid = (match.get("metadata") or {}).get("matchId") or None
     if mid:
         try:
@@ -719,9 +828,9 @@ def compute_z_for_match(match: Dict[str, Any], timeline: Dict[str, Any], puuid:
                 patch=str(info.get("gameVersion", "")).split(" ")[0],
                 role=me.get("teamPosition") or None,
                 champion_id=int(me.get("championId") or 0),
-                raw_json=json.dumps(match),
+                raw_json=codec.json_dumps(match),
             )
-            st.upsert_timeline_raw(str(mid), json.dumps(timeline or {}))
+            st.upsert_timeline_raw(str(mid), codec.json_dumps(timeline or {}))
         except Exception:
             pass
         vals, meta = _extract_features(st, str(mid), puuid)
@@ -732,13 +841,13 @@ def compute_z_for_match(match: Dict[str, Any], timeline: Dict[str, Any], puuid:
             queue_id = int((match.get("info") or {}).get("queueId") or 0)
             key = f"patch_ease:{puuid}:{queue_id}:{(meta.get('role') or '')}"
             raw = st.get_meta(key)
-            state = json.loads(raw) if raw else None
+            state = codec.json_loads(raw) if raw else None
             if (state or {}).get("patch") != current_patch:
                 state = {"patch": current_patch, "remain": 3}
             if (state or {}).get("remain", 0) > 0:
                 huber_k = 3.0
                 state["remain"] = int(state.get("remain", 0)) - 1
-            st.set_meta(key, json.dumps(state))
+            st.set_meta(key, codec.json_dumps(state))
         except Exception:
             pass
         qid = int(meta.get("queue_id") or ((match.get("info") or {}).get("queueId") or 0))
@@ -826,150 +935,103 @@ def ensure_inst_contrib(match_id: str, puuid: str, force: bool = False) -> Dict[
             patch=str(info.get("gameVersion", "")).split(" ")[0],
             role=me.get("teamPosition") or None,
             champion_id=int(me.get("championId") or 0),
-            raw_json=json.dumps(m),
+            raw_json=codec.json_dumps(m),
         )
         match = m
     if not timeline:
         cfg = get_config()
         rc = RiotClient.from_config(cfg, kind="fg")
         tl = rc.get_timeline(match_id)
-        store.upsert_timeline_raw(match_id, json.dumps(tl))
+        store.upsert_timeline_raw(match_id, codec.json_dumps(tl))
         timeline = tl
 
-    # Compute features and z-scores (queue/role aware)
-    # Use internal extractor to also populate extras cache if missing
-    vals, meta = _extract_features(store, match_id, puuid)
-    role = meta.get("role") or role_of(match, puuid)
-    queue_id = int(meta.get("queue_id") or (match.get("info", {}).get("queueId") or 0))
+    # One transaction for the extras cache, patch-ease state and inst rows
+    with store.transaction():
+        # Compute features and z-scores (queue/role aware)
+        # Use internal extractor to also populate extras cache if missing
+        vals, meta = _extract_features(store, match_id, puuid)
+        role = meta.get("role") or role_of(match, puuid)
+        queue_id = int(meta.get("queue_id") or (match.get("info", {}).get("queueId") or 0))
 
-    # Patch-change easing for Huber threshold
-    huber_k = 2.5
-    try:
-        current_patch = str((match.get("info") or {}).get("gameVersion", "")).split(" ")[0]
-        key_pe = f"patch_ease:{puuid}:{queue_id}:{role or ''}"
-        raw = store.get_meta(key_pe)
-        state = json.loads(raw) if raw else None
-        if (state or {}).get("patch") != current_patch:
-            state = {"patch": current_patch, "remain": 3}
-        if (state or {}).get("remain", 0) > 0:
-            huber_k = 3.0
-            state["remain"] = int(state.get("remain", 0)) - 1
-        store.set_meta(key_pe, json.dumps(state))
-    except Exception:
-        pass
+        # Patch-change easing for Huber threshold
+        huber_k = 2.5
+        try:
+            current_patch = str((match.get("info") or {}).get("gameVersion", "")).split(" ")[0]
+            key_pe = f"patch_ease:{puuid}:{queue_id}:{role or ''}"
+            raw = store.get_meta(key_pe)
+            state = codec.json_loads(raw) if raw else None
+            if (state or {}).get("patch") != current_patch:
+                state = {"patch": current_patch, "remain": 3}
+            if (state or {}).get("remain", 0) > 0:
+                huber_k = 3.0
+                state["remain"] = int(state.get("remain", 0)) - 1
+            store.set_meta(key_pe, codec.json_dumps(state))
+        except Exception:
+            pass
 
-    z, _ = _standardize(store, puuid, queue_id, role, vals, huber_k=huber_k)
+        z, _ = _standardize(store, puuid, queue_id, role, vals, huber_k=huber_k)
 
-    # If everything sits at exactly baseline (50) despite inputs being present,
-    # derive z from historical matches prior to this match time to avoid first-sample collapse.
-    try:
-        m_info = (match.get("info") or {})
-        ms = int(m_info.get("gameCreation") or 0)
-        # Detect flat output (all ~0 z or all domain inst ~ 50)
-        flat = all(abs(z.get(k, 0.0)) < 1e-9 for k in z.keys())
-        if flat and ms:
-            # Build z from history
-            import sqlite3 as _sqlite3
-            with store.connect() as con:
-                con.row_factory = _sqlite3.Row
-                q = (
-                    "SELECT m.game_creation_ms, mx.gd10, mx.xpd10, mx.csmin14, mx.ctrl_wards_pre14, mx.kp_early, "
-                    "       ex.dpm, ex.gpm, ex.obj_participation, ex.mythic_at_s, ex.two_item_at_s, ex.vision_per_min, ex.wards_killed, ex.roam_distance_pre14 "
-                    "FROM matches m "
-                    "LEFT JOIN metrics mx ON mx.match_id = m.match_id "
-                    "LEFT JOIN metrics_extras ex ON ex.match_id = m.match_id "
-                    "WHERE m.puuid=? AND m.game_creation_ms<? AND (? IS NULL OR m.queue_id=?) AND (? IS NULL OR m.role=?) "
-                    "ORDER BY m.game_creation_ms DESC LIMIT 50"
-                )
-                rows = con.execute(q, (puuid, ms, queue_id, queue_id, role, role)).fetchall()
-            if rows:
-                import statistics as _stats
-                def series_of(metric: str) -> list[float]:
-                    arr = []
-                    for r in rows:
-                        v = None
-                        if metric == "gd10": v = r["gd10"]
-                        elif metric == "xpd10": v = r["xpd10"]
-                        elif metric == "csmin14": v = r["csmin14"]
-                        elif metric == "ctrl_wards_pre14": v = r["ctrl_wards_pre14"]
-                        elif metric == "kp_early": v = r["kp_early"]
-                        elif metric == "dpm": v = r["dpm"]
-                        elif metric == "gpm": v = r["gpm"]
-                        elif metric == "obj_participation": v = r["obj_participation"]
-                        elif metric == "mythic_at_s": v = r["mythic_at_s"]
-                        elif metric == "two_item_at_s": v = r["two_item_at_s"]
-                        elif metric == "vision_per_min": v = r["vision_per_min"]
-                        elif metric == "wards_killed": v = r["wards_killed"]
-                        elif metric == "roam_distance_pre14": v = r["roam_distance_pre14"]
-                        if v is None:
-                            continue
-                        try:
-                            arr.append(float(v))
-                        except Exception:
-                            continue
-                    return arr
-                def robust_std(arr: list[float], floor: float) -> float:
-                    if not arr:
-                        return floor
-                    med = _stats.median(arr)
-                    mad = _stats.median([abs(x - med) for x in arr]) if arr else 0.0
-                    rs = 1.4826 * mad
-                    return max(rs, floor)
-                eps_map = {
-                    "gd10": 50.0, "xpd10": 50.0, "csmin14": 0.2,
-                    "dpm": 50.0, "gpm": 20.0,
-                    "obj_participation": 5.0, "vision_per_min": 0.1, "wards_killed": 0.2, "ctrl_wards_pre14": 0.2,
-                    "mythic_at_s": 30.0, "two_item_at_s": 30.0, "kp_early": 5.0, "roam_distance_pre14": 50.0,
-                }
-                z_hist: Dict[str, float] = {}
-                for mkey, xval in vals.items():
-                    if mkey not in eps_map:
-                        continue
-                    arr = series_of(mkey)
-                    if not arr:
-                        continue
-                    med = _stats.median(arr)
-                    sigma = robust_std(arr, eps_map[mkey])
-                    try:
-                        z_hist[mkey] = (float(xval) - float(med)) / max(sigma, 1e-6)
-                    except Exception:
-                        pass
-                if z_hist:
-                    z = z_hist
-            else:
-                # Fallback: no prior rows before this match; use up to 50 other matches (any time) as baseline
+        # If everything sits at exactly baseline (50) despite inputs being present,
+        # derive z from historical matches prior to this match time to avoid first-sample collapse.
+        try:
+            m_info = match.get("info") or {}
+            ms = int(m_info.get("gameCreation") or 0)
+            # Detect flat output (all ~0 z or all domain inst ~ 50)
+            flat = all(abs(z.get(k, 0.0)) < 1e-9 for k in z.keys())
+            if flat and ms:
+                # Build z from history
                 import sqlite3 as _sqlite3
+
                 with store.connect() as con:
                     con.row_factory = _sqlite3.Row
                     q = (
-                        "SELECT m.game_creation_ms, mx.gd10, mx.xpd10, mx.csmin14, mx.ctrl_wards_pre14, mx.kp_early, "
-                        "       ex.dpm, ex.gpm, ex.obj_participation, ex.mythic_at_s, ex.two_item_at_s, ex.vision_per_min, ex.wards_killed, ex.roam_distance_pre14 "
+                        "SELECT m.game_creation_ms, mx.gd10, mx.xpd10, mx.csmin14, "
+                        "       mx.ctrl_wards_pre14, mx.kp_early, "
+                        "       ex.dpm, ex.gpm, ex.obj_participation, "
+                        "       ex.mythic_at_s, ex.two_item_at_s, "
+                        "       ex.vision_per_min, ex.wards_killed, ex.roam_distance_pre14 "
                         "FROM matches m "
-                        "LEFT JOIN metrics mx ON mx.match_id = m.match_id "
-                        "LEFT JOIN metrics_extras ex ON ex.match_id = m.match_id "
-                        "WHERE m.puuid=? AND m.match_id<>? AND (? IS NULL OR m.queue_id=?) AND (? IS NULL OR m.role=?) "
+                        "LEFT JOIN metrics mx ON mx.match_id = m.match_id AND mx.puuid = m.puuid "
+                        "LEFT JOIN metrics_extras ex "
+                        "ON ex.match_id = m.match_id AND ex.puuid = m.puuid "
+                        "WHERE m.puuid=? AND m.game_creation_ms<? "
+                        "AND (? IS NULL OR m.queue_id=?) AND (? IS NULL OR m.role=?) "
                         "ORDER BY m.game_creation_ms DESC LIMIT 50"
                     )
-                    rows_any = con.execute(q, (puuid, match_id, queue_id, queue_id, role, role)).fetchall()
-                if rows_any:
+                    rows = con.execute(q, (puuid, ms, queue_id, queue_id, role, role)).fetchall()
+                if rows:
                     import statistics as _stats
-                    def series_of_any(metric: str) -> list[float]:
+
+                    def series_of(metric: str) -> list[float]:
                         arr = []
-                        for r in rows_any:
+                        for r in rows:
                             v = None
-                            if metric == "gd10": v = r["gd10"]
-                            elif metric == "xpd10": v = r["xpd10"]
-                            elif metric == "csmin14": v = r["csmin14"]
-                            elif metric == "ctrl_wards_pre14": v = r["ctrl_wards_pre14"]
-                            elif metric == "kp_early": v = r["kp_early"]
-                            elif metric == "dpm": v = r["dpm"]
-                            elif metric == "gpm": v = r["gpm"]
-                            elif metric == "obj_participation": v = r["obj_participation"]
-                            elif metric == "mythic_at_s": v = r["mythic_at_s"]
-                            elif metric == "two_item_at_s": v = r["two_item_at_s"]
-                            elif metric == "vision_per_min": v = r["vision_per_min"]
-                            elif metric == "wards_killed": v = r["wards_killed"]
-                            elif metric == "roam_distance_pre14": v = r["roam_distance_pre14"]
+                            if metric == "gd10":
+                                v = r["gd10"]
+                            elif metric == "xpd10":
+                                v = r["xpd10"]
+                            elif metric == "csmin14":
+                                v = r["csmin14"]
+                            elif metric == "ctrl_wards_pre14":
+                                v = r["ctrl_wards_pre14"]
+                            elif metric == "kp_early":
+                                v = r["kp_early"]
+                            elif metric == "dpm":
+                                v = r["dpm"]
+                            elif metric == "gpm":
+                                v = r["gpm"]
+                            elif metric == "obj_participation":
+                                v = r["obj_participation"]
+                            elif metric == "mythic_at_s":
+                                v = r["mythic_at_s"]
+                            elif metric == "two_item_at_s":
+                                v = r["two_item_at_s"]
+                            elif metric == "vision_per_min":
+                                v = r["vision_per_min"]
+                            elif metric == "wards_killed":
+                                v = r["wards_killed"]
+                            elif metric == "roam_distance_pre14":
+                                v = r["roam_distance_pre14"]
                             if v is None:
                                 continue
                             try:
@@ -977,56 +1039,171 @@ def ensure_inst_contrib(match_id: str, puuid: str, force: bool = False) -> Dict[
                             except Exception:
                                 continue
                         return arr
-                    def robust_std_any(arr: list[float], floor: float) -> float:
+
+                    def robust_std(arr: list[float], floor: float) -> float:
                         if not arr:
                             return floor
                         med = _stats.median(arr)
                         mad = _stats.median([abs(x - med) for x in arr]) if arr else 0.0
                         rs = 1.4826 * mad
                         return max(rs, floor)
+
                     eps_map = {
-                        "gd10": 50.0, "xpd10": 50.0, "csmin14": 0.2,
-                        "dpm": 50.0, "gpm": 20.0,
-                        "obj_participation": 5.0, "vision_per_min": 0.1, "wards_killed": 0.2, "ctrl_wards_pre14": 0.2,
-                        "mythic_at_s": 30.0, "two_item_at_s": 30.0, "kp_early": 5.0, "roam_distance_pre14": 50.0,
+                        "gd10": 50.0,
+                        "xpd10": 50.0,
+                        "csmin14": 0.2,
+                        "dpm": 50.0,
+                        "gpm": 20.0,
+                        "obj_participation": 5.0,
+                        "vision_per_min": 0.1,
+                        "wards_killed": 0.2,
+                        "ctrl_wards_pre14": 0.2,
+                        "mythic_at_s": 30.0,
+                        "two_item_at_s": 30.0,
+                        "kp_early": 5.0,
+                        "roam_distance_pre14": 50.0,
                     }
                     z_hist: Dict[str, float] = {}
                     for mkey, xval in vals.items():
                         if mkey not in eps_map:
                             continue
-                        arr = series_of_any(mkey)
+                        arr = series_of(mkey)
                         if not arr:
                             continue
                         med = _stats.median(arr)
-                        sigma = robust_std_any(arr, eps_map[mkey])
+                        sigma = robust_std(arr, eps_map[mkey])
                         try:
                             z_hist[mkey] = (float(xval) - float(med)) / max(sigma, 1e-6)
                         except Exception:
                             pass
                     if z_hist:
                         z = z_hist
-    except Exception:
-        pass
+                else:
+                    # Fallback: no prior rows before this match; use up to 50 other matches
+                    # (any time) as baseline
+                    import sqlite3 as _sqlite3
+
+                    with store.connect() as con:
+                        con.row_factory = _sqlite3.Row
+                        q = (
+                            "SELECT m.game_creation_ms, mx.gd10, mx.xpd10, mx.csmin14, "
+                            "       mx.ctrl_wards_pre14, mx.kp_early, "
+                            "       ex.dpm, ex.gpm, ex.obj_participation, "
+                            "       ex.mythic_at_s, ex.two_item_at_s, "
+                            "       ex.vision_per_min, ex.wards_killed, ex.roam_distance_pre14 "
+                            "FROM matches m "
+                            "LEFT JOIN metrics mx "
+                            "ON mx.match_id = m.match_id AND mx.puuid = m.puuid "
+                            "LEFT JOIN metrics_extras ex "
+                            "ON ex.match_id = m.match_id AND ex.puuid = m.puuid "
+                            "WHERE m.puuid=? AND m.match_id<>? "
+                            "AND (? IS NULL OR m.queue_id=?) AND (? IS NULL OR m.role=?) "
+                            "ORDER BY m.game_creation_ms DESC LIMIT 50"
+                        )
+                        rows_any = con.execute(
+                            q, (puuid, match_id, queue_id, queue_id, role, role)
+                        ).fetchall()
+                    if rows_any:
+                        import statistics as _stats
+
+                        def series_of_any(metric: str) -> list[float]:
+                            arr = []
+                            for r in rows_any:
+                                v = None
+                                if metric == "gd10":
+                                    v = r["gd10"]
+                                elif metric == "xpd10":
+                                    v = r["xpd10"]
+                                elif metric == "csmin14":
+                                    v = r["csmin14"]
+                                elif metric == "ctrl_wards_pre14":
+                                    v = r["ctrl_wards_pre14"]
+                                elif metric == "kp_early":
+                                    v = r["kp_early"]
+                                elif metric == "dpm":
+                                    v = r["dpm"]
+                                elif metric == "gpm":
+                                    v = r["gpm"]
+                                elif metric == "obj_participation":
+                                    v = r["obj_participation"]
+                                elif metric == "mythic_at_s":
+                                    v = r["mythic_at_s"]
+                                elif metric == "two_item_at_s":
+                                    v = r["two_item_at_s"]
+                                elif metric == "vision_per_min":
+                                    v = r["vision_per_min"]
+                                elif metric == "wards_killed":
+                                    v = r["wards_killed"]
+                                elif metric == "roam_distance_pre14":
+                                    v = r["roam_distance_pre14"]
+                                if v is None:
+                                    continue
+                                try:
+                                    arr.append(float(v))
+                                except Exception:
+                                    continue
+                            return arr
+
+                        def robust_std_any(arr: list[float], floor: float) -> float:
+                            if not arr:
+                                return floor
+                            med = _stats.median(arr)
+                            mad = _stats.median([abs(x - med) for x in arr]) if arr else 0.0
+                            rs = 1.4826 * mad
+                            return max(rs, floor)
+
+                        eps_map = {
+                            "gd10": 50.0,
+                            "xpd10": 50.0,
+                            "csmin14": 0.2,
+                            "dpm": 50.0,
+                            "gpm": 20.0,
+                            "obj_participation": 5.0,
+                            "vision_per_min": 0.1,
+                            "wards_killed": 0.2,
+                            "ctrl_wards_pre14": 0.2,
+                            "mythic_at_s": 30.0,
+                            "two_item_at_s": 30.0,
+                            "kp_early": 5.0,
+                            "roam_distance_pre14": 50.0,
+                        }
+                        z_hist: Dict[str, float] = {}
+                        for mkey, xval in vals.items():
+                            if mkey not in eps_map:
+                                continue
+                            arr = series_of_any(mkey)
+                            if not arr:
+                                continue
+                            med = _stats.median(arr)
+                            sigma = robust_std_any(arr, eps_map[mkey])
+                            try:
+                                z_hist[mkey] = (float(xval) - float(med)) / max(sigma, 1e-6)
+                            except Exception:
+                                pass
+                        if z_hist:
+                            z = z_hist
+        except Exception:
+            pass
 
-    # Domain inst (0..100) - raw, no gating/clamps for this on-demand endpoint
-    inst_domains, _per_metric = _domain_inst_scores(role, z)
+        # Domain inst (0..100) - raw, no gating/clamps for this on-demand endpoint
+        inst_domains, _per_metric = _domain_inst_scores(role, z)
 
-    # Build per-domain z maps for persistence (only metrics used by that domain)
-    z_by_domain: Dict[str, Dict[str, float]] = {}
-    for d, metrics in DOMAIN_METRIC_WEIGHTS.items():
-        z_by_domain[d] = {}
-        for mname in metrics.keys():
-            if mname in z:
-                try:
-                    z_by_domain[d][mname] = float(z[mname])
-                except Exception:
-                    pass
+        # Build per-domain z maps for persistence (only metrics used by that domain)
+        z_by_domain: Dict[str, Dict[str, float]] = {}
+        for d, metrics in DOMAIN_METRIC_WEIGHTS.items():
+            z_by_domain[d] = {}
+            for mname in metrics.keys():
+                if mname in z:
+                    try:
+                        z_by_domain[d][mname] = float(z[mname])
+                    except Exception:
+                        pass
 
-    # Persist rows
-    store.upsert_inst_contrib_bulk(match_id, puuid, inst_domains, z_by_domain)
+        # Persist rows
+        store.upsert_inst_contrib_bulk(match_id, puuid, inst_domains, z_by_domain)
 
-    # Compute overall inst (role-weighted; no gating)
-    overall_inst = _overall_inst(role, inst_domains)
+        # Compute overall inst (role-weighted; no gating)
+        overall_inst = _overall_inst(role, inst_domains)
 
     # Release lock if held
     if acquired:
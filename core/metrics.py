@@ -1,20 +1,28 @@
 from __future__ import annotations
 
-import json
-from collections import defaultdict
-from dataclasses import dataclass
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from statistics import median
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from dateutil import parser as dateparser
 
-from .store import Store
+from . import codec
+from .frames import FrameMatrix, nearest_index
 from .riot import RiotClient
-
+from .schema import Match, Timeline
+from .store import Store
+from .summary import summarize
+from .timeline import ParsedTimeline
 
 MS = 1000
 
+_log = logging.getLogger(__name__)
+
 
 def _ts_ms(dt: datetime) -> int:
     return int(dt.replace(tzinfo=timezone.utc).timestamp() * 1000)
@@ -49,59 +57,27 @@ def cs_from_frame(pf: Dict[str, Any]) -> int:
 
 
 def find_frame_at(timeline: Dict[str, Any], ms: int) -> Dict[str, Any]:
+    # Repeated lookups should go through FrameMatrix, which keeps the timestamp index
     frames = timeline["info"]["frames"]
-    closest = min(frames, key=lambda f: abs(f.get("timestamp", 0) - ms))
-    return closest
+    i = nearest_index([int(f.get("timestamp", 0)) for f in frames], ms)
+    if i is None:
+        raise ValueError("timeline has no frames")
+    return frames[i]
 
 
 def lane_opponent_id(match: Dict[str, Any], timeline: Dict[str, Any], pid: int) -> Optional[int]:
-    parts = match["info"]["participants"]
-    me = next(p for p in parts if p["participantId"] == pid)
-    my_team = me["teamId"]
-    my_pos = me.get("teamPosition")
-    if my_pos and my_pos != "UTILITY" and my_pos != "":
-        enemies = [p for p in parts if p["teamId"] != my_team and p.get("teamPosition") == my_pos]
-        if enemies:
-            return enemies[0]["participantId"]
-    # fallback: proximity 02:00–10:00
-    frames = [f for f in timeline["info"]["frames"] if 120*MS <= f.get("timestamp", 0) <= 600*MS]
-    dists: Dict[int, List[float]] = defaultdict(list)
-    for f in frames:
-        pfs = f.get("participantFrames", {})
-        mepf = pfs.get(str(pid)) or pfs.get(pid) or {}
-        mp = mepf.get("position") or {}
-        mx, my = mp.get("x"), mp.get("y")
-        if mx is None or my is None:
-            continue
-        for eid in range(1, 11):
-            if eid == pid:
-                continue
-            epf = pfs.get(str(eid)) or pfs.get(eid) or {}
-            ep = epf.get("position") or {}
-            ex, ey = ep.get("x"), ep.get("y")
-            if ex is None or ey is None:
-                continue
-            d = ((mx - ex) ** 2 + (my - ey) ** 2) ** 0.5
-            dists[eid].append(d)
-    if not dists:
-        return None
-    # choose enemy with min median distance
-    best = None
-    best_val = float("inf")
-    for eid, vals in dists.items():
-        part = next(p for p in parts if p["participantId"] == eid)
-        if part["teamId"] == me["teamId"]:
-            continue
-        med = median(vals)
-        if med < best_val:
-            best_val = med
-            best = eid
-    return best
+    # One-off lookup; callers computing several metrics share a ParsedTimeline instead
+    return ParsedTimeline.build(match, timeline).lane_opponent(pid)
 
 
-def compute_metrics(match: Dict[str, Any], timeline: Dict[str, Any], puuid: str) -> Dict[str, Any]:
+def compute_metrics(
+    match: Match,
+    timeline: Timeline,
+    puuid: str,
+    frames: Optional[FrameMatrix] = None,
+    parsed: Optional[ParsedTimeline] = None,
+) -> Dict[str, Any]:
     info = match.get("info", {})
-    parts = info.get("participants", [])
     mep = participant_by_puuid(match, puuid)
     pid = mep["participantId"]
     my_team = mep["teamId"]
@@ -113,22 +89,17 @@ def compute_metrics(match: Dict[str, Any], timeline: Dict[str, Any], puuid: str)
     game_duration_s = int(info.get("gameDuration", 0))
 
     # Timeline based metrics
-    f10 = find_frame_at(timeline, 10 * 60 * MS)
-    f14 = find_frame_at(timeline, 14 * 60 * MS)
-    pf10 = f10.get("participantFrames", {}).get(str(pid), {})
-    pf14 = f14.get("participantFrames", {}).get(str(pid), {})
-    cs10 = cs_from_frame(pf10)
-    cs14 = cs_from_frame(pf14)
+    pt = parsed if parsed is not None else ParsedTimeline.build(match, timeline, frames)
+    fm = pt.frames
+    cs10 = int(fm.value_at("cs", 10 * 60 * MS, pid))
+    cs14 = int(fm.value_at("cs", 14 * 60 * MS, pid))
     csmin10 = round(cs10 / 10.0, 2)
     csmin14 = round(cs14 / 14.0, 2)
 
     # Opponent mapping and diffs
-    opp_id = lane_opponent_id(match, timeline, pid)
-    gd10 = xpd10 = 0
-    if opp_id:
-        opp10 = f10.get("participantFrames", {}).get(str(opp_id), {})
-        gd10 = int((pf10.get("totalGold") or 0) - (opp10.get("totalGold") or 0))
-        xpd10 = int((pf10.get("xp") or 0) - (opp10.get("xp") or 0))
+    opp_id = pt.lane_opponent(pid)
+    gd10 = fm.diff_at("total_gold", 10 * 60 * MS, pid, opp_id)
+    xpd10 = fm.diff_at("xp", 10 * 60 * MS, pid, opp_id)
 
     # DL14 and events-derived metrics
     dl14 = 1
@@ -137,36 +108,25 @@ def compute_metrics(match: Dict[str, Any], timeline: Dict[str, Any], puuid: str)
     my_kills_pre14 = 0
     my_assists_pre14 = 0
     first_recall_s: Optional[int] = None
-    for frame in timeline.get("info", {}).get("frames", []):
-        for ev in frame.get("events", []) or []:
-            ts = int(ev.get("timestamp", 0))
-            if ev.get("type") == "CHAMPION_KILL":
-                if ts < 14 * 60 * MS:
-                    killer = ev.get("killerId")
-                    victim = ev.get("victimId")
-                    assists = ev.get("assistingParticipantIds") or []
-                    # team kills
-                    if killer and 1 <= killer <= 10:
-                        kp = next((p for p in parts if p["participantId"] == killer), None)
-                        if kp and kp["teamId"] == my_team:
-                            team_kills_pre14 += 1
-                    if victim == pid:
-                        dl14 = 0
-                    if killer == pid:
-                        my_kills_pre14 += 1
-                    if pid in assists:
-                        my_assists_pre14 += 1
-            elif ev.get("type") == "ITEM_PURCHASED":
-                if ev.get("participantId") == pid:
-                    if ts > 100 * 1000 and first_recall_s is None:
-                        first_recall_s = int(ts / 1000)
-                    if ts < 14 * 60 * 1000:
-                        if int(ev.get("itemId") or 0) == 2055:
-                            ctrl_wards_pre14 += 1
-            elif ev.get("type") == "WARD_PLACED":
-                if ts < 14 * 60 * 1000 and ev.get("creatorId") == pid and ev.get("wardType") == "CONTROL_WARD":
-                    # we track placed separately via WARD_PLACED further if needed
-                    pass
+    for ev in pt.of_type("CHAMPION_KILL"):
+        if int(ev.get("timestamp", 0)) >= 14 * 60 * MS:
+            continue
+        killer = ev.get("killerId")
+        # team kills
+        if killer and 1 <= killer <= 10 and pt.team_of(killer) == my_team:
+            team_kills_pre14 += 1
+        if ev.get("victimId") == pid:
+            dl14 = 0
+        if killer == pid:
+            my_kills_pre14 += 1
+        if pid in (ev.get("assistingParticipantIds") or []):
+            my_assists_pre14 += 1
+    for ev in pt.of("ITEM_PURCHASED", pid):
+        ts = int(ev.get("timestamp", 0))
+        if ts > 100 * 1000 and first_recall_s is None:
+            first_recall_s = int(ts / 1000)
+        if ts < 14 * 60 * 1000 and int(ev.get("itemId") or 0) == 2055:
+            ctrl_wards_pre14 += 1
 
     kp_early = 0.0
     if team_kills_pre14 > 0:
@@ -193,6 +153,318 @@ def compute_metrics(match: Dict[str, Any], timeline: Dict[str, Any], puuid: str)
     return row
 
 
+FETCH_WORKERS = 8  # concurrent match/timeline fetches; the rate limiter is the real ceiling
+WRITE_BATCH = 16  # parsed matches the writer may fold into one transaction
+
+
+@dataclass
+class StageStats:
+    """Counters for one pipeline stage (items handled and time spent working)."""
+
+    items: int = 0
+    busy_s: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, seconds: float, items: int = 1) -> None:
+        with self._lock:
+            self.items += items
+            self.busy_s += seconds
+
+
+@dataclass
+class IngestStats:
+    """Per-stage throughput for one ingest run (fetch → parse → write)."""
+
+    fetch: StageStats = field(default_factory=StageStats)
+    parse: StageStats = field(default_factory=StageStats)
+    write: StageStats = field(default_factory=StageStats)
+    skipped: int = 0
+    reused: int = 0  # matches already stored for another roster member (no API calls)
+    wall_s: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def count(self, name: str, n: int = 1) -> None:
+        # Bumped from the fetch workers and the parse thread
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def as_dict(self) -> Dict[str, Any]:
+        wall = max(self.wall_s, 1e-9)
+        out: Dict[str, Any] = {
+            "wall_s": round(self.wall_s, 3),
+            "skipped": self.skipped,
+            "reused": self.reused,
+        }
+        for name in ("fetch", "parse", "write"):
+            s: StageStats = getattr(self, name)
+            out[name] = {
+                "items": s.items,
+                "busy_s": round(s.busy_s, 3),
+                "per_sec": round(s.items / wall, 2),
+            }
+        return out
+
+
+@dataclass
+class _PlayerRows:
+    match_row: Dict[str, Any]
+    metrics_row: Dict[str, Any]
+    extras_row: Dict[str, Any]
+    summary_row: Optional[Dict[str, Any]] = None
+    context_row: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class _ParsedMatch:
+    match_id: str
+    match_raw: str
+    timeline_raw: str
+    frame_blob: Optional[bytes]
+    events_rows: List[Tuple]
+    players: List[_PlayerRows]
+    fresh: bool = True  # False when rebuilt from an already stored match/timeline
+
+
+class _StageFailure:
+    def __init__(self, exc: BaseException) -> None:
+        self.exc = exc
+
+
+_DONE = object()
+
+
+def _fetch_stage(
+    rc: RiotClient,
+    mid: str,
+    queue_filter: Optional[int],
+    stats: IngestStats,
+    store: Optional[Store] = None,
+) -> Optional[Tuple[str, Dict[str, Any], Dict[str, Any], bool]]:
+    t0 = time.perf_counter()
+    try:
+        if store is not None:
+            # Stored for another roster member: rebuild rows without touching the API. The full
+            # payload, not the load_match subset: it becomes the new member's raw_json
+            match = store.loads_raw(store.load_match_raw(mid), {})
+            timeline = store.load_timeline(mid) or {"info": {"frames": []}}
+            stats.count("reused")
+        else:
+            match = rc.get_match(mid)
+        info = match.get("info", {})
+        queue_id = int(info.get("queueId", 0))
+        if queue_filter is not None and queue_id != queue_filter:
+            return None
+        # skip remakes
+        if int(info.get("gameDuration", 0)) < 300:
+            return None
+        if store is not None:
+            return mid, match, timeline, False
+        timeline = rc.get_timeline(mid)
+        return mid, match, timeline, True
+    finally:
+        stats.fetch.add(time.perf_counter() - t0)
+
+
+def _event_rows(mid: str, events: List[Dict[str, Any]]) -> List[Tuple]:
+    events_rows: List[Tuple] = []
+    for ev in events:
+        events_rows.append(
+            (
+                mid,
+                int(ev.get("timestamp", 0)),
+                ev.get("type"),
+                int(ev.get("participantId")) if ev.get("participantId") is not None else None,
+                int(ev.get("killerId")) if ev.get("killerId") is not None else None,
+                int(ev.get("victimId")) if ev.get("victimId") is not None else None,
+                int(ev.get("itemId")) if ev.get("itemId") is not None else None,
+                ev.get("wardType"),
+            )
+        )
+    return events_rows
+
+
+def _player_rows(
+    mid: str,
+    match: Dict[str, Any],
+    timeline: Dict[str, Any],
+    puuid: str,
+    parsed: Optional[ParsedTimeline] = None,
+) -> _PlayerRows:
+    # Lazy import to avoid circular dependency
+    from .metrics_extras import compute_extras
+
+    info = match.get("info", {})
+    mep = participant_by_puuid(match, puuid)
+    pt = parsed if parsed is not None else ParsedTimeline.build(match, timeline)
+    match_row = {
+        "match_id": mid,
+        "puuid": puuid,
+        "queue_id": int(info.get("queueId", 0)),
+        "game_creation_ms": int(info.get("gameCreation", 0)),
+        "game_duration_s": int(info.get("gameDuration", 0)),
+        "patch": str(info.get("gameVersion", "")).split(" ")[0],
+        "role": mep.get("teamPosition") or None,
+        "champion_id": int(mep.get("championId", 0)),
+    }
+    row = compute_metrics(match, timeline, puuid, parsed=pt)
+    row["match_id"] = mid
+    # Compute extras (without Data Dragon; mythic/two-item may be 0)
+    extras = compute_extras(match, timeline, None, puuid, parsed=pt)
+    return _PlayerRows(
+        match_row=match_row,
+        metrics_row=row,
+        extras_row={"match_id": mid, **extras["extras_row"]},
+        summary_row=summarize(match, puuid),
+        context_row=pt.context(puuid),
+    )
+
+
+def _parse_match(
+    mid: str, match: Dict[str, Any], timeline: Dict[str, Any], fresh: bool, puuids: List[str]
+) -> _ParsedMatch:
+    """Derive shared rows once and per-player rows for every tracked player in the game."""
+    present = {p.get("puuid") for p in match.get("info", {}).get("participants", [])}
+    pt = ParsedTimeline.build(match, timeline)
+    players = [_player_rows(mid, match, timeline, pu, pt) for pu in puuids if pu in present]
+    return _ParsedMatch(
+        match_id=mid,
+        match_raw=codec.json_dumps(match),
+        timeline_raw=codec.json_dumps(timeline) if fresh else "",
+        frame_blob=pt.frames.to_blob() if fresh else None,
+        events_rows=_event_rows(mid, pt.events) if fresh else [],
+        players=players,
+        fresh=fresh,
+    )
+
+
+def _put(q: "queue.Queue[Any]", item: Any, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _parse_stage(
+    futures: List[Future],
+    out_q: "queue.Queue[Any]",
+    puuids: List[str],
+    stats: IngestStats,
+    stop: threading.Event,
+) -> None:
+    try:
+        for fut in as_completed(futures):
+            if stop.is_set():
+                return
+            fetched = fut.result()
+            if fetched is None:
+                stats.count("skipped")
+                continue
+            t0 = time.perf_counter()
+            parsed = _parse_match(*fetched, puuids)
+            stats.parse.add(time.perf_counter() - t0)
+            if not _put(out_q, parsed, stop):
+                return
+    except BaseException as e:  # surfaced to the writer, which re-raises on the caller's thread
+        _put(out_q, _StageFailure(e), stop)
+    finally:
+        _put(out_q, _DONE, stop)
+
+
+def _write_match(store: Store, pm: _ParsedMatch) -> None:
+    if pm.fresh:
+        store.upsert_timeline_raw(pm.match_id, pm.timeline_raw)
+        if pm.frame_blob:
+            store.upsert_frame_matrix(pm.match_id, pm.frame_blob)
+        store.replace_match_events(pm.match_id, pm.events_rows)
+    for pr in pm.players:
+        store.upsert_match_raw(raw_json=pm.match_raw, summary=pr.summary_row, **pr.match_row)
+        store.upsert_metrics(pm.match_id, pr.metrics_row)
+        store.upsert_metrics_extras(pm.match_id, pr.extras_row)
+        store.upsert_match_context(pm.match_id, pr.match_row["puuid"], pr.context_row)
+
+
+def ingest_match_ids(
+    rc: RiotClient,
+    store: Store,
+    puuid: str,
+    match_ids: Iterable[str],
+    queue_filter: Optional[int] = None,
+    workers: int = FETCH_WORKERS,
+    stats: Optional[IngestStats] = None,
+    roster: Optional[Iterable[str]] = None,
+) -> int:
+    """Fetch, parse and persist the given matches through a staged pipeline.
+
+    A bounded pool of fetch workers pulls match + timeline pairs (each request gated
+    by the process-wide rate limiter), a single parse thread derives rows and metrics,
+    and the calling thread is the only writer, committing whatever matches are ready
+    in one transaction. Each match is fetched once and yields rows for ``puuid`` and
+    every ``roster`` member who played in it; matches already stored are rebuilt from
+    the database instead of the API. Returns the number of matches written;
+    per-stage throughput is accumulated into ``stats`` when provided.
+    """
+    ids = list(dict.fromkeys(match_ids))
+    puuids = list(dict.fromkeys([puuid, *(roster or [])]))
+    st = stats if stats is not None else IngestStats()
+    if not ids:
+        return 0
+    t_start = time.perf_counter()
+    out_q: "queue.Queue[Any]" = queue.Queue(maxsize=max(2, workers * 2))
+    stop = threading.Event()
+    ingested = 0
+    pool = ThreadPoolExecutor(
+        max_workers=max(1, min(workers, len(ids))), thread_name_prefix="ingest-fetch"
+    )
+    try:
+        stored = store.known_match_ids(ids)
+        futures = [
+            pool.submit(_fetch_stage, rc, mid, queue_filter, st, store if mid in stored else None)
+            for mid in ids
+        ]
+        parser = threading.Thread(
+            target=_parse_stage,
+            args=(futures, out_q, puuids, st, stop),
+            name="ingest-parse",
+            daemon=True,
+        )
+        parser.start()
+        finished = False
+        while not finished:
+            batch = [out_q.get()]
+            # Fold whatever else is already parsed into the same transaction
+            while (
+                len(batch) < WRITE_BATCH
+                and batch[-1] is not _DONE
+                and not isinstance(batch[-1], _StageFailure)
+            ):
+                try:
+                    batch.append(out_q.get_nowait())
+                except queue.Empty:
+                    break
+            if isinstance(batch[-1], _StageFailure):
+                raise batch[-1].exc
+            if batch[-1] is _DONE:
+                finished = True
+                batch.pop()
+            if not batch:
+                continue
+            t0 = time.perf_counter()
+            with store.transaction():
+                for pm in batch:
+                    _write_match(store, pm)
+            st.write.add(time.perf_counter() - t0, items=len(batch))
+            ingested += len(batch)
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+        st.wall_s += time.perf_counter() - t_start
+        _log.debug("ingest: ingested=%s stages=%s", ingested, st.as_dict())
+    return ingested
+
+
 def ingest_and_compute_recent(
     rc: RiotClient,
     store: Store,
@@ -200,86 +472,74 @@ def ingest_and_compute_recent(
     since: Optional[str] = None,
     count: int = 20,
     queue_filter: Optional[int] = None,
+    workers: int = FETCH_WORKERS,
+    stats: Optional[IngestStats] = None,
+    roster: Optional[Iterable[str]] = None,
 ) -> int:
+    """Ingest ``puuid``'s recent games; ``roster`` members in those games get rows too."""
     start_time = _parse_since(since)
-    seen = store.seen_match_ids()
     ids = rc.match_ids_by_puuid(puuid, start=0, count=count, start_time=start_time)
-    ingested = 0
-    for mid in ids:
-        if mid in seen:
-            continue
-        match = rc.get_match(mid)
-        info = match.get("info", {})
-        queue_id = int(info.get("queueId", 0))
-        if queue_filter is not None and queue_id != queue_filter:
-            continue
-        # skip remakes
-        if int(info.get("gameDuration", 0)) < 300:
-            continue
-        timeline = rc.get_timeline(mid)
+    mates = [p for p in dict.fromkeys(roster or []) if p and p != puuid]
+    seen = store.known_match_ids(ids, puuid)
+    if mates and seen:
+        # Stored for puuid, but roster mates who played in the game may still lack rows
+        have = {pu: store.known_match_ids(seen, pu) for pu in mates}
+        for mid in list(seen):
+            missing = {pu for pu in mates if mid not in have[pu]}
+            if missing and missing & set(
+                ((store.load_match(mid) or {}).get("metadata") or {}).get("participants") or []
+            ):
+                seen.discard(mid)
+    todo = [mid for mid in ids if mid not in seen]
+    return ingest_match_ids(
+        rc,
+        store,
+        puuid,
+        todo,
+        queue_filter=queue_filter,
+        workers=workers,
+        stats=stats,
+        roster=mates,
+    )
+
 
-        mep = participant_by_puuid(match, puuid)
-        role = mep.get("teamPosition") or None
-        champion_id = int(mep.get("championId", 0))
-        patch = str(info.get("gameVersion", "")).split(" ")[0]
-        game_creation_ms = int(info.get("gameCreation", 0))
-        game_duration_s = int(info.get("gameDuration", 0))
-
-        store.upsert_match_raw(
-            match_id=mid,
-            puuid=puuid,
-            queue_id=queue_id,
-            game_creation_ms=game_creation_ms,
-            game_duration_s=game_duration_s,
-            patch=patch,
-            role=role,
-            champion_id=champion_id,
-            raw_json=json.dumps(match),
+def ingest_roster(
+    rc: RiotClient,
+    store: Store,
+    puuids: Iterable[str],
+    since: Optional[str] = None,
+    count: int = 20,
+    queue_filter: Optional[int] = None,
+    workers: int = FETCH_WORKERS,
+    stats: Optional[IngestStats] = None,
+) -> int:
+    """Ingest recent games for every tracked player through one shared pipeline.
+
+    Id lists are pulled for all members concurrently; the union is deduplicated so a
+    game shared by several members is fetched once and written for each of them.
+    """
+    members = list(dict.fromkeys(p for p in puuids if p))
+    if not members:
+        return 0
+    start_time = _parse_since(since)
+    with ThreadPoolExecutor(max_workers=len(members), thread_name_prefix="ingest-ids") as pool:
+        listed = list(
+            pool.map(
+                lambda pu: rc.match_ids_by_puuid(pu, start=0, count=count, start_time=start_time),
+                members,
+            )
         )
-        store.upsert_timeline_raw(mid, json.dumps(timeline))
-
-        # Frame + events extraction (subset for now)
-        frames_rows: List[Tuple] = []
-        events_rows: List[Tuple] = []
-        for fr in timeline.get("info", {}).get("frames", []):
-            ts = int(fr.get("timestamp", 0))
-            pfs = fr.get("participantFrames", {}) or {}
-            for k, pf in pfs.items():
-                pid = int(k)
-                total_gold = int(pf.get("totalGold") or 0)
-                xp = int(pf.get("xp") or 0)
-                cs = int((pf.get("minionsKilled") or 0) + (pf.get("jungleMinionsKilled") or 0))
-                current_gold = int(pf.get("currentGold") or 0)
-                pos = pf.get("position") or {}
-                x = float(pos.get("x")) if pos.get("x") is not None else None
-                y = float(pos.get("y")) if pos.get("y") is not None else None
-                frames_rows.append((mid, ts, pid, total_gold, xp, cs, current_gold, x, y))
-            for ev in fr.get("events", []) or []:
-                events_rows.append(
-                    (
-                        mid,
-                        int(ev.get("timestamp", 0)),
-                        ev.get("type"),
-                        int(ev.get("participantId")) if ev.get("participantId") is not None else None,
-                        int(ev.get("killerId")) if ev.get("killerId") is not None else None,
-                        int(ev.get("victimId")) if ev.get("victimId") is not None else None,
-                        int(ev.get("itemId")) if ev.get("itemId") is not None else None,
-                        ev.get("wardType"),
-                    )
-                )
-        if frames_rows:
-            store.insert_frames(frames_rows)
-        if events_rows:
-            store.insert_events(events_rows)
-
-        row = compute_metrics(match, timeline, puuid)
-        row["match_id"] = mid
-        store.upsert_metrics(mid, row)
-        # Compute extras (without Data Dragon; mythic/two-item may be 0)
-        # Lazy import to avoid circular dependency
-        from .metrics_extras import compute_extras
-        extras = compute_extras(match, timeline, None, puuid)
-        ex_row = {"match_id": mid, **extras["extras_row"]}
-        store.upsert_metrics_extras(mid, ex_row)
-        ingested += 1
-    return ingested
+    todo: List[str] = []
+    for pu, ids in zip(members, listed):
+        seen = store.known_match_ids(ids, pu)
+        todo.extend(mid for mid in ids if mid not in seen)
+    return ingest_match_ids(
+        rc,
+        store,
+        members[0],
+        todo,
+        queue_filter=queue_filter,
+        workers=workers,
+        stats=stats,
+        roster=members[1:],
+    )
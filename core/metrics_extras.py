@@ -1,8 +1,11 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 
-from .metrics import MS, participant_by_puuid, find_frame_at, lane_opponent_id
+from .frames import FrameMatrix
+from .metrics import MS, participant_by_puuid
+from .schema import Match, Timeline
+from .timeline import ParsedTimeline
 
 
 def _minutes(duration_s: int) -> float:
@@ -17,58 +20,37 @@ def _participant_team_kills(match: Dict[str, Any], team_id: int) -> int:
     return total
 
 
-def _obj_participation(match: Dict[str, Any], timeline: Dict[str, Any], pid: int, my_team: int) -> float:
-    info = match.get("info", {})
+def _obj_participation(pt: ParsedTimeline, pid: int, my_team: int) -> float:
     # count team objectives (drag/herald/baron + towers) for my team
     team_obj = 0
     my_contrib = 0
-    for fr in timeline.get("info", {}).get("frames", []) or []:
-        for ev in fr.get("events", []) or []:
-            typ = ev.get("type")
-            if typ == "ELITE_MONSTER_KILL":
-                mtype = ev.get("monsterType")
-                if mtype in ("DRAGON", "RIFTHERALD", "BARON_NASHOR"):
-                    killer = int(ev.get("killerId") or 0)
-                    # map killer to team
-                    kteam = None
-                    for p in info.get("participants", []):
-                        if int(p.get("participantId") or 0) == killer:
-                            kteam = int(p.get("teamId") or 0)
-                            break
-                    if kteam == my_team:
-                        team_obj += 1
-                        assists = ev.get("assistingParticipantIds") or []
-                        if killer == pid or pid in assists:
-                            my_contrib += 1
-            elif typ == "BUILDING_KILL":
-                btype = ev.get("buildingType")
-                if btype == "TOWER_BUILDING":
-                    # team inference from killerId
-                    killer = int(ev.get("killerId") or 0)
-                    kteam = None
-                    for p in info.get("participants", []):
-                        if int(p.get("participantId") or 0) == killer:
-                            kteam = int(p.get("teamId") or 0)
-                            break
-                    if kteam == my_team:
-                        team_obj += 1
-                        assists = ev.get("assistingParticipantIds") or []
-                        if killer == pid or pid in assists:
-                            my_contrib += 1
+    objectives = [
+        ev
+        for ev in pt.of_type("ELITE_MONSTER_KILL")
+        if ev.get("monsterType") in ("DRAGON", "RIFTHERALD", "BARON_NASHOR")
+    ]
+    objectives += [
+        ev for ev in pt.of_type("BUILDING_KILL") if ev.get("buildingType") == "TOWER_BUILDING"
+    ]
+    for ev in objectives:
+        killer = int(ev.get("killerId") or 0)
+        if pt.team_of(killer) == my_team:
+            team_obj += 1
+            assists = ev.get("assistingParticipantIds") or []
+            if killer == pid or pid in assists:
+                my_contrib += 1
     if team_obj <= 0:
         return 0.0
     return round(my_contrib / team_obj * 100.0, 1)
 
 
-def _items_with_timings(timeline: Dict[str, Any], pid: int) -> List[Dict[str, int]]:
+def _items_with_timings(pt: ParsedTimeline, pid: int) -> List[Dict[str, int]]:
     items: List[Dict[str, int]] = []
-    for fr in timeline.get("info", {}).get("frames", []) or []:
-        for ev in fr.get("events", []) or []:
-            if ev.get("type") == "ITEM_PURCHASED" and int(ev.get("participantId") or 0) == pid:
-                ts = int(int(ev.get("timestamp") or 0) / 1000)
-                iid = int(ev.get("itemId") or 0)
-                if iid:
-                    items.append({"id": iid, "t": ts})
+    for ev in pt.of("ITEM_PURCHASED", pid):
+        ts = int(int(ev.get("timestamp") or 0) / 1000)
+        iid = int(ev.get("itemId") or 0)
+        if iid:
+            items.append({"id": iid, "t": ts})
     return items
 
 
@@ -84,10 +66,12 @@ def _item_cost(dd_item: Dict[str, Any]) -> int:
 
 
 def compute_extras(
-    match: Dict[str, Any],
-    timeline: Dict[str, Any],
+    match: Match,
+    timeline: Timeline,
     ddragon_items: Dict[str, Any] | None,
     puuid: str,
+    frames: Optional[FrameMatrix] = None,
+    parsed: Optional[ParsedTimeline] = None,
 ) -> Dict[str, Any]:
     info = match.get("info", {})
     mep = participant_by_puuid(match, puuid)
@@ -98,7 +82,10 @@ def compute_extras(
     minutes = _minutes(duration_s)
     dpm = float(mep.get("totalDamageDealtToChampions") or 0) / minutes
     gpm = float(mep.get("goldEarned") or 0) / minutes
-    csm = float((mep.get("totalMinionsKilled") or 0) + (mep.get("neutralMinionsKilled") or 0)) / minutes
+    csm = (
+        float((mep.get("totalMinionsKilled") or 0) + (mep.get("neutralMinionsKilled") or 0))
+        / minutes
+    )
     dmg_obj = int(mep.get("damageDealtToObjectives") or 0)
     dmg_turrets = int(mep.get("damageDealtToTurrets") or 0)
     dmg_to_champs = int(mep.get("totalDamageDealtToChampions") or 0)
@@ -114,31 +101,25 @@ def compute_extras(
     kp = round(((k + a) / team_kills) * 100.0, 1) if team_kills > 0 else 0.0
 
     # Diffs @ 10/@15 via frames
-    f10 = find_frame_at(timeline, 10 * 60 * MS)
-    f15 = find_frame_at(timeline, 15 * 60 * MS)
-    opp_id = lane_opponent_id(match, timeline, pid)
-    gd10 = xpd10 = gd15 = xpd15 = 0
-    pf10 = f10.get("participantFrames", {}).get(str(pid), {})
-    pf15 = f15.get("participantFrames", {}).get(str(pid), {})
-    if opp_id:
-        opp10 = f10.get("participantFrames", {}).get(str(opp_id), {})
-        opp15 = f15.get("participantFrames", {}).get(str(opp_id), {})
-        gd10 = int((pf10.get("totalGold") or 0) - (opp10.get("totalGold") or 0))
-        xpd10 = int((pf10.get("xp") or 0) - (opp10.get("xp") or 0))
-        gd15 = int((pf15.get("totalGold") or 0) - (opp15.get("totalGold") or 0))
-        xpd15 = int((pf15.get("xp") or 0) - (opp15.get("xp") or 0))
+    pt = parsed if parsed is not None else ParsedTimeline.build(match, timeline, frames)
+    fm = pt.frames
+    opp_id = pt.lane_opponent(pid)
+    gd10 = fm.diff_at("total_gold", 10 * 60 * MS, pid, opp_id)
+    xpd10 = fm.diff_at("xp", 10 * 60 * MS, pid, opp_id)
+    gd15 = fm.diff_at("total_gold", 15 * 60 * MS, pid, opp_id)
+    xpd15 = fm.diff_at("xp", 15 * 60 * MS, pid, opp_id)
 
     # Objective participation
-    obj_participation = _obj_participation(match, timeline, pid, my_team)
+    obj_participation = _obj_participation(pt, pid, my_team)
 
     # Items and timings
-    items = _items_with_timings(timeline, pid)
+    items = _items_with_timings(pt, pid)
     mythic_at_s: Optional[int] = None
     two_item_at_s: Optional[int] = None
     trinket_swap_at_s: Optional[int] = None
     if ddragon_items:
         # Build a dict of id -> item meta
-        data = (ddragon_items.get("data") or {})
+        data = ddragon_items.get("data") or {}
         seen_big = 0
         first_trinket: Optional[int] = None
         for it in sorted(items, key=lambda x: x["t"]):
@@ -159,80 +140,33 @@ def compute_extras(
                     trinket_swap_at_s = it["t"]
 
     # Roam distance pre-14: simple path length before 14m
-    def _path_len_before(ts_limit_ms: int) -> float:
-        pts: List[Tuple[float, float]] = []
-        for fr in timeline.get("info", {}).get("frames", []) or []:
-            ts = int(fr.get("timestamp") or 0)
-            if ts > ts_limit_ms:
-                break
-            pf = fr.get("participantFrames", {}).get(str(pid), {})
-            pos = pf.get("position") or {}
-            x = pos.get("x")
-            y = pos.get("y")
-            if x is not None and y is not None:
-                pts.append((float(x), float(y)))
-        dist = 0.0
-        for i in range(1, len(pts)):
-            x0, y0 = pts[i - 1]
-            x1, y1 = pts[i]
-            dist += ((x1 - x0) ** 2 + (y1 - y0) ** 2) ** 0.5
-        return dist
-
-    roam_distance_pre14 = _path_len_before(14 * 60 * 1000)
+    roam_distance_pre14 = fm.path_length(pid, 14 * 60 * 1000)
 
     # Ward clears pre-14 and total, plates pre-14, objective proximity (within ~2500 units of event)
     ward_clears_pre14 = 0
     ward_clears_total = 0
     plates_pre14 = 0
-    obj_near = 0
-    # helper to get my position around a timestamp
-    def _pos_near(ts: int) -> Optional[Tuple[float, float]]:
-        frames = timeline.get("info", {}).get("frames", []) or []
-        if not frames:
-            return None
-        fr = min(frames, key=lambda f: abs(int(f.get("timestamp") or 0) - ts))
-        pf = fr.get("participantFrames", {}).get(str(pid), {})
-        pos = pf.get("position") or {}
-        x = pos.get("x"); y = pos.get("y")
-        if x is None or y is None:
-            return None
-        return float(x), float(y)
-    for fr in timeline.get("info", {}).get("frames", []) or []:
-        for ev in fr.get("events", []) or []:
-            ts = int(ev.get("timestamp") or 0)
-            typ = ev.get("type")
-            if typ == "WARD_KILL":
-                if int(ev.get("killerId") or 0) == pid:
-                    ward_clears_total += 1
-                    if ts < 14 * 60 * 1000:
-                        ward_clears_pre14 += 1
-            elif typ == "TURRET_PLATE_DESTROYED":
-                # credit if killerId is me; if event lacks killer, approximate with proximity
-                if int(ev.get("killerId") or 0) == pid or (lambda: (
-                    (lambda mp, ep: (mp is not None and ep is not None and ((mp[0]-ep[0])**2 + (mp[1]-ep[1])**2) ** 0.5 <= 2000))(
-                        _pos_near(ts),
-                        (lambda p: (float(p.get('x')), float(p.get('y'))) if p else None)(ev.get("position"))
-                    )
-                ))():
-                    if ts < 14 * 60 * 1000:
-                        plates_pre14 += 1
-            elif typ in ("ELITE_MONSTER_KILL", "BUILDING_KILL"):
-                # count proximity for my team objectives only
-                kteam = None
-                killer = int(ev.get("killerId") or 0)
-                for p in match.get("info", {}).get("participants", []) or []:
-                    if int(p.get("participantId") or 0) == killer:
-                        kteam = int(p.get("teamId") or 0)
-                        break
-                if kteam == my_team:
-                    mp = _pos_near(ts)
-                    ep = ev.get("position") or {}
-                    ex = ep.get("x"); ey = ep.get("y")
-                    if mp and ex is not None and ey is not None:
-                        dx = mp[0] - float(ex)
-                        dy = mp[1] - float(ey)
-                        if (dx * dx + dy * dy) ** 0.5 <= 2500:
-                            obj_near += 1
+    for ev in pt.of("WARD_KILL", pid):
+        ward_clears_total += 1
+        if int(ev.get("timestamp") or 0) < 14 * 60 * 1000:
+            ward_clears_pre14 += 1
+    plates = [
+        ev
+        for ev in pt.of_type("TURRET_PLATE_DESTROYED")
+        if int(ev.get("timestamp") or 0) < 14 * 60 * 1000
+    ]
+    # credit if killerId is me; if event lacks killer, approximate with proximity
+    for ev, close in zip(plates, pt.near(pid, plates, 2000)):
+        if int(ev.get("killerId") or 0) == pid or close:
+            plates_pre14 += 1
+    # count proximity for my team objectives only
+    team_objectives = [
+        ev
+        for typ in ("ELITE_MONSTER_KILL", "BUILDING_KILL")
+        for ev in pt.of_type(typ)
+        if pt.team_of(ev.get("killerId")) == my_team
+    ]
+    obj_near = int(pt.near(pid, team_objectives, 2500).sum())
 
     # Overview fields for drawer
     overview = {
@@ -1,18 +1,87 @@
 from __future__ import annotations
 
-import time
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+import asyncio
+import os
 import threading
+import time
+import weakref
 from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from .config import get_api_key
 
+DEFAULT_BASE_URL = "https://{route}.api.riotgames.com"
+BASE_URL_ENV = "LOLTRACK_RIOT_BASE_URL"
+
+
+def _base(region: str, template: Optional[str] = None) -> str:
+    # `riot.base_url` / LOLTRACK_RIOT_BASE_URL can point at a local stand-in
+    # (scripts/riot_standin.py)
+    tpl = template or os.getenv(BASE_URL_ENV) or DEFAULT_BASE_URL
+    return tpl.format(route=region).rstrip("/")
+
+
+# Shared keep-alive pools: one for threaded callers, one per event loop for async callers
+_POOL_SIZE = 20
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+# Loop → its httpx.AsyncClient; a client is bound to the loop that opened its connections
+_ASYNC_POOLS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+    weakref.WeakKeyDictionary()
+)
+_ASYNC_POOLS_LOCK = threading.Lock()
+
+
+def _session() -> requests.Session:
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                sess = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=_POOL_SIZE)
+                sess.mount("https://", adapter)
+                sess.mount("http://", adapter)
+                _SESSION = sess
+    return _SESSION
+
+
+def _async_pool() -> Any:
+    """Return the shared httpx.AsyncClient of the running loop.
+
+    Keyed per loop, so a client opened on another loop is never replaced (and
+    orphaned with its connections) while that loop may still use it.
+    """
+    import httpx  # backend dependency; only needed by async callers
+
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_POOLS.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=15.0,
+            limits=httpx.Limits(max_connections=_POOL_SIZE, max_keepalive_connections=_POOL_SIZE),
+        )
+        with _ASYNC_POOLS_LOCK:
+            _ASYNC_POOLS[loop] = client
+    return client
 
-def _base(region: str) -> str:
-    return f"https://{region}.api.riotgames.com"
+
+async def aclose_async_pool() -> None:
+    """Close the running loop's client; clients of other live loops are closed on their own loop."""
+    loop = asyncio.get_running_loop()
+    with _ASYNC_POOLS_LOCK:
+        pools = list(_ASYNC_POOLS.items())
+        _ASYNC_POOLS.clear()
+    for owner, client in pools:
+        if client.is_closed:
+            continue
+        if owner is loop:
+            await client.aclose()
+        elif owner.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), owner)
 
 
 @dataclass
@@ -20,26 +89,40 @@ class RiotClient:
     region: str
     platform: str
     api_key: str
-    kind: str = "fg"  # 'fg' (interactive), 'bg' (background)
+    kind: str = "fg"  # scheduler class: 'fg' (interactive), 'bg' (background), 'bulk' (backfill)
+    base_url: Optional[str] = None  # "{route}" template; defaults to the public Riot hosts
 
     @classmethod
     def from_config(cls, cfg: Dict[str, Any], kind: str = "fg") -> "RiotClient":
         key = get_api_key()
         if not key:
             raise RuntimeError("No Riot API key found; set RIOT_API_KEY or run auth")
-        return cls(region=cfg["riot"]["region"], platform=cfg["riot"]["platform"], api_key=key, kind=kind)
+        return cls(
+            region=cfg["riot"]["region"],
+            platform=cfg["riot"]["platform"],
+            api_key=key,
+            kind=kind,
+            base_url=cfg["riot"].get("base_url") or None,
+        )
 
     def _headers(self) -> Dict[str, str]:
         return {"X-Riot-Token": self.api_key}
 
-    def _get(self, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    def _get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        *,
+        route: str = "",
+        method: str = "",
+    ) -> Any:
         while True:
-            _RATE_LIMITER.acquire(self.kind)
-            resp = requests.get(url, headers=self._headers(), params=params, timeout=15)
+            sent_at = _RATE_LIMITER.acquire(self.kind, route, method)
+            resp = _session().get(url, headers=self._headers(), params=params, timeout=15)
+            _RATE_LIMITER.observe(route, method, resp.headers, sent_at)
             if resp.status_code == 429:
-                # Respect Retry-After and also let limiter naturally pace subsequent calls
-                retry = int(resp.headers.get("Retry-After", "2"))
-                time.sleep(retry + 1)
+                # Block the offending bucket for Retry-After; the limiter paces the retry
+                _RATE_LIMITER.penalize(route, method, resp.headers)
                 continue
             resp.raise_for_status()
             return resp.json()
@@ -50,9 +133,9 @@ class RiotClient:
         Returns True if the key appears valid (2xx), False on 401/403.
         Raises on network errors other than auth/rate limits.
         """
-        url = f"{_base(self.platform)}/lol/status/v4/platform-data"
+        url = f"{_base(self.platform, self.base_url)}/lol/status/v4/platform-data"
         try:
-            resp = requests.get(url, headers=self._headers(), timeout=10)
+            resp = _session().get(url, headers=self._headers(), timeout=10)
             if resp.status_code in (401, 403):
                 return False
             if resp.status_code == 429:
@@ -64,84 +147,486 @@ class RiotClient:
             # Network or other error; bubble up to caller for mapping
             raise
 
+    def budget(self, method: str) -> float:
+        """Sustained requests/second the limiter currently allows this client for ``method``."""
+        return _RATE_LIMITER.budget(self.region, method, self.kind)
+
     # Account V1
     def resolve_account(self, game_name: str, tag_line: str) -> Dict[str, Any]:
-        url = f"{_base(self.region)}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
-        return self._get(url)
+        url = (
+            f"{_base(self.region, self.base_url)}"
+            f"/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
+        )
+        return self._get(url, route=self.region, method="account-v1.getByRiotId")
 
     # Match V5
-    def match_ids_by_puuid(self, puuid: str, start: int = 0, count: int = 20, start_time: Optional[int] = None) -> List[str]:
-        url = f"{_base(self.region)}/lol/match/v5/matches/by-puuid/{puuid}/ids"
+    def match_ids_by_puuid(
+        self,
+        puuid: str,
+        start: int = 0,
+        count: int = 20,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+    ) -> List[str]:
+        url = f"{_base(self.region, self.base_url)}/lol/match/v5/matches/by-puuid/{puuid}/ids"
         params: Dict[str, Any] = {"start": start, "count": count}
         if start_time is not None:
             params["startTime"] = start_time
-        return self._get(url, params=params)
+        if end_time is not None:
+            params["endTime"] = end_time
+        return self._get(
+            url, params=params, route=self.region, method="match-v5.getMatchIdsByPUUID"
+        )
 
     def get_match(self, match_id: str) -> Dict[str, Any]:
-        url = f"{_base(self.region)}/lol/match/v5/matches/{match_id}"
-        return self._get(url)
+        url = f"{_base(self.region, self.base_url)}/lol/match/v5/matches/{match_id}"
+        return self._get(url, route=self.region, method="match-v5.getMatch")
 
     def get_timeline(self, match_id: str) -> Dict[str, Any]:
-        url = f"{_base(self.region)}/lol/match/v5/matches/{match_id}/timeline"
-        return self._get(url)
+        url = f"{_base(self.region, self.base_url)}/lol/match/v5/matches/{match_id}/timeline"
+        return self._get(url, route=self.region, method="match-v5.getTimeline")
 
     # Champion Mastery V4
     def champion_masteries_by_puuid(self, puuid: str) -> List[Dict[str, Any]]:
-        url = f"{_base(self.platform)}/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}"
-        return self._get(url)
+        url = (
+            f"{_base(self.platform, self.base_url)}"
+            f"/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}"
+        )
+        return self._get(
+            url, route=self.platform, method="champion-mastery-v4.getAllChampionMasteriesByPUUID"
+        )
 
 
-class _RateLimiter:
-    """Global token-gate for Riot requests.
+@dataclass
+class AsyncRiotClient:
+    """asyncio-native twin of RiotClient sharing one keep-alive connection pool.
 
-    Enforces both 20 req / 1s and 100 req / 120s across the process.
-    Background ('bg') calls respect a soft reserve for foreground ('fg') calls.
+    Rate-limit waits and 429 back-offs are awaited, so request handlers never park a thread.
     """
 
-    def __init__(self, per_sec: int = 20, per_120s: int = 100, fg_reserve_sec: int = 8, fg_reserve_120s: int = 40) -> None:
-        self.per_sec = per_sec
-        self.per_120s = per_120s
-        self.fg_reserve_sec = fg_reserve_sec
-        self.fg_reserve_120s = fg_reserve_120s
-        self._q1 = deque()  # timestamps (monotonic) for 1s window
-        self._q2 = deque()  # timestamps for 120s window
-        self._lock = threading.Lock()
-
-    def acquire(self, kind: str) -> None:
-        # Busy-wait with short sleeps to maintain pacing; background yields more.
+    region: str
+    platform: str
+    api_key: str
+    kind: str = "fg"
+    base_url: Optional[str] = None
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any], kind: str = "fg") -> "AsyncRiotClient":
+        key = get_api_key()
+        if not key:
+            raise RuntimeError("No Riot API key found; set RIOT_API_KEY or run auth")
+        return cls(
+            region=cfg["riot"]["region"],
+            platform=cfg["riot"]["platform"],
+            api_key=key,
+            kind=kind,
+            base_url=cfg["riot"].get("base_url") or None,
+        )
+
+    def _headers(self) -> Dict[str, str]:
+        return {"X-Riot-Token": self.api_key}
+
+    async def _get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        *,
+        route: str = "",
+        method: str = "",
+    ) -> Any:
         while True:
-            wait = self._try_acquire(kind)
-            if wait <= 0:
-                return
-            time.sleep(min(wait, 0.05 if kind == "fg" else 0.2))
+            sent_at = await _RATE_LIMITER.acquire_async(self.kind, route, method)
+            resp = await _async_pool().get(url, headers=self._headers(), params=params)
+            _RATE_LIMITER.observe(route, method, resp.headers, sent_at)
+            if resp.status_code == 429:
+                _RATE_LIMITER.penalize(route, method, resp.headers)
+                continue
+            resp.raise_for_status()
+            return resp.json()
+
+    async def verify_key(self) -> bool:
+        """Async variant of RiotClient.verify_key."""
+        url = f"{_base(self.platform, self.base_url)}/lol/status/v4/platform-data"
+        resp = await _async_pool().get(url, headers=self._headers(), timeout=10.0)
+        if resp.status_code in (401, 403):
+            return False
+        if resp.status_code == 429:
+            return True
+        resp.raise_for_status()
+        return True
+
+    # Account V1
+    async def resolve_account(self, game_name: str, tag_line: str) -> Dict[str, Any]:
+        url = (
+            f"{_base(self.region, self.base_url)}"
+            f"/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
+        )
+        return await self._get(url, route=self.region, method="account-v1.getByRiotId")
+
+    # Match V5
+    async def match_ids_by_puuid(
+        self,
+        puuid: str,
+        start: int = 0,
+        count: int = 20,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+    ) -> List[str]:
+        url = f"{_base(self.region, self.base_url)}/lol/match/v5/matches/by-puuid/{puuid}/ids"
+        params: Dict[str, Any] = {"start": start, "count": count}
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        return await self._get(
+            url, params=params, route=self.region, method="match-v5.getMatchIdsByPUUID"
+        )
+
+    async def get_match(self, match_id: str) -> Dict[str, Any]:
+        url = f"{_base(self.region, self.base_url)}/lol/match/v5/matches/{match_id}"
+        return await self._get(url, route=self.region, method="match-v5.getMatch")
+
+    async def get_timeline(self, match_id: str) -> Dict[str, Any]:
+        url = f"{_base(self.region, self.base_url)}/lol/match/v5/matches/{match_id}/timeline"
+        return await self._get(url, route=self.region, method="match-v5.getTimeline")
+
+    # Champion Mastery V4
+    async def champion_masteries_by_puuid(self, puuid: str) -> List[Dict[str, Any]]:
+        url = (
+            f"{_base(self.platform, self.base_url)}"
+            f"/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}"
+        )
+        return await self._get(
+            url, route=self.platform, method="champion-mastery-v4.getAllChampionMasteriesByPUUID"
+        )
+
+
+def _parse_limits(value: Optional[str]) -> List[Tuple[int, float]]:
+    """Parse Riot's "count:seconds,count:seconds" rate-limit header values."""
+    out: List[Tuple[int, float]] = []
+    for part in (value or "").split(","):
+        n, _, secs = part.strip().partition(":")
+        try:
+            out.append((int(n), float(secs)))
+        except ValueError:
+            continue
+    return out
 
-    def _try_acquire(self, kind: str) -> float:
+
+class _Bucket:
+    """Sliding-window request log for one rate-limit scope (an app route or a method)."""
+
+    def __init__(self, limits: Optional[List[Tuple[int, float]]] = None) -> None:
+        self.limits: Dict[float, int] = {}
+        self.hits: Dict[float, deque] = {}
+        self.blocked_until = 0.0
+        if limits:
+            self.set_limits(limits)
+
+    def set_limits(self, limits: List[Tuple[int, float]]) -> None:
+        self.limits = {secs: n for n, secs in limits}
+        for secs in self.limits:
+            self.hits.setdefault(secs, deque())
+        for secs in list(self.hits):
+            if secs not in self.limits:
+                del self.hits[secs]
+
+    def _prune(self, now: float) -> None:
+        for secs, q in self.hits.items():
+            while q and now - q[0] >= secs:
+                q.popleft()
+
+    def wait(self, now: float, reserve: float = 0.0) -> float:
+        """Seconds until a request fits; ``reserve`` holds back a fraction of each window."""
+        self._prune(now)
+        wait = max(0.0, self.blocked_until - now)
+        for secs, limit in self.limits.items():
+            q = self.hits[secs]
+            usable = max(1, limit - int(limit * reserve))
+            if len(q) >= usable:
+                # the (len - usable + 1)-th oldest hit has to age out first
+                idx = len(q) - usable
+                wait = max(wait, secs - (now - q[idx]))
+        return wait
+
+    def take(self, now: float) -> None:
+        for q in self.hits.values():
+            q.append(now)
+
+    def restamp(self, old: float, new: float) -> None:
+        # Appending keeps each deque ordered: every stamp is taken under the limiter lock
+        for q in self.hits.values():
+            try:
+                q.remove(old)
+            except ValueError:
+                continue
+            q.append(new)
+
+    def sync_counts(self, counts: List[Tuple[int, float]], now: float) -> None:
+        # The server may have seen calls we did not (other processes, restarts): pad to its count
+        for n, secs in counts:
+            q = self.hits.get(secs)
+            if q is None:
+                continue
+            missing = n - len(q)
+            for _ in range(max(0, missing)):
+                q.append(now)
+
+    def rate(self, reserve: float = 0.0) -> float:
+        """Sustained requests/second this bucket allows (inf when unconstrained)."""
+        if not self.limits:
+            return float("inf")
+        return min(max(1, n - int(n * reserve)) / secs for secs, n in self.limits.items())
+
+
+# Scheduler classes: lower value is served first; unknown kinds rank as "bg"
+PRIORITY: Dict[str, int] = {"fg": 0, "bg": 1, "bulk": 2}
+# Share of every window a class leaves untouched for the classes above it
+HEADROOM: Dict[str, float] = {"fg": 0.0, "bg": 0.25, "bulk": 0.4}
+# Default queueing deadline per class; an overdue ticket is promoted one class
+DEADLINE_S: Dict[str, float] = {"fg": 2.0, "bg": 30.0, "bulk": 300.0}
+
+
+class _Ticket:
+    __slots__ = ("kind", "priority", "deadline", "seq", "route", "method", "enqueued", "wake")
+
+    def __init__(
+        self, kind: str, route: str, method: str, seq: int, deadline: Optional[float], now: float
+    ) -> None:
+        self.kind = kind if kind in PRIORITY else "bg"
+        self.priority = PRIORITY[self.kind]
+        self.deadline = now + (DEADLINE_S[self.kind] if deadline is None else deadline)
+        self.seq = seq
+        self.route = route
+        self.method = method
+        self.enqueued = now
+        self.wake: Optional[Callable[[], None]] = None  # async waiters only
+
+    def rank(self, now: float) -> Tuple[int, float, int]:
+        # Earliest deadline first inside a class; equal defaults make that plain FIFO
+        prio = self.priority - 1 if now >= self.deadline and self.priority > 0 else self.priority
+        return prio, self.deadline, self.seq
+
+
+class _ClassStats:
+    __slots__ = ("granted", "wait_total", "wait_max", "recent")
+
+    def __init__(self) -> None:
+        self.granted = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.recent: deque = deque(maxlen=256)
+
+    def add(self, waited: float) -> None:
+        self.granted += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self.recent.append(waited)
+
+
+class _RateLimiter:
+    """Process-wide Riot request scheduler with buckets learned from response headers.
+
+    Keeps one application bucket per routing value (``americas``, ``na1``, ...) and one
+    method bucket per (routing value, method). Limits start at the dev-key defaults and
+    are replaced by ``X-App-Rate-Limit`` / ``X-Method-Rate-Limit`` as responses arrive;
+    the ``-Count`` headers reconcile our local windows with the server's view.
+
+    Callers queue as tickets ranked by priority class ('fg' > 'bg' > 'bulk'), then
+    deadline, then arrival. A ticket is only granted when no better-ranked ticket is
+    waiting on the same route, so a foreground call jumps every queued background call;
+    lower classes also leave HEADROOM of each window unused so it rarely has to wait
+    for a slot at all. Waiters sleep until the exact next free slot or until the
+    queue changes (threads on a condition variable, coroutines on an asyncio.Event).
+    """
+
+    DEFAULT_APP_LIMITS: List[Tuple[int, float]] = [(20, 1.0), (100, 120.0)]
+
+    def __init__(
+        self,
+        app_limits: Optional[List[Tuple[int, float]]] = None,
+        headroom: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.default_app_limits = list(app_limits or self.DEFAULT_APP_LIMITS)
+        self.headroom = dict(HEADROOM, **(headroom or {}))
+        self._app: Dict[str, _Bucket] = {}
+        self._method: Dict[Tuple[str, str], _Bucket] = {}
+        self._cond = threading.Condition()
+        self._waiting: List[_Ticket] = []
+        self._seq = 0
+        self._stats: Dict[str, _ClassStats] = {k: _ClassStats() for k in PRIORITY}
+
+    def _buckets(self, route: str, method: str) -> Tuple[_Bucket, _Bucket]:
+        app = self._app.get(route)
+        if app is None:
+            app = self._app[route] = _Bucket(self.default_app_limits)
+        meth = self._method.get((route, method))
+        if meth is None:
+            # Unknown until the first response tells us
+            meth = self._method[(route, method)] = _Bucket()
+        return app, meth
+
+    def _enqueue(self, kind: str, route: str, method: str, deadline: Optional[float]) -> _Ticket:
+        self._seq += 1
+        t = _Ticket(kind, route, method, self._seq, deadline, time.monotonic())
+        self._waiting.append(t)
+        # A better-ranked arrival may have to overtake current heads
+        self._wake()
+        return t
+
+    def _try_grant(self, t: _Ticket) -> Tuple[bool, Optional[float], float]:
+        """Grant ``t`` if it heads its route's queue and the windows allow.
+
+        Returns (granted, timeout, stamp). When not granted, timeout is how long to sleep
+        before re-checking unprompted (next free slot, or the ticket's own deadline
+        when it may re-rank); None means only a queue change can help.
+        """
         now = time.monotonic()
-        with self._lock:
-            # prune
-            while self._q1 and now - self._q1[0] > 1.0:
-                self._q1.popleft()
-            while self._q2 and now - self._q2[0] > 120.0:
-                self._q2.popleft()
-            n1 = len(self._q1)
-            n2 = len(self._q2)
-            # global caps
-            if n1 >= self.per_sec or n2 >= self.per_120s:
-                # compute next availability
-                t1 = (1.0 - (now - self._q1[0])) if self._q1 else 0.05
-                t2 = (120.0 - (now - self._q2[0])) if self._q2 else 0.05
-                return max(min(t1, t2), 0.01)
-            # background reserve check
-            if kind == "bg":
-                if n1 >= (self.per_sec - self.fg_reserve_sec) or n2 >= (self.per_120s - self.fg_reserve_120s):
-                    # hint sleep until some tokens free
-                    t1 = (1.0 - (now - self._q1[0])) if self._q1 else 0.05
-                    t2 = (120.0 - (now - self._q2[0])) if self._q2 else 0.05
-                    return max(min(t1, t2), 0.05)
-            # take token
-            self._q1.append(now)
-            self._q2.append(now)
-            return 0.0
+        mine = t.rank(now)
+        until_deadline = t.deadline - now if now < t.deadline else None
+        for o in self._waiting:
+            if o is not t and o.route == t.route and o.rank(now) < mine:
+                return False, until_deadline, now
+        reserve = self.headroom.get(t.kind, 0.0)
+        app, meth = self._buckets(t.route, t.method)
+        wait = max(app.wait(now, reserve), meth.wait(now, reserve))
+        if wait > 0:
+            return False, min(wait, until_deadline or wait), now
+        app.take(now)
+        meth.take(now)
+        self._waiting.remove(t)
+        self._stats[t.kind].add(now - t.enqueued)
+        self._wake()
+        return True, None, now
+
+    def _wake(self) -> None:
+        self._cond.notify_all()
+        for o in self._waiting:
+            if o.wake is not None:
+                o.wake()
+
+    def acquire(
+        self, kind: str, route: str = "", method: str = "", deadline: Optional[float] = None
+    ) -> float:
+        """Block until a request may be sent; returns its send stamp for observe()."""
+        with self._cond:
+            t = self._enqueue(kind, route, method, deadline)
+            try:
+                while True:
+                    granted, timeout, stamp = self._try_grant(t)
+                    if granted:
+                        return stamp
+                    self._cond.wait(timeout=timeout)
+            except BaseException:
+                if t in self._waiting:
+                    self._waiting.remove(t)
+                    self._wake()
+                raise
+
+    async def acquire_async(
+        self, kind: str, route: str = "", method: str = "", deadline: Optional[float] = None
+    ) -> float:
+        # Same queue as acquire(); waits are awaited so the event loop keeps running
+        loop = asyncio.get_running_loop()
+        ev = asyncio.Event()
+        with self._cond:
+            t = self._enqueue(kind, route, method, deadline)
+            t.wake = lambda: loop.call_soon_threadsafe(ev.set)
+        try:
+            while True:
+                with self._cond:
+                    ev.clear()
+                    granted, timeout, stamp = self._try_grant(t)
+                if granted:
+                    return stamp
+                try:
+                    await asyncio.wait_for(ev.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._cond:
+                if t in self._waiting:
+                    self._waiting.remove(t)
+                    self._wake()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and wait-time figures per priority class."""
+        now = time.monotonic()
+        with self._cond:
+            out: Dict[str, Any] = {}
+            for kind, st in self._stats.items():
+                queued = [t for t in self._waiting if t.kind == kind]
+                recent = sorted(st.recent)
+                out[kind] = {
+                    "queued": len(queued),
+                    "oldest_wait_ms": round(
+                        max((now - t.enqueued for t in queued), default=0.0) * 1000, 1
+                    ),
+                    "granted": st.granted,
+                    "mean_wait_ms": round(st.wait_total / st.granted * 1000, 1)
+                    if st.granted
+                    else 0.0,
+                    "p95_wait_ms": round(recent[int(0.95 * (len(recent) - 1))] * 1000, 1)
+                    if recent
+                    else 0.0,
+                    "max_wait_ms": round(st.wait_max * 1000, 1),
+                }
+            return out
+
+    def observe(
+        self, route: str, method: str, headers: Any, sent_at: Optional[float] = None
+    ) -> None:
+        """Learn limits and counts from a Riot response's rate-limit headers.
+
+        ``sent_at`` (from acquire) moves that request's hit to the response time: the
+        server counted it somewhere in between, so windows age out from the later stamp.
+        """
+        app_limits = _parse_limits(headers.get("X-App-Rate-Limit"))
+        meth_limits = _parse_limits(headers.get("X-Method-Rate-Limit"))
+        now = time.monotonic()
+        with self._cond:
+            app, meth = self._buckets(route, method)
+            if sent_at is not None:
+                app.restamp(sent_at, now)
+                meth.restamp(sent_at, now)
+            if not app_limits and not meth_limits:
+                return
+            if app_limits:
+                app.set_limits(app_limits)
+                app.sync_counts(_parse_limits(headers.get("X-App-Rate-Limit-Count")), now)
+            if meth_limits:
+                meth.set_limits(meth_limits)
+                meth.sync_counts(_parse_limits(headers.get("X-Method-Rate-Limit-Count")), now)
+            # Limits may have grown: let waiters re-check
+            self._wake()
+
+    def penalize(self, route: str, method: str, headers: Any) -> None:
+        """Block the bucket named by a 429's X-Rate-Limit-Type for Retry-After seconds."""
+        try:
+            retry = float(headers.get("Retry-After") or 2)
+        except ValueError:
+            retry = 2.0
+        until = time.monotonic() + retry
+        with self._cond:
+            app, meth = self._buckets(route, method)
+            kind = (headers.get("X-Rate-Limit-Type") or "application").lower()
+            targets = [meth] if kind == "method" else [app]
+            if kind == "service":
+                targets = [app, meth]
+            for b in targets:
+                b.blocked_until = max(b.blocked_until, until)
+
+    def budget(self, route: str, method: str, kind: str = "bg") -> float:
+        """Sustained requests/second currently available to ``kind`` for this method."""
+        reserve = self.headroom.get(kind, 0.0)
+        with self._cond:
+            app, meth = self._buckets(route, method)
+            return min(app.rate(reserve), meth.rate(reserve))
 
 
 _RATE_LIMITER = _RateLimiter()
+
+
+def scheduler_stats() -> Dict[str, Any]:
+    return _RATE_LIMITER.stats()
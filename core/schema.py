@@ -0,0 +1,172 @@
+"""Typed subset of the Riot Match-V5 and Timeline payloads.
+
+Only the fields that metrics, extras, GIS features and the match views read are
+declared. decode_match / decode_timeline parse raw JSON straight into these
+shapes in one pass and drop everything else: per-frame championStats and
+damageStats, participant challenges, rune selections and so on, which is most of
+a stored payload. The results are still plain dicts, so code written against full
+payloads reads them unchanged; they are subsets and must never be written back
+as raw_json.
+
+Decoding into the subset needs msgspec, which skips undeclared fields while
+parsing, so the decoded cache holds far fewer objects per payload. Without it,
+or when a payload does not fit the schema (e.g. a null or fractional value in an
+int field), the full payload is parsed with codec.json_loads. A pydantic
+TypeAdapter was tried and parsed slower than plain orjson, so it is not used.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, TypedDict, Union
+
+from . import codec
+
+try:  # optional: typed decoder
+    import msgspec as _msgspec  # type: ignore
+except Exception:  # pragma: no cover - depends on environment
+    _msgspec = None
+
+
+# Match-V5
+class StatPerks(TypedDict, total=False):
+    offense: int
+    flex: int
+    defense: int
+
+
+class PerkStyle(TypedDict, total=False):
+    style: int
+
+
+class Perks(TypedDict, total=False):
+    statPerks: StatPerks
+    styles: List[PerkStyle]
+
+
+class Participant(TypedDict, total=False):
+    puuid: str
+    participantId: int
+    teamId: int
+    teamPosition: str
+    championId: int
+    win: bool
+    kills: int
+    deaths: int
+    assists: int
+    totalMinionsKilled: int
+    neutralMinionsKilled: int
+    goldEarned: int
+    totalDamageDealtToChampions: int
+    totalDamageTaken: int
+    damageDealtToObjectives: int
+    damageDealtToTurrets: int
+    visionScore: int
+    wardsPlaced: int
+    wardsKilled: int
+    totalTimeSpentDead: int
+    perks: Perks
+
+
+class MatchMetadata(TypedDict, total=False):
+    matchId: str
+    participants: List[str]
+
+
+class MatchInfo(TypedDict, total=False):
+    gameCreation: int
+    gameDuration: int
+    gameVersion: str
+    queueId: int
+    participants: List[Participant]
+
+
+class Match(TypedDict, total=False):
+    metadata: MatchMetadata
+    info: MatchInfo
+
+
+# Timeline
+class Position(TypedDict, total=False):
+    x: int
+    y: int
+
+
+class ParticipantFrame(TypedDict, total=False):
+    participantId: int
+    totalGold: int
+    currentGold: int
+    xp: int
+    minionsKilled: int
+    jungleMinionsKilled: int
+    position: Position
+
+
+class Event(TypedDict, total=False):
+    type: str
+    timestamp: int
+    participantId: int
+    killerId: int
+    victimId: int
+    creatorId: int
+    itemId: int
+    wardType: str
+    monsterType: str
+    buildingType: str
+    towerType: str
+    assistingParticipantIds: List[int]
+    position: Position
+
+
+class Frame(TypedDict, total=False):
+    timestamp: int
+    participantFrames: Dict[str, ParticipantFrame]
+    events: List[Event]
+
+
+class TimelineInfo(TypedDict, total=False):
+    frameInterval: int
+    frames: List[Frame]
+
+
+class TimelineMetadata(TypedDict, total=False):
+    matchId: str
+
+
+class Timeline(TypedDict, total=False):
+    metadata: TimelineMetadata
+    info: TimelineInfo
+
+
+_DECODERS: Dict[type, Any] = {}
+
+
+def _decoder(schema: type) -> Any:
+    dec = _DECODERS.get(schema)
+    if dec is None:
+        if _msgspec is not None:
+            dec = _msgspec.json.Decoder(schema).decode
+        else:
+            dec = codec.json_loads
+        _DECODERS[schema] = dec
+    return dec
+
+
+def decode(schema: type, data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """JSON → the fields of `schema` only; the full object when it does not fit."""
+    dec = _decoder(schema)
+    if dec is codec.json_loads:
+        return dec(data)
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    try:
+        return dec(data)
+    except Exception:
+        # Off-schema (or NaN-bearing) payload: keep it whole; invalid JSON still raises here
+        return codec.json_loads(data)
+
+
+def decode_match(data: Union[str, bytes, bytearray, memoryview]) -> Optional[Match]:
+    return decode(Match, data)
+
+
+def decode_timeline(data: Union[str, bytes, bytearray, memoryview]) -> Optional[Timeline]:
+    return decode(Timeline, data)
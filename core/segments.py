@@ -0,0 +1,174 @@
+"""Append-only, content-addressed segment files for large raw payloads.
+
+Packed match/timeline blobs (core/codec.py) of at least SEGMENT_MIN_BYTES are
+appended to `<db>.segments/seg-NNNNNN.dat` instead of living in SQLite rows,
+where every read walks a chain of overflow pages and copies the value into a
+new bytes object. The row keeps a small reference (codec.TAG_SEGMENT_REF) with
+the payload's digest and location; `segment_index` maps digests to locations so
+equal payloads (one shared game in several roster members' rows) are stored
+once. Reads slice a read-only mmap of the segment, so decompression runs
+straight off the mapped pages.
+
+Appends are only flushed to the OS; Store syncs the touched segments once,
+right before the transaction that references them commits, so a batch costs
+one fsync rather than one per payload.
+
+Segments are append-only: payloads replaced or archived later stay behind as
+dead bytes until Store.compact_segments copies the live payloads of a mostly
+dead segment into the active one, repoints their rows and retires the old file
+(unlinked on the following pass, once no reader can still hold a reference to it).
+"""
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+SEGMENTS_SUFFIX = ".segments"
+# Smaller packed values fit in a SQLite page and gain nothing from the indirection
+SEGMENT_MIN_BYTES = 4096
+SEGMENT_MAX_BYTES = 256 * 1024 * 1024
+# Sealed segments with at least this share of unreferenced bytes are compacted
+SEGMENT_COMPACT_RATIO = 0.5
+DIGEST_BYTES = 16
+
+
+def digest(raw: bytes) -> bytes:
+    """Content address of a raw (uncompressed) payload."""
+    return hashlib.blake2b(raw, digest_size=DIGEST_BYTES).digest()
+
+
+class SegmentFiles:
+    """The segment directory of one database: one appender, shared read-only maps."""
+
+    def __init__(self, root: str) -> None:
+        self.root = Path(root)
+        self.lock = threading.Lock()
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._active: Optional[int] = None
+        self._dirty: Set[int] = set()
+
+    def _path(self, segment: int) -> Path:
+        return self.root / f"seg-{segment:06d}.dat"
+
+    def _last_segment(self) -> int:
+        nums = [int(p.stem[4:]) for p in self.root.glob("seg-*.dat") if p.stem[4:].isdigit()]
+        return max(nums) if nums else 1
+
+    def append(self, blob: bytes) -> Tuple[int, int]:
+        """Append ``blob`` and return its (segment, offset); durable after the next sync()."""
+        with self.lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            seg = self._active if self._active is not None else self._last_segment()
+            path = self._path(seg)
+            size = path.stat().st_size if path.exists() else 0
+            if size and size + len(blob) > SEGMENT_MAX_BYTES:
+                seg, size = seg + 1, 0
+                path = self._path(seg)
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(blob)
+            self._dirty.add(seg)
+            self._active = seg
+        return seg, offset
+
+    def sync(self) -> None:
+        """fsync every segment appended to since the last call."""
+        with self.lock:
+            for seg in sorted(self._dirty):
+                with open(self._path(seg), "ab") as f:
+                    os.fsync(f.fileno())
+            self._dirty.clear()
+
+    def read(self, segment: int, offset: int, length: int) -> memoryview:
+        """Zero-copy view of a stored payload."""
+        m = self._maps.get(segment)
+        if m is None or offset + length > len(m):
+            with self.lock:
+                m = self._maps.get(segment)
+                if m is None or offset + length > len(m):
+                    # (Re)map the segment at its current size; views over an older map keep it alive
+                    with open(self._path(segment), "rb") as f:
+                        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._maps[segment] = m
+        if offset + length > len(m):
+            raise ValueError(f"segment {segment} is shorter than the referenced payload")
+        return memoryview(m)[offset:offset + length]
+
+    def sizes(self) -> Dict[int, int]:
+        """Segment number → file size."""
+        if not self.root.exists():
+            return {}
+        return {
+            int(p.stem[4:]): p.stat().st_size
+            for p in self.root.glob("seg-*.dat")
+            if p.stem[4:].isdigit()
+        }
+
+    def remove(self, segment: int) -> Optional[int]:
+        """Unmap and delete a segment; its size.
+
+        None when it could not be removed (still mapped on Windows).
+        """
+        with self.lock:
+            if segment == self._active:
+                self._active = None
+            m = self._maps.pop(segment, None)
+            if m is not None:
+                try:
+                    m.close()
+                except (BufferError, ValueError):
+                    pass
+            self._dirty.discard(segment)
+            path = self._path(segment)
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                return 0
+            except OSError:
+                return None
+        return size
+
+    def stats(self) -> Dict[str, Any]:
+        files = list(self.root.glob("seg-*.dat")) if self.root.exists() else []
+        return {
+            "segments": len(files),
+            "bytes": sum(p.stat().st_size for p in files),
+            "mapped": len(self._maps),
+        }
+
+    def close(self) -> None:
+        with self.lock:
+            for m in self._maps.values():
+                try:
+                    m.close()
+                except (BufferError, ValueError):
+                    pass  # a caller still holds a view; the map goes when it does
+            self._maps = {}
+            self._active = None
+
+
+_SEGMENTS: Dict[str, SegmentFiles] = {}
+_SEGMENTS_LOCK = threading.Lock()
+
+
+def segments_for(db_path: str) -> Optional[SegmentFiles]:
+    """Segment files of a database; None for in-memory databases (payloads stay inline)."""
+    if db_path.startswith("file:") or db_path == ":memory:":
+        return None
+    s = _SEGMENTS.get(db_path)
+    if s is None:
+        with _SEGMENTS_LOCK:
+            s = _SEGMENTS.get(db_path)
+            if s is None:
+                s = _SEGMENTS[db_path] = SegmentFiles(db_path + SEGMENTS_SUFFIX)
+    return s
+
+
+def close_segments() -> None:
+    for s in list(_SEGMENTS.values()):
+        s.close()
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
+import itertools
 import sqlite3
-import json
+import threading
 from contextlib import contextmanager
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from . import codec
+from .archive import TimelineArchive, archive_for, close_archives
 from .config import db_path
-
+from .decoded import decoded_cache
+from .schema import Match, Timeline, decode
+from .segments import SEGMENT_COMPACT_RATIO, SEGMENT_MIN_BYTES, close_segments, digest, segments_for
 
 SCHEMA = [
     # meta
@@ -33,7 +38,7 @@ SCHEMA = [
     # matches
     """
     CREATE TABLE IF NOT EXISTS matches (
-        match_id TEXT PRIMARY KEY,
+        match_id TEXT,
         puuid TEXT,
         queue_id INTEGER,
         game_creation_ms INTEGER,
@@ -41,7 +46,8 @@ SCHEMA = [
         patch TEXT,
         role TEXT,
         champion_id INTEGER,
-        raw_json TEXT
+        raw_json TEXT,
+        PRIMARY KEY (match_id, puuid)
     )
     """,
     # timelines raw
@@ -51,7 +57,7 @@ SCHEMA = [
         raw_json TEXT
     )
     """,
-    # frames (subset)
+    # frames (subset); natural key since schema 9
     """
     CREATE TABLE IF NOT EXISTS frames (
         match_id TEXT,
@@ -62,26 +68,29 @@ SCHEMA = [
         cs INTEGER,
         current_gold INTEGER,
         x REAL,
-        y REAL
+        y REAL,
+        PRIMARY KEY (match_id, ts_ms, participant_id)
     )
     """,
-    # events (subset)
+    # events (subset); seq = position in the match's timeline, since schema 9
     """
     CREATE TABLE IF NOT EXISTS events (
         match_id TEXT,
+        seq INTEGER,
         ts_ms INTEGER,
         type TEXT,
         participant_id INTEGER,
         killer_id INTEGER,
         victim_id INTEGER,
         item_id INTEGER,
-        ward_type TEXT
+        ward_type TEXT,
+        PRIMARY KEY (match_id, seq)
     )
     """,
     # metrics extras per match (wide row keyed by match_id + puuid)
     """
     CREATE TABLE IF NOT EXISTS metrics_extras (
-        match_id TEXT PRIMARY KEY,
+        match_id TEXT,
         puuid TEXT,
         dpm REAL,
         gpm REAL,
@@ -93,7 +102,8 @@ SCHEMA = [
         vision_per_min REAL,
         wards_placed INTEGER,
         wards_killed INTEGER,
-        roam_distance_pre14 REAL
+        roam_distance_pre14 REAL,
+        PRIMARY KEY (match_id, puuid)
     )
     """,
     # index for puuid lookups
@@ -103,7 +113,7 @@ SCHEMA = [
     # metrics per match
     """
     CREATE TABLE IF NOT EXISTS metrics (
-        match_id TEXT PRIMARY KEY,
+        match_id TEXT,
         puuid TEXT,
         queue_id INTEGER,
         patch TEXT,
@@ -119,7 +129,8 @@ SCHEMA = [
         first_recall_s INTEGER,
         ctrl_wards_pre14 INTEGER,
         kp_early REAL,
-        game_creation_ms INTEGER
+        game_creation_ms INTEGER,
+        PRIMARY KEY (match_id, puuid)
     )
     """,
     # windows cache
@@ -200,36 +211,601 @@ SCHEMA = [
     """,
 ]
 
+# compression dictionaries for raw_json blobs (see core/codec.py); schema 6
+BLOB_DICTS_DDL = """
+    CREATE TABLE IF NOT EXISTS blob_dicts (
+        dict_id INTEGER PRIMARY KEY,
+        codec TEXT,
+        kind TEXT, -- match|timeline
+        data BLOB,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# One columnar blob per match (core/frames.py) instead of a row per participant-frame; schema 8
+FRAME_MATRIX_DDL = """
+    CREATE TABLE IF NOT EXISTS frame_matrix (
+        match_id TEXT PRIMARY KEY,
+        n_frames INTEGER,
+        data BLOB
+    )
+"""
+
+# Scoreboard columns + precomputed domain badges per (match, player), filled at
+# ingest (core/summary.py) so the match list never parses raw_json; schema 10
+MATCH_SUMMARY_DDL = """
+    CREATE TABLE IF NOT EXISTS match_summary (
+        match_id TEXT,
+        puuid TEXT,
+        kills INTEGER,
+        deaths INTEGER,
+        assists INTEGER,
+        cs INTEGER,
+        gold INTEGER,
+        dmg_to_champs INTEGER,
+        vision_score INTEGER,
+        kp REAL,
+        win INTEGER,
+        domain_badges TEXT, -- JSON list, refreshed whenever inst_contrib changes
+        PRIMARY KEY (match_id, puuid)
+    )
+"""
+
+# Digest → location of payloads moved to the segment files (core/segments.py); schema 11
+SEGMENT_INDEX_DDL = """
+    CREATE TABLE IF NOT EXISTS segment_index (
+        digest BLOB PRIMARY KEY,
+        segment INTEGER,
+        offset INTEGER,
+        length INTEGER
+    ) WITHOUT ROWID
+"""
+
+# Resolved per-(match, player) context, written at ingest so nobody re-runs the lane
+# opponent search (core/timeline.py); the second index is the matchup dimension. Schema 12
+MATCH_CONTEXT_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS match_context (
+        match_id TEXT,
+        puuid TEXT,
+        participant_id INTEGER,
+        team_id INTEGER,
+        role TEXT,
+        opponent_id INTEGER,
+        opponent_champion_id INTEGER,
+        PRIMARY KEY (match_id, puuid)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_match_context_matchup"
+    " ON match_context(puuid, opponent_champion_id)",
+]
+CONTEXT_FIELDS = ("participant_id", "team_id", "role", "opponent_id", "opponent_champion_id")
+CONTEXT_BATCH = 200
+
+# Dashboard/match-list queries filter on puuid (+ queue) and sort by game time;
+# frame/event reads are per match. Schema 7.
+HOT_PATH_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_matches_puuid_queue_time"
+    " ON matches(puuid, queue_id, game_creation_ms)",
+    "CREATE INDEX IF NOT EXISTS idx_matches_puuid_time ON matches(puuid, game_creation_ms)",
+    "CREATE INDEX IF NOT EXISTS idx_metrics_puuid_queue_time"
+    " ON metrics(puuid, queue_id, game_creation_ms)",
+    "CREATE INDEX IF NOT EXISTS idx_metrics_puuid_time ON metrics(puuid, game_creation_ms)",
+    "CREATE INDEX IF NOT EXISTS idx_frames_match ON frames(match_id, ts_ms)",
+    "CREATE INDEX IF NOT EXISTS idx_events_match ON events(match_id, ts_ms)",
+]
+
+# Tables holding raw Riot payloads, by dictionary kind
+_RAW_TABLES = {"match": "matches", "timeline": "timelines"}
+RECOMPRESS_BATCH = 200
+DICT_SAMPLES = 256
+# Too few rows give a dictionary tuned to one game; wait for more history
+DICT_MIN_SAMPLES = 32
+
+# Timeline retention (config `retention`): archive once older than N days or
+# outside the newest K matches; 0/None disables a rule
+TIMELINE_KEEP_DAYS = 90
+TIMELINE_KEEP_LAST = 200
+ARCHIVE_BATCH = 100
+# Queues GIS scores (config gis.rankedQueues); only their timelines wait for inst_contrib rows
+GIS_QUEUES = (420, 440)
+# Pages handed back per incremental_vacuum call (4 KiB pages → 32 MiB)
+VACUUM_PAGES = 8192
+
+
+# Tables whose rows are per (match, player) since roster support (schema 5)
+_PER_PLAYER_TABLES = ("matches", "metrics", "metrics_extras")
+
+
+def _migrate_per_player_keys(con: sqlite3.Connection) -> None:
+    """Rebuild pre-roster tables keyed by match_id alone onto (match_id, puuid)."""
+    stale = []
+    for table in _PER_PLAYER_TABLES:
+        info = con.execute(f"PRAGMA table_info({table})").fetchall()
+        if [r[1] for r in sorted(info, key=lambda r: r[5]) if r[5]] == ["match_id"]:
+            stale.append((table, ",".join(r[1] for r in info)))
+    if not stale:
+        return
+    derived = [s for s in SCHEMA if "CREATE VIEW" in s or "CREATE INDEX" in s]
+    # Views would follow the renamed tables (and be re-validated); drop and recreate them
+    for stmt in derived:
+        kind = "VIEW" if "CREATE VIEW" in stmt else "INDEX"
+        con.execute(f"DROP {kind} IF EXISTS {stmt.split('EXISTS', 1)[1].split()[0]}")
+    for table, cols in stale:
+        ddl = next(s for s in SCHEMA if f"CREATE TABLE IF NOT EXISTS {table} (" in s)
+        con.execute(f"ALTER TABLE {table} RENAME TO {table}_v4")
+        con.execute(ddl)
+        con.execute(f"INSERT OR IGNORE INTO {table}({cols}) SELECT {cols} FROM {table}_v4")
+        con.execute(f"DROP TABLE {table}_v4")
+    for stmt in derived:
+        con.execute(stmt)
+    con.execute("UPDATE meta SET value='5' WHERE key='schema_version'")
+
+
+def _schema_version(con: sqlite3.Connection) -> int:
+    try:
+        row = con.execute("SELECT value FROM meta WHERE key='schema_version'").fetchone()
+        return int(row[0]) if row else 0
+    except (sqlite3.OperationalError, TypeError, ValueError):
+        return 0
+
+
+def _base_schema(con: sqlite3.Connection) -> None:
+    # Idempotent; also lifts databases from before versioning (or stamped '3' by old /health)
+    for stmt in SCHEMA:
+        con.execute(stmt)
+    _migrate_per_player_keys(con)
+
+
+def _blob_dicts_table(con: sqlite3.Connection) -> None:
+    con.execute(BLOB_DICTS_DDL)
+
+
+def _hot_path_indexes(con: sqlite3.Connection) -> None:
+    for stmt in HOT_PATH_INDEXES:
+        con.execute(stmt)
+    con.execute("ANALYZE")
+
+
+def _frame_matrix_table(con: sqlite3.Connection) -> None:
+    con.execute(FRAME_MATRIX_DDL)
+
+
+# Keyless pre-9 tables, drained into the keyed ones by core.compact
+LEGACY_SUFFIX = "_legacy"
+
+
+def _natural_keys_frames_events(con: sqlite3.Connection) -> None:
+    # The renamed tables keep their schema 7 index names; step 13 indexes the new tables
+    for table in ("frames", "events"):
+        if any(r[5] for r in con.execute(f"PRAGMA table_info({table})").fetchall()):
+            continue
+        ddl = next(s for s in SCHEMA if f"CREATE TABLE IF NOT EXISTS {table} (" in s)
+        if con.execute(f"SELECT EXISTS(SELECT 1 FROM {table})").fetchone()[0]:
+            # Keep the rows (and their match_id index) aside for the compaction job
+            con.execute(f"ALTER TABLE {table} RENAME TO {table}{LEGACY_SUFFIX}")
+        else:
+            con.execute(f"DROP TABLE {table}")
+        con.execute(ddl)
+
+
+def _frames_events_indexes(con: sqlite3.Connection) -> None:
+    # RENAME kept idx_frames_match/idx_events_match on the *_legacy tables; give those their own
+    # names and put the per-match (match_id, ts_ms) indexes back on the keyed tables
+    for table in ("frames", "events"):
+        name = f"idx_{table}_match"
+        row = con.execute(
+            "SELECT tbl_name FROM sqlite_master WHERE type='index' AND name=?", (name,)
+        ).fetchone()
+        if row is not None and row[0] != table:
+            con.execute(f"DROP INDEX {name}")
+            con.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{row[0]}_match ON {row[0]}(match_id, ts_ms)"
+            )
+    for stmt in HOT_PATH_INDEXES:
+        if " ON frames(" in stmt or " ON events(" in stmt:
+            con.execute(stmt)
+
+
+def _match_summary_table(con: sqlite3.Connection) -> None:
+    from .summary import summarize
+
+    con.execute(MATCH_SUMMARY_DDL)
+    # One-off backfill from the stored payloads (later rows are written at ingest)
+    for mid, puuid, raw in con.execute("SELECT match_id, puuid, raw_json FROM matches").fetchall():
+        try:
+            row = summarize(codec.loads(raw, {}), puuid)
+        except Exception:
+            row = None
+        if row:
+            _write_summary(con, mid, puuid, row)
+    for mid, puuid in con.execute("SELECT DISTINCT match_id, puuid FROM inst_contrib").fetchall():
+        _refresh_badges(con, mid, puuid)
+
+
+def _write_summary(con: sqlite3.Connection, match_id: str, puuid: str, row: Dict[str, Any]) -> None:
+    from .summary import SUMMARY_FIELDS
+
+    cols = ",".join(SUMMARY_FIELDS)
+    con.execute(
+        f"""
+        INSERT INTO match_summary(match_id, puuid, {cols})
+        VALUES(?,?,{",".join(["?"] * len(SUMMARY_FIELDS))})
+        ON CONFLICT(match_id, puuid) DO UPDATE SET
+        {",".join(f"{c}=excluded.{c}" for c in SUMMARY_FIELDS)}
+        """,
+        (match_id, puuid, *[row.get(c) for c in SUMMARY_FIELDS]),
+    )
+
+
+def _refresh_badges(con: sqlite3.Connection, match_id: str, puuid: str) -> None:
+    # Badges follow inst_contrib; a match without a summary row has nothing to decorate
+    from .summary import domain_badges
+
+    rows = con.execute(
+        "SELECT domain, inst_score, z_metrics FROM inst_contrib WHERE match_id=? AND puuid=?",
+        (match_id, puuid),
+    ).fetchall()
+    con.execute(
+        "UPDATE match_summary SET domain_badges=? WHERE match_id=? AND puuid=?",
+        (codec.json_dumps(domain_badges(rows)) if rows else None, match_id, puuid),
+    )
+
+
+def _segment_index_table(con: sqlite3.Connection) -> None:
+    con.execute(SEGMENT_INDEX_DDL)
+
+
+def _match_context_table(con: sqlite3.Connection) -> None:
+    # Existing matches are filled by Store.backfill_match_context
+    # (payloads may need segments/dictionaries)
+    for stmt in MATCH_CONTEXT_DDL:
+        con.execute(stmt)
+
+
+# (version reached, step); each step runs once, in order, when meta.schema_version is below it
+MIGRATIONS = [
+    (5, _base_schema),
+    (6, _blob_dicts_table),
+    (7, _hot_path_indexes),
+    (8, _frame_matrix_table),
+    (9, _natural_keys_frames_events),
+    (10, _match_summary_table),
+    (11, _segment_index_table),
+    (12, _match_context_table),
+    (13, _frames_events_indexes),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(con: sqlite3.Connection) -> int:
+    """Apply pending migrations on ``con``; returns the resulting schema version."""
+    ver = _schema_version(con)
+    for target, step in MIGRATIONS:
+        if ver >= target:
+            continue
+        step(con)
+        con.execute(
+            "INSERT INTO meta(key,value) VALUES('schema_version',?)"
+            " ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+            (str(target),),
+        )
+        ver = target
+    return ver
+
+
+def _load_blob_dicts(con: sqlite3.Connection) -> Dict[str, Optional[int]]:
+    # Register every stored dictionary (old blobs may reference retired ones)
+    for _did, cname, data in con.execute("SELECT dict_id, codec, data FROM blob_dicts").fetchall():
+        if cname in codec.available_codecs():
+            codec.register_dict(cname, data)
+    ids: Dict[str, Optional[int]] = {}
+    for kind in _RAW_TABLES:
+        row = con.execute("SELECT value FROM meta WHERE key=?", (f"codec:dict:{kind}",)).fetchone()
+        did = int(row[0]) if row and row[0] else None
+        ids[kind] = did if codec.known_dict(did) else None
+    return ids
+
+
+def _by_match(rows: Iterable[Tuple]) -> Dict[str, List[Tuple]]:
+    out: Dict[str, List[Tuple]] = {}
+    for r in rows:
+        out.setdefault(r[0], []).append(r)
+    return out
+
+
+# Databases migrated by this process → their active blob dictionary ids
+_READY: Dict[str, Dict[str, Optional[int]]] = {}
+_READY_LOCK = threading.Lock()
+
+
+# Open transaction() connections for the current thread, keyed by db_path
+_TX_LOCAL = threading.local()
+
+
+def _tx_map() -> Dict[str, sqlite3.Connection]:
+    m = getattr(_TX_LOCAL, "by_path", None)
+    if m is None:
+        m = _TX_LOCAL.by_path = {}
+    return m
+
+
+def _active_tx(path: str) -> Optional[sqlite3.Connection]:
+    return _tx_map().get(path)
+
+
+def _tx_stale() -> Dict[str, List[Tuple[str, str, str]]]:
+    # Decoded-cache keys written inside each open transaction(); invalidated again when it ends
+    m = getattr(_TX_LOCAL, "stale", None)
+    if m is None:
+        m = _TX_LOCAL.stale = {}
+    return m
+
+
+BUSY_TIMEOUT_MS = 5000
+READ_CACHE_KIB = 16 * 1024
+WRITE_CACHE_KIB = 8 * 1024
+MMAP_BYTES = 256 * 1024 * 1024
+
+
+class _Pool:
+    """Long-lived connections for one database, each configured once.
+
+    One writer connection shared by all threads behind a re-entrant lock (SQLite
+    allows a single writer anyway, so waiting on the lock replaces SQLITE_BUSY
+    retries), plus one `query_only` reader per thread. WAL lets readers run while
+    the writer commits. `:memory:` databases are per-connection, so there the
+    writer serves reads too (under the same lock).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.memory = path.startswith(_MEMORY_PREFIX)
+        self.lock = threading.RLock()
+        self._local = threading.local()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._readers: List[sqlite3.Connection] = []
+        self.opened = 0
+
+    def _open(self, read_only: bool) -> sqlite3.Connection:
+        con = sqlite3.connect(
+            self.path, check_same_thread=read_only and not self.memory, uri=self.memory
+        )
+        try:
+            con.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            con.execute("PRAGMA temp_store=MEMORY")
+            con.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+            if read_only:
+                con.execute(f"PRAGMA cache_size=-{READ_CACHE_KIB}")
+                con.execute("PRAGMA query_only=ON")
+            else:
+                # Takes effect for new databases; existing ones need Store.enable_incremental_vacuum
+                con.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                con.execute("PRAGMA journal_mode=WAL")
+                con.execute("PRAGMA synchronous=NORMAL")
+                con.execute(f"PRAGMA cache_size=-{WRITE_CACHE_KIB}")
+        except Exception:
+            pass
+        self.opened += 1
+        return con
+
+    def writer(self) -> sqlite3.Connection:
+        # Caller holds self.lock
+        if self._writer is None:
+            self._writer = self._open(read_only=False)
+        return self._writer
+
+    def reader(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._local.con = self._open(read_only=True)
+            with self.lock:
+                self._readers.append(con)
+        return con
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "opened": self.opened,
+            "readers": len(self._readers),
+            "writer": self._writer is not None,
+        }
+
+    def close(self) -> None:
+        with self.lock:
+            for con in self._readers + ([self._writer] if self._writer else []):
+                try:
+                    con.close()
+                except Exception:
+                    pass
+            self._readers = []
+            self._writer = None
+            self._local = threading.local()
+
+
+_POOLS: Dict[str, _Pool] = {}
+# Store(":memory:") gets a private database under a unique pool key
+_MEMORY_PREFIX = "file:loltrack-memory-"
+_MEMORY_SEQ = itertools.count(1)
+_POOLS_LOCK = threading.Lock()
+
+
+def _pool(path: str) -> _Pool:
+    p = _POOLS.get(path)
+    if p is None:
+        with _POOLS_LOCK:
+            p = _POOLS.get(path)
+            if p is None:
+                p = _POOLS[path] = _Pool(path)
+    return p
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return {path: p.stats() for path, p in list(_POOLS.items())}
+
+
+def close_pools() -> None:
+    """Close every pooled connection (app shutdown); pools reopen lazily on next use."""
+    for p in list(_POOLS.values()):
+        p.close()
+    close_archives()
+    close_segments()
+    decoded_cache().clear()
+
+
+NormKey = Tuple[Optional[int], Optional[str], str]  # (queue, role, metric)
+
+
+@dataclass
+class GisState:
+    """GIS rows of one (player, queue, role) context, read and written in bulk.
+
+    ``norms`` also holds the relaxed (queue, None) / (None, role) / (None, None)
+    baselines that standardization falls back to. Setters only record the change;
+    Store.save_gis_state writes everything that changed in one transaction.
+    """
+
+    player_id: str
+    queue: Optional[int]
+    role: Optional[str]
+    norms: Dict[NormKey, Tuple[float, float]] = field(default_factory=dict)
+    domains: Dict[str, float] = field(default_factory=dict)
+    overall: Optional[float] = None
+    _dirty_norms: Dict[str, Tuple[float, float]] = field(default_factory=dict, repr=False)
+    _dirty_domains: Dict[str, float] = field(default_factory=dict, repr=False)
+    _dirty_overall: bool = field(default=False, repr=False)
+
+    def norm(self, metric: str) -> Tuple[Optional[float], Optional[float]]:
+        """Baseline for ``metric``: exact context, then relax role, then queue, then both."""
+        for q, r in ((self.queue, self.role), (None, self.role), (self.queue, None), (None, None)):
+            mu_var = self.norms.get((q, r, metric))
+            if mu_var is not None:
+                return mu_var
+        return None, None
+
+    def set_norm(self, metric: str, mean: float, var: float) -> None:
+        self.norms[(self.queue, self.role, metric)] = self._dirty_norms[metric] = (
+            float(mean),
+            float(var),
+        )
+
+    def set_domain(self, domain: str, value: float) -> None:
+        self.domains[domain] = self._dirty_domains[domain] = float(value)
+
+    def set_overall(self, value: float) -> None:
+        self.overall = float(value)
+        self._dirty_overall = True
+
 
 @dataclass
 class Store:
     db_path: str = db_path()
 
     def __post_init__(self):
-        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-        with self.connect() as con:
-            con.row_factory = sqlite3.Row
-            cur = con.cursor()
-            for stmt in SCHEMA:
-                cur.execute(stmt)
-            # ensure schema_version
-            cur.execute("INSERT OR IGNORE INTO meta(key,value) VALUES('schema_version','4')")
-            con.commit()
+        if self.db_path == ":memory:":
+            self.db_path = f"{_MEMORY_PREFIX}{next(_MEMORY_SEQ)}?mode=memory&cache=shared"
+        # Migrations run once per database per process; later Store() calls are free
+        if self.db_path in _READY:
+            return
+        with _READY_LOCK:
+            if self.db_path in _READY:
+                return
+            if not _pool(self.db_path).memory:
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            with self._writer() as con:
+                migrate(con)
+                _READY[self.db_path] = _load_blob_dicts(con)
+
+    @property
+    def _blob_dict_ids(self) -> Dict[str, Optional[int]]:
+        return _READY[self.db_path]
 
     @contextmanager
     def connect(self):
-        con = sqlite3.connect(self.db_path)
-        try:
-            # Enable WAL + sane pragmas
-            con.execute("PRAGMA journal_mode=WAL")
-            con.execute("PRAGMA synchronous=NORMAL")
-            con.execute("PRAGMA temp_store=MEMORY")
-        except Exception:
-            pass
-        try:
-            yield con
-        finally:
-            con.close()
+        """Read connection: this thread's pooled `query_only` connection.
+
+        Inside transaction() it is the transaction's connection instead, so reads see
+        pending writes. Writes go through the Store methods or transaction().
+        """
+        tx = _active_tx(self.db_path)
+        if tx is not None:
+            tx.row_factory = None
+            yield tx
+            return
+        pool = _pool(self.db_path)
+        if pool.memory:
+            with pool.lock:
+                con = pool.writer()
+                con.row_factory = None
+                yield con
+            return
+        con = pool.reader()
+        if con.in_transaction:
+            con.rollback()
+        # Callers often switch to sqlite3.Row; start every checkout from tuples
+        con.row_factory = None
+        yield con
+
+    def in_transaction(self) -> bool:
+        """True while this thread has a transaction() open on this database."""
+        return _active_tx(self.db_path) is not None
+
+    @contextmanager
+    def transaction(self):
+        """Group every Store write on this thread into one commit.
+
+        Nested calls join the outermost transaction; any Store instance pointing at
+        the same database participates, so helpers that build their own Store()
+        still land in the caller's unit of work. Rolls back on exception.
+        """
+        if _active_tx(self.db_path) is not None:
+            yield self
+            return
+        pool = _pool(self.db_path)
+        with pool.lock:
+            con = pool.writer()
+            con.row_factory = None
+            con.execute("BEGIN IMMEDIATE")
+            _tx_map()[self.db_path] = con
+            stale = _tx_stale()[self.db_path] = []
+            try:
+                yield self
+                self._sync_segments()
+                con.commit()
+            except BaseException:
+                con.rollback()
+                raise
+            finally:
+                _tx_map().pop(self.db_path, None)
+                _tx_stale().pop(self.db_path, None)
+                # Other threads may have cached the old payload until the commit landed
+                for key in stale:
+                    decoded_cache().invalidate(key)
+
+    @contextmanager
+    def _writer(self):
+        # Commit per call unless an enclosing transaction() owns the commit
+        tx = _active_tx(self.db_path)
+        if tx is not None:
+            tx.row_factory = None
+            yield tx
+            return
+        pool = _pool(self.db_path)
+        with pool.lock:
+            con = pool.writer()
+            con.row_factory = None
+            try:
+                yield con
+                self._sync_segments()
+                con.commit()
+            except BaseException:
+                con.rollback()
+                raise
+
+    def _sync_segments(self) -> None:
+        # Payloads appended in this unit of work must be on disk before rows reference them
+        seg = segments_for(self.db_path)
+        if seg is not None:
+            seg.sync()
 
     # Basic upserts
     def upsert_match_raw(
@@ -243,14 +819,26 @@ class Store:
         role: str | None,
         champion_id: int,
         raw_json: str,
+        summary: Optional[Dict[str, Any]] = None,
     ) -> None:
-        with self.connect() as con:
+        """Store a player's match row and its match_summary line.
+
+        ``summary`` (core.summary.summarize) saves re-parsing ``raw_json`` when the
+        caller already has the payload decoded.
+        """
+        if summary is None:
+            from .summary import summarize
+
+            try:
+                summary = summarize(codec.json_loads(raw_json) if raw_json else {}, puuid)
+            except Exception:
+                summary = None
+        with self._writer() as con:
             con.execute(
                 """
                 INSERT INTO matches(match_id, puuid, queue_id, game_creation_ms, game_duration_s, patch, role, champion_id, raw_json)
                 VALUES(?,?,?,?,?,?,?,?,?)
-                ON CONFLICT(match_id) DO UPDATE SET
-                    puuid=excluded.puuid,
+                ON CONFLICT(match_id, puuid) DO UPDATE SET
                     queue_id=excluded.queue_id,
                     game_creation_ms=excluded.game_creation_ms,
                     game_duration_s=excluded.game_duration_s,
@@ -268,44 +856,154 @@ class Store:
                     patch,
                     role,
                     champion_id,
-                    raw_json,
+                    self._pack_raw(con, "match", raw_json),
                 ),
             )
-            con.commit()
+            if summary:
+                _write_summary(con, match_id, puuid, summary)
+        self._invalidate_decoded("match", match_id)
 
     def upsert_timeline_raw(self, match_id: str, raw_json: str) -> None:
-        with self.connect() as con:
+        with self._writer() as con:
             con.execute(
                 """
                 INSERT INTO timelines(match_id, raw_json)
                 VALUES(?,?)
                 ON CONFLICT(match_id) DO UPDATE SET raw_json=excluded.raw_json
                 """,
-                (match_id, raw_json),
+                (match_id, self._pack_raw(con, "timeline", raw_json)),
             )
-            con.commit()
+        self._invalidate_decoded("timeline", match_id)
 
-    def insert_frames(self, frames: Iterable[Tuple]) -> None:
-        with self.connect() as con:
+    def _invalidate_decoded(self, kind: str, match_id: str) -> None:
+        # After the write is visible (or, inside transaction(), now and again when it ends)
+        key = (self.db_path, kind, match_id)
+        decoded_cache().invalidate(key)
+        stale = _tx_stale().get(self.db_path)
+        if stale is not None:
+            stale.append(key)
+
+    def _pack_raw(self, con: sqlite3.Connection, kind: str, text: Optional[str]) -> codec.Packed:
+        # Large payloads go to the segment files (once per distinct content);
+        # the row keeps a reference
+        packed = codec.pack(text, self._blob_dict_ids.get(kind))
+        seg = segments_for(self.db_path)
+        if seg is None or not isinstance(packed, bytes) or len(packed) < SEGMENT_MIN_BYTES:
+            return packed
+        return self._segment_ref(
+            con, seg, digest(text.encode("utf-8") if isinstance(text, str) else bytes(text)), packed
+        )
+
+    def _segment_ref(self, con: sqlite3.Connection, seg, key: bytes, packed: bytes) -> bytes:
+        row = con.execute(
+            "SELECT segment, offset, length FROM segment_index WHERE digest=?", (key,)
+        ).fetchone()
+        if row is None:
+            row = (*seg.append(packed), len(packed))
+            con.execute(
+                "INSERT INTO segment_index(digest, segment, offset, length) VALUES(?,?,?,?)",
+                (key, *row),
+            )
+        return codec.make_ref(key, *row)
+
+    def raw_bytes(self, value: codec.Packed) -> codec.Packed:
+        """Resolve a stored raw_json value.
+
+        Segment references become a zero-copy view of the mapped payload.
+        """
+        loc = codec.ref_location(value)
+        if loc is None:
+            return value
+        seg = segments_for(self.db_path)
+        if seg is None:
+            return None
+        return seg.read(*loc)
+
+    def loads_raw(
+        self, value: codec.Packed, default: Any = None, schema: Optional[type] = None
+    ) -> Any:
+        """codec.loads for a stored raw_json value, wherever the payload lives.
+
+        With a core.schema type (Match, Timeline) only that subset is decoded.
+        """
+        if schema is None:
+            return codec.loads(self.raw_bytes(value), default)
+        raw = codec.unpack_bytes(self.raw_bytes(value))
+        return decode(schema, raw) if raw else default
+
+    def unpack_raw(self, value: codec.Packed) -> Optional[str]:
+        return codec.unpack(self.raw_bytes(value))
+
+    def replace_match_frames(self, match_id: str, frames: Iterable[Tuple]) -> None:
+        """Make ``frames`` the stored frame rows of ``match_id``.
+
+        Delete-then-insert, in one transaction.
+        """
+        with self.transaction(), self._writer() as con:
+            con.execute("DELETE FROM frames WHERE match_id=?", (match_id,))
             con.executemany(
                 """
-                INSERT INTO frames(match_id, ts_ms, participant_id, total_gold, xp, cs, current_gold, x, y)
+                INSERT OR REPLACE INTO frames(
+                    match_id, ts_ms, participant_id, total_gold, xp, cs, current_gold, x, y
+                )
                 VALUES(?,?,?,?,?,?,?,?,?)
                 """,
-                list(frames),
+                [(match_id, *r[1:]) for r in frames],
             )
-            con.commit()
 
-    def insert_events(self, events: Iterable[Tuple]) -> None:
+    def insert_frames(self, frames: Iterable[Tuple]) -> None:
+        # Re-ingest safe: every match present in ``frames`` is replaced as a whole
+        for mid, rows in _by_match(frames).items():
+            self.replace_match_frames(mid, rows)
+
+    def upsert_frame_matrix(self, match_id: str, blob: bytes) -> None:
+        n_frames = int.from_bytes(blob[4:6], "little") if blob else 0
+        with self._writer() as con:
+            con.execute(
+                """
+                INSERT INTO frame_matrix(match_id, n_frames, data) VALUES(?,?,?)
+                ON CONFLICT(match_id) DO UPDATE SET n_frames=excluded.n_frames, data=excluded.data
+                """,
+                (match_id, n_frames, blob),
+            )
+
+    def load_frame_matrix(self, match_id: str):
+        """Stored FrameMatrix (zero-copy NumPy views over the blob), or None."""
         with self.connect() as con:
+            row = con.execute(
+                "SELECT data FROM frame_matrix WHERE match_id=?", (match_id,)
+            ).fetchone()
+        if not row or not row[0]:
+            return None
+        from .frames import FrameMatrix
+
+        try:
+            return FrameMatrix.from_blob(row[0])
+        except Exception:
+            return None
+
+    def replace_match_events(self, match_id: str, events: Iterable[Tuple]) -> None:
+        """Make ``events`` (timeline order) the stored events of ``match_id``.
+
+        seq is their position.
+        """
+        with self.transaction(), self._writer() as con:
+            con.execute("DELETE FROM events WHERE match_id=?", (match_id,))
             con.executemany(
                 """
-                INSERT INTO events(match_id, ts_ms, type, participant_id, killer_id, victim_id, item_id, ward_type)
-                VALUES(?,?,?,?,?,?,?,?)
+                INSERT INTO events(
+                    match_id, seq, ts_ms, type, participant_id,
+                    killer_id, victim_id, item_id, ward_type
+                )
+                VALUES(?,?,?,?,?,?,?,?,?)
                 """,
-                list(events),
+                [(match_id, seq, *r[1:]) for seq, r in enumerate(events)],
             )
-            con.commit()
+
+    def insert_events(self, events: Iterable[Tuple]) -> None:
+        # Re-ingest safe: every match present in ``events`` is replaced as a whole
+        for mid, rows in _by_match(events).items():
+            self.replace_match_events(mid, rows)
 
     def upsert_metrics(self, match_id: str, row: Dict[str, Any]) -> None:
         keys = [
@@ -328,12 +1026,11 @@ class Store:
             "game_creation_ms",
         ]
         values = [row.get(k) for k in keys]
-        with self.connect() as con:
+        with self._writer() as con:
             con.execute(
                 f"""
-                INSERT INTO metrics({','.join(keys)}) VALUES({','.join(['?']*len(keys))})
-                ON CONFLICT(match_id) DO UPDATE SET
-                    puuid=excluded.puuid,
+                INSERT INTO metrics({",".join(keys)}) VALUES({",".join(["?"] * len(keys))})
+                ON CONFLICT(match_id, puuid) DO UPDATE SET
                     queue_id=excluded.queue_id,
                     patch=excluded.patch,
                     role=excluded.role,
@@ -352,7 +1049,93 @@ class Store:
                 """,
                 values,
             )
-            con.commit()
+
+    def upsert_match_context(
+        self, match_id: str, puuid: str, ctx: Optional[Dict[str, Any]]
+    ) -> None:
+        """Store ParsedTimeline.context(puuid); None records a player missing from the payload."""
+        ctx = ctx or {}
+        with self._writer() as con:
+            con.execute(
+                f"""
+                INSERT INTO match_context(match_id, puuid, {",".join(CONTEXT_FIELDS)})
+                VALUES(?,?,{",".join(["?"] * len(CONTEXT_FIELDS))})
+                ON CONFLICT(match_id, puuid) DO UPDATE SET
+                {",".join(f"{c}=excluded.{c}" for c in CONTEXT_FIELDS)}
+                """,
+                (match_id, puuid, *[ctx.get(c) for c in CONTEXT_FIELDS]),
+            )
+
+    def get_match_context(self, match_id: str, puuid: str) -> Optional[Dict[str, Any]]:
+        with self.connect() as con:
+            row = con.execute(
+                f"SELECT {','.join(CONTEXT_FIELDS)} FROM match_context"
+                " WHERE match_id=? AND puuid=?",
+                (match_id, puuid),
+            ).fetchone()
+        return dict(zip(CONTEXT_FIELDS, row)) if row else None
+
+    def use_match_context(self, match_id: str, puuid: str, parsed) -> Optional[Dict[str, Any]]:
+        """Seed ``parsed`` (a ParsedTimeline) with the stored lane opponent of ``puuid``.
+
+        Matches stored before match_context existed get their row resolved from
+        ``parsed`` and written here.
+        """
+        ctx = self.get_match_context(match_id, puuid)
+        if ctx is None:
+            ctx = parsed.context(puuid)
+            try:
+                self.upsert_match_context(match_id, puuid, ctx)
+            except Exception:
+                pass
+        elif ctx["participant_id"] is not None:
+            parsed.set_opponent(ctx["participant_id"], ctx["opponent_id"])
+        return ctx
+
+    def backfill_match_context(
+        self,
+        batch: int = CONTEXT_BATCH,
+        stop: Optional[threading.Event] = None,
+        max_batches: Optional[int] = None,
+    ) -> int:
+        """Resolve match_context for player rows stored without one; returns rows written.
+
+        Reads the typed match and the stored frame matrix (the timeline only when the
+        match has none), so archived timelines stay where they are.
+        """
+        from .timeline import ParsedTimeline
+
+        q = """
+            SELECT m.match_id, m.puuid FROM matches m
+            LEFT JOIN match_context c ON c.match_id = m.match_id AND c.puuid = m.puuid
+            WHERE c.match_id IS NULL
+            LIMIT ?
+        """
+        written = batches = 0
+        while not (
+            (stop is not None and stop.is_set())
+            or (max_batches is not None and batches >= max_batches)
+        ):
+            with self.connect() as con:
+                rows = con.execute(q, (batch,)).fetchall()
+            if not rows:
+                break
+            with self.transaction():
+                for mid, rows_m in _by_match(rows).items():
+                    # Decoded directly: a one-off pass would only churn the decoded cache
+                    match = self.loads_raw(self.load_match_raw(mid), {}, Match)
+                    frames = self.load_frame_matrix(mid)
+                    timeline = (
+                        self.loads_raw(self.load_timeline_raw(mid), {}, Timeline)
+                        if frames is None
+                        else {}
+                    )
+                    pt = ParsedTimeline.build(match, timeline, frames)
+                    for _, puuid in rows_m:
+                        self.upsert_match_context(mid, puuid, pt.context(puuid))
+                        written += 1
+            batches += 1
+        return written
 
     def upsert_metrics_extras(self, match_id: str, row: Dict[str, Any]) -> None:
         keys = [
@@ -371,12 +1154,11 @@ class Store:
             "roam_distance_pre14",
         ]
         values = [row.get(k) for k in keys]
-        with self.connect() as con:
+        with self._writer() as con:
             con.execute(
                 f"""
-                INSERT INTO metrics_extras({','.join(keys)}) VALUES({','.join(['?']*len(keys))})
-                ON CONFLICT(match_id) DO UPDATE SET
-                    puuid=excluded.puuid,
+                INSERT INTO metrics_extras({",".join(keys)}) VALUES({",".join(["?"] * len(keys))})
+                ON CONFLICT(match_id, puuid) DO UPDATE SET
                     dpm=excluded.dpm,
                     gpm=excluded.gpm,
                     obj_participation=excluded.obj_participation,
@@ -391,7 +1173,6 @@ class Store:
                 """,
                 values,
             )
-            con.commit()
 
     # Windows cache helpers
     def upsert_window(
@@ -405,7 +1186,7 @@ class Store:
         trend: float,
         spark: str,
     ) -> None:
-        with self.connect() as con:
+        with self._writer() as con:
             con.execute(
                 """
                 INSERT INTO windows(key, metric, window_type, window_value, value, n, trend, spark, updated_at)
@@ -419,14 +1200,43 @@ class Store:
                 """,
                 (key, metric, window_type, window_value, value, n, trend, spark),
             )
-            con.commit()
 
     # Queries
-    def seen_match_ids(self) -> set[str]:
+    def seen_match_ids(self, puuid: Optional[str] = None) -> set[str]:
+        """Stored match ids; with ``puuid``, only those already ingested for that player."""
         with self.connect() as con:
-            rows = con.execute("SELECT match_id FROM matches").fetchall()
+            if puuid is None:
+                rows = con.execute("SELECT DISTINCT match_id FROM matches").fetchall()
+            else:
+                rows = con.execute(
+                    "SELECT match_id FROM matches WHERE puuid=?", (puuid,)
+                ).fetchall()
         return {r[0] for r in rows}
 
+    def known_match_ids(self, match_ids: Iterable[str], puuid: Optional[str] = None) -> set[str]:
+        """Which of ``match_ids`` are stored (for ``puuid`` when given).
+
+        Probes the (match_id, puuid) primary key with IN lists, so the cost follows the
+        number of candidates rather than the size of the history.
+        """
+        ids = list(dict.fromkeys(match_ids))
+        found: set[str] = set()
+        with self.connect() as con:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i : i + 500]
+                ph = ",".join("?" * len(chunk))
+                if puuid is None:
+                    rows = con.execute(
+                        f"SELECT DISTINCT match_id FROM matches WHERE match_id IN ({ph})", chunk
+                    ).fetchall()
+                else:
+                    rows = con.execute(
+                        f"SELECT match_id FROM matches WHERE match_id IN ({ph}) AND puuid=?",
+                        [*chunk, puuid],
+                    ).fetchall()
+                found.update(r[0] for r in rows)
+        return found
+
     def recent_metrics(self, puuid: str, queue_filter: Optional[int] = None) -> List[sqlite3.Row]:
         query = "SELECT * FROM metrics WHERE puuid=?"
         params: list[Any] = [puuid]
@@ -439,7 +1249,9 @@ class Store:
             rows = con.execute(query, params).fetchall()
         return list(rows)
 
-    def metrics_since(self, puuid: str, since_ms: int, queue_filter: Optional[int] = None) -> List[sqlite3.Row]:
+    def metrics_since(
+        self, puuid: str, since_ms: int, queue_filter: Optional[int] = None
+    ) -> List[sqlite3.Row]:
         query = "SELECT * FROM metrics WHERE puuid=? AND game_creation_ms>=?"
         params: list[Any] = [puuid, since_ms]
         if queue_filter is not None:
@@ -457,26 +1269,37 @@ class Store:
             return row[0] if row else None
 
     def set_meta(self, key: str, value: str) -> None:
-        with self.connect() as con:
+        with self._writer() as con:
             con.execute(
                 "INSERT INTO meta(key,value) VALUES(?,?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
                 (key, value),
             )
-            con.commit()
 
     # GIS helpers
-    def load_norm(self, player_id: str, queue: Optional[int], role: Optional[str], metric: str) -> Tuple[Optional[float], Optional[float]]:
+    def load_norm(
+        self, player_id: str, queue: Optional[int], role: Optional[str], metric: str
+    ) -> Tuple[Optional[float], Optional[float]]:
         with self.connect() as con:
             row = con.execute(
                 "SELECT ewma_mean, ewma_var FROM norm_state WHERE player_id=? AND queue IS ? AND role IS ? AND metric=?",
                 (player_id, queue, role, metric),
             ).fetchone()
             if row:
-                return float(row[0]) if row[0] is not None else None, float(row[1]) if row[1] is not None else None
+                return float(row[0]) if row[0] is not None else None, float(row[1]) if row[
+                    1
+                ] is not None else None
             return None, None
 
-    def upsert_norm(self, player_id: str, queue: Optional[int], role: Optional[str], metric: str, mean: float, var: float) -> None:
-        with self.connect() as con:
+    def upsert_norm(
+        self,
+        player_id: str,
+        queue: Optional[int],
+        role: Optional[str],
+        metric: str,
+        mean: float,
+        var: float,
+    ) -> None:
+        with self._writer() as con:
             con.execute(
                 """
                 INSERT INTO norm_state(player_id, queue, role, metric, ewma_mean, ewma_var, updated_at)
@@ -488,9 +1311,10 @@ class Store:
                 """,
                 (player_id, queue, role, metric, float(mean), float(var)),
             )
-            con.commit()
 
-    def load_domain_score(self, player_id: str, queue: Optional[int], role: Optional[str], domain: str) -> Optional[float]:
+    def load_domain_score(
+        self, player_id: str, queue: Optional[int], role: Optional[str], domain: str
+    ) -> Optional[float]:
         with self.connect() as con:
             row = con.execute(
                 "SELECT value FROM score_domain WHERE player_id=? AND queue IS ? AND role IS ? AND domain=?",
@@ -498,8 +1322,10 @@ class Store:
             ).fetchone()
             return float(row[0]) if row else None
 
-    def upsert_domain_score(self, player_id: str, queue: Optional[int], role: Optional[str], domain: str, value: float) -> None:
-        with self.connect() as con:
+    def upsert_domain_score(
+        self, player_id: str, queue: Optional[int], role: Optional[str], domain: str, value: float
+    ) -> None:
+        with self._writer() as con:
             con.execute(
                 """
                 INSERT INTO score_domain(player_id, queue, role, domain, value, updated_at)
@@ -510,9 +1336,10 @@ class Store:
                 """,
                 (player_id, queue, role, domain, float(value)),
             )
-            con.commit()
 
-    def load_overall_score(self, player_id: str, queue: Optional[int], role: Optional[str]) -> Optional[float]:
+    def load_overall_score(
+        self, player_id: str, queue: Optional[int], role: Optional[str]
+    ) -> Optional[float]:
         with self.connect() as con:
             row = con.execute(
                 "SELECT value FROM score_overall WHERE player_id=? AND queue IS ? AND role IS ?",
@@ -520,8 +1347,10 @@ class Store:
             ).fetchone()
             return float(row[0]) if row else None
 
-    def upsert_overall_score(self, player_id: str, queue: Optional[int], role: Optional[str], value: float) -> None:
-        with self.connect() as con:
+    def upsert_overall_score(
+        self, player_id: str, queue: Optional[int], role: Optional[str], value: float
+    ) -> None:
+        with self._writer() as con:
             con.execute(
                 """
                 INSERT INTO score_overall(player_id, queue, role, value, updated_at)
@@ -532,10 +1361,86 @@ class Store:
                 """,
                 (player_id, queue, role, float(value)),
             )
-            con.commit()
 
-    def upsert_inst_contrib(self, match_id: str, puuid: str, domain: str, inst_score: float, z_metrics: str) -> None:
-        with self.connect() as con:
+    def load_gis_state(self, player_id: str, queue: Optional[int], role: Optional[str]) -> GisState:
+        """norm_state (with its fallback contexts), score_domain and score_overall in one query."""
+        state = GisState(player_id, queue, role)
+        with self.connect() as con:
+            rows = con.execute(
+                """
+                SELECT 'n', queue, role, metric, ewma_mean, ewma_var FROM norm_state
+                    WHERE player_id=? AND (queue IS ? OR queue IS NULL)
+                      AND (role IS ? OR role IS NULL)
+                UNION ALL
+                SELECT 'd', queue, role, domain, value, NULL FROM score_domain
+                    WHERE player_id=? AND queue IS ? AND role IS ?
+                UNION ALL
+                SELECT 'o', queue, role, NULL, value, NULL FROM score_overall
+                    WHERE player_id=? AND queue IS ? AND role IS ?
+                """,
+                (player_id, queue, role) * 3,
+            ).fetchall()
+        for kind, q, r, key, a, b in rows:
+            if kind == "n":
+                # load_norm treats a half-written state as missing
+                if a is not None and b is not None:
+                    state.norms[(q, r, key)] = (float(a), float(b))
+            elif a is None:
+                continue
+            elif kind == "d":
+                state.domains[key] = float(a)
+            else:
+                state.overall = float(a)
+        return state
+
+    def save_gis_state(self, state: GisState) -> None:
+        """Write the norms and scores changed on ``state`` in one transaction."""
+        p, q, r = state.player_id, state.queue, state.role
+        with self.transaction(), self._writer() as con:
+            if state._dirty_norms:
+                con.executemany(
+                    """
+                    INSERT INTO norm_state(
+                        player_id, queue, role, metric, ewma_mean, ewma_var, updated_at
+                    )
+                    VALUES(?,?,?,?,?,?,datetime('now'))
+                    ON CONFLICT(player_id, queue, role, metric) DO UPDATE SET
+                        ewma_mean=excluded.ewma_mean,
+                        ewma_var=excluded.ewma_var,
+                        updated_at=datetime('now')
+                    """,
+                    [(p, q, r, m, mu, var) for m, (mu, var) in state._dirty_norms.items()],
+                )
+            if state._dirty_domains:
+                con.executemany(
+                    """
+                    INSERT INTO score_domain(player_id, queue, role, domain, value, updated_at)
+                    VALUES(?,?,?,?,?,datetime('now'))
+                    ON CONFLICT(player_id, queue, role, domain) DO UPDATE SET
+                        value=excluded.value,
+                        updated_at=datetime('now')
+                    """,
+                    [(p, q, r, d, v) for d, v in state._dirty_domains.items()],
+                )
+            if state._dirty_overall and state.overall is not None:
+                con.execute(
+                    """
+                    INSERT INTO score_overall(player_id, queue, role, value, updated_at)
+                    VALUES(?,?,?,?,datetime('now'))
+                    ON CONFLICT(player_id, queue, role) DO UPDATE SET
+                        value=excluded.value,
+                        updated_at=datetime('now')
+                    """,
+                    (p, q, r, state.overall),
+                )
+        state._dirty_norms.clear()
+        state._dirty_domains.clear()
+        state._dirty_overall = False
+
+    def upsert_inst_contrib(
+        self, match_id: str, puuid: str, domain: str, inst_score: float, z_metrics: str
+    ) -> None:
+        with self._writer() as con:
             con.execute(
                 """
                 INSERT INTO inst_contrib(match_id, puuid, domain, inst_score, z_metrics)
@@ -546,14 +1451,18 @@ class Store:
                 """,
                 (match_id, puuid, domain, float(inst_score), z_metrics),
             )
-            con.commit()
+            _refresh_badges(con, match_id, puuid)
 
     def seen_inst_for_match(self, match_id: str, puuid: str) -> bool:
         with self.connect() as con:
-            row = con.execute("SELECT 1 FROM inst_contrib WHERE match_id=? AND puuid=? LIMIT 1", (match_id, puuid)).fetchone()
+            row = con.execute(
+                "SELECT 1 FROM inst_contrib WHERE match_id=? AND puuid=? LIMIT 1", (match_id, puuid)
+            ).fetchone()
             return bool(row)
 
-    def list_matches_for_player(self, puuid: str, queue_filter: Optional[int] = None) -> List[sqlite3.Row]:
+    def list_matches_for_player(
+        self, puuid: str, queue_filter: Optional[int] = None
+    ) -> List[sqlite3.Row]:
         with self.connect() as con:
             con.row_factory = sqlite3.Row
             q = "SELECT * FROM matches WHERE puuid=?"
@@ -577,29 +1486,40 @@ class Store:
         with self.connect() as con:
             con.row_factory = sqlite3.Row
             rows = con.execute(
-                "SELECT domain, inst_score, z_metrics FROM inst_contrib WHERE match_id=? AND puuid=?",
+                "SELECT domain, inst_score, z_metrics FROM inst_contrib"
+                " WHERE match_id=? AND puuid=?",
                 (match_id, puuid),
             ).fetchall()
-            m = con.execute("SELECT role FROM matches WHERE match_id=?", (match_id,)).fetchone()
+            m = con.execute(
+                "SELECT role FROM matches WHERE match_id=? AND puuid=?", (match_id, puuid)
+            ).fetchone()
         if not rows:
             return None
         # Build domains map
         domains: Dict[str, float] = {}
         for r in rows:
             try:
-                domains[str(r["domain"])]= float(r["inst_score"]) if r["inst_score"] is not None else 50.0
+                domains[str(r["domain"])] = (
+                    float(r["inst_score"]) if r["inst_score"] is not None else 50.0
+                )
             except Exception:
                 pass
         # Ensure all domains are present (fill with 50.0 if missing) for stable UI rendering
         from . import gis as _gis
+
         for d in _gis.DOMAINS:
             domains.setdefault(d, 50.0)
         # Compute overall using current role weights (file-backed, Balanced fallback)
-        role = (m["role"] if m and m["role"] else None)
+        role = m["role"] if m and m["role"] else None
         from . import gis as _gis  # lazy to avoid cycles
+
         try:
             RW = _gis.load_role_weights()
-            W = RW.get((role or "").upper()) or RW.get("BALANCED") or _gis.ROLE_DOMAIN_WEIGHTS.get("UTILITY")
+            W = (
+                RW.get((role or "").upper())
+                or RW.get("BALANCED")
+                or _gis.ROLE_DOMAIN_WEIGHTS.get("UTILITY")
+            )
         except Exception:
             W = _gis.ROLE_DOMAIN_WEIGHTS.get("UTILITY")
         total = sum(W.values()) or 1.0
@@ -611,26 +1531,32 @@ class Store:
         z_by_domain: Dict[str, Any] = {}
         for r in rows:
             try:
-                zd = json.loads(r["z_metrics"]) if r["z_metrics"] else {}
-                z_by_domain[str(r["domain"])]= {k: float(v) for k, v in (zd or {}).items()}
+                zd = codec.json_loads(r["z_metrics"]) if r["z_metrics"] else {}
+                z_by_domain[str(r["domain"])] = {k: float(v) for k, v in (zd or {}).items()}
             except Exception:
                 pass
         for d in _gis.DOMAINS:
             z_by_domain.setdefault(d, {})
-        return {"domains": {k: float(v) for k, v in domains.items()}, "overall_inst": float(overall_inst), "z": z_by_domain}
+        return {
+            "domains": {k: float(v) for k, v in domains.items()},
+            "overall_inst": float(overall_inst),
+            "z": z_by_domain,
+        }
 
-    def upsert_inst_contrib_bulk(self, match_id: str, puuid: str, domains: Dict[str, float], z: Dict[str, Dict[str, float]]) -> None:
+    def upsert_inst_contrib_bulk(
+        self, match_id: str, puuid: str, domains: Dict[str, float], z: Dict[str, Dict[str, float]]
+    ) -> None:
         """Bulk upsert inst_contrib rows in one transaction.
 
         - domains: map domain -> inst score (0..100)
         - z: map domain -> {metric: z}
         """
-        with self.connect() as con:
+        with self._writer() as con:
             cur = con.cursor()
             for d, score in (domains or {}).items():
                 z_map = (z or {}).get(d) or {}
                 try:
-                    z_json = __import__('json').dumps(z_map)
+                    z_json = codec.json_dumps(z_map)
                 except Exception:
                     z_json = "{}"
                 cur.execute(
@@ -643,28 +1569,502 @@ class Store:
                     """,
                     (match_id, puuid, str(d), float(score), z_json),
                 )
-            con.commit()
+            _refresh_badges(con, match_id, puuid)
 
     def read_inst_contrib_payload(self, match_id: str, puuid: str) -> Dict[str, Any]:
         payload = self.get_inst_contrib(match_id, puuid)
         return payload or {"domains": {}, "overall_inst": 50.0, "z": {}}
 
-    def load_match(self, match_id: str) -> Optional[Dict[str, Any]]:
+    def load_match(self, match_id: str) -> Optional[Match]:
+        """Typed match subset (core.schema; shared via core.decoded: do not mutate), or None."""
+        return self._load_decoded("match", match_id, self.load_match_raw, Match)
+
+    def load_timeline(self, match_id: str) -> Optional[Timeline]:
+        """Typed timeline subset (core.schema; shared via core.decoded: do not mutate), or None."""
+        return self._load_decoded("timeline", match_id, self.load_timeline_raw, Timeline)
+
+    def load_match_raw(self, match_id: str) -> codec.Packed:
+        """Stored (packed) match payload of any roster member's row."""
         with self.connect() as con:
-            row = con.execute("SELECT raw_json FROM matches WHERE match_id=?", (match_id,)).fetchone()
-        if not row or not row[0]:
-            return None
-        try:
-            return __import__('json').loads(row[0])
-        except Exception:
-            return None
+            # Every roster member's row carries the same payload
+            row = con.execute(
+                "SELECT raw_json FROM matches WHERE match_id=? LIMIT 1", (match_id,)
+            ).fetchone()
+        return row[0] if row else None
 
-    def load_timeline(self, match_id: str) -> Optional[Dict[str, Any]]:
+    def _load_decoded(self, kind: str, match_id: str, fetch, schema: type) -> Any:
+        cache = decoded_cache()
+        key = (self.db_path, kind, match_id)
+        obj = cache.get(key, None)
+        if obj is not None:
+            return obj
+        epoch = cache.epoch()
+        value = fetch(match_id)
+        if not value:
+            return None
+        try:
+            data = codec.unpack_bytes(self.raw_bytes(value))
+            obj = decode(schema, data) if data else None
+        except Exception:
+            return None
+        if obj is not None:
+            cache.put(key, obj, len(data), epoch)
+        return obj
+
+    def load_timeline_raw(self, match_id: str) -> codec.Packed:
+        """Stored (packed) timeline payload, from the main table or the cold archive."""
         with self.connect() as con:
-            row = con.execute("SELECT raw_json FROM timelines WHERE match_id=?", (match_id,)).fetchone()
-        if not row or not row[0]:
-            return None
+            row = con.execute(
+                "SELECT raw_json FROM timelines WHERE match_id=?", (match_id,)
+            ).fetchone()
+        if row and row[0]:
+            return row[0]
         try:
-            return __import__('json').loads(row[0])
+            return self.archive.get(match_id)
         except Exception:
             return None
+
+    # Timeline retention
+    @property
+    def archive(self) -> TimelineArchive:
+        return archive_for(self.db_path)
+
+    def archive_timelines(
+        self,
+        keep_days: Optional[int] = TIMELINE_KEEP_DAYS,
+        keep_last: Optional[int] = TIMELINE_KEEP_LAST,
+        batch: int = ARCHIVE_BATCH,
+        stop: Optional[threading.Event] = None,
+        max_batches: Optional[int] = None,
+        now_ms: Optional[int] = None,
+        gis_queues: Optional[Iterable[int]] = GIS_QUEUES,
+    ) -> Dict[str, Any]:
+        """Move timelines past the retention policy into the cold archive.
+
+        Only timelines whose derived rows all exist are eligible: the frame matrix,
+        metrics and extras for every player row, and GIS contributions for games in
+        ``gis_queues`` (other queues are never scored, so they do not wait). Each batch
+        is committed to the archive before it is deleted here (under the writer
+        lock), so a crash in between leaves a duplicate, never a loss.
+        """
+        rules = []
+        params: List[Any] = []
+        if keep_days:
+            now_ms = now_ms if now_ms is not None else int(datetime.utcnow().timestamp() * 1000)
+            rules.append("m.ts < ?")
+            params.append(now_ms - int(keep_days) * 86_400_000)
+        if keep_last:
+            rules.append(
+                "t.match_id NOT IN (SELECT match_id FROM matches GROUP BY match_id"
+                " ORDER BY MAX(game_creation_ms) DESC LIMIT ?)"
+            )
+            params.append(int(keep_last))
+        report: Dict[str, Any] = {"archived": 0, "bytes": 0, "done": not rules}
+        if not rules:
+            return report
+        scored = [int(x) for x in (gis_queues or [])]
+        q = f"""
+            SELECT t.match_id FROM timelines t
+            JOIN (
+                SELECT match_id, MAX(game_creation_ms) AS ts, MAX(queue_id) AS queue_id
+                FROM matches GROUP BY match_id
+            ) m ON m.match_id = t.match_id
+            WHERE ({" OR ".join(rules)})
+              AND EXISTS (SELECT 1 FROM frame_matrix f WHERE f.match_id = t.match_id)
+              AND (m.queue_id NOT IN ({",".join("?" * len(scored))})
+                   OR EXISTS (SELECT 1 FROM inst_contrib i WHERE i.match_id = t.match_id))
+              AND NOT EXISTS (
+                  SELECT 1 FROM matches x
+                  LEFT JOIN metrics mx ON mx.match_id = x.match_id AND mx.puuid = x.puuid
+                  LEFT JOIN metrics_extras ex ON ex.match_id = x.match_id AND ex.puuid = x.puuid
+                  WHERE x.match_id = t.match_id AND (mx.match_id IS NULL OR ex.match_id IS NULL)
+              )
+            LIMIT ?
+        """
+        batches = 0
+        while True:
+            if (stop is not None and stop.is_set()) or (
+                max_batches is not None and batches >= max_batches
+            ):
+                return report
+            with self.transaction(), self._writer() as con:
+                ids = [r[0] for r in con.execute(q, (*params, *scored, batch)).fetchall()]
+                if not ids:
+                    break
+                ph = ",".join("?" * len(ids))
+                rows = con.execute(
+                    f"SELECT match_id, raw_json FROM timelines WHERE match_id IN ({ph})", ids
+                ).fetchall()
+                moved = []
+                for mid, value in rows:
+                    if codec.ref_location(value) is not None:
+                        # The archive is self-contained; compact_segments reclaims the segment bytes
+                        value = bytes(self.raw_bytes(value) or b"") or None
+                    if value and not codec.is_packed(value):
+                        value = codec.pack(value, self._blob_dict_ids.get("timeline"))
+                    moved.append((mid, value))
+                    report["bytes"] += len(
+                        value.encode("utf-8") if isinstance(value, str) else value or b""
+                    )
+                self.archive.put_many(moved)
+                con.execute(f"DELETE FROM timelines WHERE match_id IN ({ph})", ids)
+            report["archived"] += len(ids)
+            batches += 1
+        report["done"] = True
+        return report
+
+    def incremental_vacuum(self, pages: Optional[int] = VACUUM_PAGES) -> Dict[str, Any]:
+        """Hand free pages back to the filesystem, at most ``pages`` per call (None: all).
+
+        A no-op (``incremental: False``) on databases created without
+        auto_vacuum=INCREMENTAL; converting them is the explicit
+        enable_incremental_vacuum() step.
+        """
+        if _active_tx(self.db_path) is not None:
+            raise RuntimeError("incremental_vacuum cannot run inside a transaction")
+        pool = _pool(self.db_path)
+        with pool.lock:
+            con = pool.writer()
+            free_before = con.execute("PRAGMA freelist_count").fetchone()[0]
+            incremental = con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+            if incremental:
+                # Frees one page per step and returns no rows, so execute() would stop after
+                # the first; executescript() steps it to completion
+                con.executescript(f"PRAGMA incremental_vacuum({int(pages) if pages else 0})")
+            page_size, page_count, free = (
+                con.execute(f"PRAGMA {p}").fetchone()[0]
+                for p in ("page_size", "page_count", "freelist_count")
+            )
+        return {
+            "incremental": incremental,
+            "freed_pages": max(0, free_before - free),
+            "freelist_pages": free,
+            "db_bytes": page_size * page_count,
+        }
+
+    def enable_incremental_vacuum(self) -> bool:
+        """Switch an existing database to auto_vacuum=INCREMENTAL; True if it was converted.
+
+        The switch is a full VACUUM: it rewrites the whole file under the writer lock
+        and needs about the database's size in free disk space, so it only runs as an
+        explicit step (config `retention.convert_auto_vacuum`, at startup before
+        serving), never from a background job.
+        """
+        if _active_tx(self.db_path) is not None:
+            raise RuntimeError("enable_incremental_vacuum cannot run inside a transaction")
+        pool = _pool(self.db_path)
+        with pool.lock:
+            con = pool.writer()
+            if con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return False
+            con.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            con.execute("VACUUM")
+        return True
+
+    # Raw payload compression
+    def _sample_raw(self, con: sqlite3.Connection, table: str, n: int) -> List[bytes]:
+        # Evenly spaced rowids: ORDER BY RANDOM() would read every blob in the table
+        lo, hi = con.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table}").fetchone()
+        if lo is None:
+            return []
+        step = max(1, (hi - lo + 1) // n)
+        ids = list(range(lo, hi + 1, step))[:n]
+        ph = ",".join("?" * len(ids))
+        rows = con.execute(f"SELECT raw_json FROM {table} WHERE rowid IN ({ph})", ids).fetchall()
+        out = []
+        for (v,) in rows:
+            try:
+                raw = codec.unpack_bytes(self.raw_bytes(v))
+            except Exception:
+                continue
+            if raw:
+                out.append(raw)
+        return out
+
+    def train_blob_dicts(
+        self, samples: int = DICT_SAMPLES, force: bool = False
+    ) -> Dict[str, Optional[int]]:
+        """Train (or keep) one compression dictionary per payload kind; returns active ids.
+
+        New writes use the active dictionary right away; existing rows pick it up
+        through recompress_raw().
+        """
+        for kind, table in _RAW_TABLES.items():
+            if self._blob_dict_ids.get(kind) is not None and not force:
+                continue
+            with self.connect() as con:
+                picked = self._sample_raw(con, table, samples)
+            data = (
+                codec.train_dict(picked) if len(picked) >= min(DICT_MIN_SAMPLES, samples) else None
+            )
+            if not data:
+                continue
+            cname = codec.default_codec()
+            did = codec.register_dict(cname, data)
+            with self._writer() as con:
+                con.execute(
+                    "INSERT OR IGNORE INTO blob_dicts(dict_id, codec, kind, data) VALUES(?,?,?,?)",
+                    (did, cname, kind, data),
+                )
+                con.execute(
+                    "INSERT INTO meta(key,value) VALUES(?,?)"
+                    " ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                    (f"codec:dict:{kind}", str(did)),
+                )
+                # Every row now predates the active dictionary
+                con.execute("DELETE FROM meta WHERE key=?", (f"codec:recompress:{table}",))
+            self._blob_dict_ids[kind] = did
+        return dict(self._blob_dict_ids)
+
+    def recompress_raw(
+        self,
+        batch: int = RECOMPRESS_BATCH,
+        stop: Optional[threading.Event] = None,
+        max_batches: Optional[int] = None,
+        pause_s: float = 0.0,
+    ) -> Dict[str, Any]:
+        """Rewrite raw_json rows not yet packed with the active dictionary.
+
+        Walks each table by rowid from a cursor in `meta` (`codec:recompress:<table>`),
+        one transaction per batch, so it can run in the background and resume after a
+        restart. Packing happens outside the writer lock; a row rewritten meanwhile
+        (re-ingest, roster upsert) no longer holds the value that was read and is
+        left alone. Returns (and stores under `codec:recompress`) byte totals before/after
+        and the average decode latency (unpack + json parse) of old vs new rows.
+        """
+        import time as _time
+
+        report = self.recompress_report() or {}
+        batches = 0
+        for kind, table in _RAW_TABLES.items():
+            did = self._blob_dict_ids.get(kind)
+            st = report.get(table) or {
+                "rows": 0,
+                "bytes_before": 0,
+                "bytes_after": 0,
+                "decode_ms_before": 0.0,
+                "decode_ms_after": 0.0,
+            }
+            cursor_key = f"codec:recompress:{table}"
+            last = int(self.get_meta(cursor_key) or 0)
+            while True:
+                if (stop is not None and stop.is_set()) or (
+                    max_batches is not None and batches >= max_batches
+                ):
+                    break
+                with self.connect() as con:
+                    rows = con.execute(
+                        f"SELECT rowid, raw_json FROM {table}"
+                        " WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                        (last, batch),
+                    ).fetchall()
+                if not rows:
+                    break
+                updates = []
+                for rowid, value in rows:
+                    last = rowid
+                    if not value or (codec.is_packed(value) and codec.packed_dict_id(value) == did):
+                        continue
+                    if codec.ref_location(value) is not None:
+                        continue  # in the segment files; left as written
+                    try:
+                        t0 = _time.perf_counter()
+                        raw = codec.unpack_bytes(value)
+                        codec.json_loads(raw)
+                        t1 = _time.perf_counter()
+                        new = codec.pack(raw, did)
+                        t2 = _time.perf_counter()
+                        codec.loads(new)
+                        t3 = _time.perf_counter()
+                    except Exception:
+                        continue
+                    updates.append((rowid, value, new, t1 - t0, t3 - t2))
+                with self.transaction():
+                    with self._writer() as con:
+                        for rowid, value, new, dec_before, dec_after in updates:
+                            # Compare-and-set against the value that was packed
+                            cur = con.execute(
+                                f"UPDATE {table} SET raw_json=? WHERE rowid=? AND raw_json IS ?",
+                                (new, rowid, value),
+                            )
+                            if not cur.rowcount:
+                                continue
+                            st["rows"] += 1
+                            st["bytes_before"] += len(
+                                value.encode("utf-8") if isinstance(value, str) else value
+                            )
+                            st["bytes_after"] += len(
+                                new.encode("utf-8") if isinstance(new, str) else new
+                            )
+                            st["decode_ms_before"] += dec_before * 1000
+                            st["decode_ms_after"] += dec_after * 1000
+                    self.set_meta(cursor_key, str(last))
+                batches += 1
+                if pause_s:
+                    _time.sleep(pause_s)
+            report[table] = st
+        for st in report.values():
+            if isinstance(st, dict) and st.get("rows"):
+                st["ratio"] = round(st["bytes_after"] / max(1, st["bytes_before"]), 4)
+                st["avg_decode_ms_before"] = round(st["decode_ms_before"] / st["rows"], 3)
+                st["avg_decode_ms_after"] = round(st["decode_ms_after"] / st["rows"], 3)
+        self.set_meta("codec:recompress", codec.json_dumps(report))
+        return report
+
+    def segment_raw(
+        self,
+        batch: int = RECOMPRESS_BATCH,
+        stop: Optional[threading.Event] = None,
+        max_batches: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Move large inline raw_json values into the segment files (rows written before schema 11).
+
+        Walks each table by rowid from a cursor in `meta` (`segments:cursor:<table>`),
+        one transaction per batch. Returns rows moved / bytes taken out of the
+        table and whether both tables are done.
+        """
+        seg = segments_for(self.db_path)
+        report: Dict[str, Any] = {"rows": 0, "bytes": 0, "done": seg is None}
+        if seg is None:
+            return report
+        batches = 0
+        for table in _RAW_TABLES.values():
+            cursor_key = f"segments:cursor:{table}"
+            last = int(self.get_meta(cursor_key) or 0)
+            while True:
+                if (stop is not None and stop.is_set()) or (
+                    max_batches is not None and batches >= max_batches
+                ):
+                    return report
+                with self.transaction(), self._writer() as con:
+                    rows = con.execute(
+                        f"SELECT rowid, raw_json FROM {table}"
+                        " WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                        (last, batch),
+                    ).fetchall()
+                    if not rows:
+                        break
+                    updates = []
+                    for rowid, value in rows:
+                        last = rowid
+                        if (
+                            not isinstance(value, bytes)
+                            or len(value) < SEGMENT_MIN_BYTES
+                            or not codec.is_packed(value)
+                        ):
+                            continue
+                        try:
+                            key = digest(codec.unpack_bytes(value))
+                        except Exception:
+                            continue
+                        updates.append((self._segment_ref(con, seg, key, value), rowid))
+                        report["bytes"] += len(value)
+                    con.executemany(f"UPDATE {table} SET raw_json=? WHERE rowid=?", updates)
+                    self.set_meta(cursor_key, str(last))
+                report["rows"] += len(updates)
+                batches += 1
+        report["done"] = True
+        return report
+
+    def _segment_refs(self, con: sqlite3.Connection) -> Dict[bytes, List[Tuple[str, int]]]:
+        # Digest → (table, rowid) of every row holding a segment reference to it
+        refs: Dict[bytes, List[Tuple[str, int]]] = {}
+        for table in _RAW_TABLES.values():
+            rows = con.execute(
+                f"SELECT rowid, raw_json FROM {table} WHERE typeof(raw_json)='blob'"
+                " AND length(raw_json)=? AND substr(raw_json, 1, 1)=?",
+                (codec.REF_BYTES, bytes([codec.TAG_SEGMENT_REF])),
+            )
+            for rowid, value in rows:
+                key = codec.ref_digest(value)
+                if key is not None:
+                    refs.setdefault(key, []).append((table, rowid))
+        return refs
+
+    def segment_stats(self) -> Optional[Dict[str, Any]]:
+        """Segment file stats plus live and dead bytes; None for in-memory databases."""
+        seg = segments_for(self.db_path)
+        if seg is None:
+            return None
+        stats = seg.stats()
+        with self.connect() as con:
+            refs = self._segment_refs(con)
+            live = sum(
+                n
+                for key, n in con.execute("SELECT digest, length FROM segment_index")
+                if key in refs
+            )
+        stats["live_bytes"] = live
+        stats["dead_bytes"] = max(0, stats["bytes"] - live)
+        return stats
+
+    def compact_segments(
+        self, min_dead_ratio: float = SEGMENT_COMPACT_RATIO, stop: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """Reclaim segment bytes that no row references any more.
+
+        Per segment (one transaction each): drops unreferenced digests from
+        `segment_index`; if the segment is sealed and at least ``min_dead_ratio``
+        dead, copies its live payloads into the active segment and repoints their
+        rows. Compacted segments are unlinked on the next call rather than right
+        away, so a reader that fetched an old reference just before the commit can
+        still map it; `segments:retired` in `meta` carries them over.
+        """
+        seg = segments_for(self.db_path)
+        report: Dict[str, Any] = {"segments": 0, "moved_bytes": 0, "freed_bytes": 0}
+        if seg is None:
+            return report
+        retired: List[int] = []
+        for s in (int(x) for x in (self.get_meta("segments:retired") or "").split(",") if x):
+            freed = seg.remove(s)
+            if freed is None:
+                retired.append(s)
+            else:
+                report["freed_bytes"] += freed
+        sizes = seg.sizes()
+        active = max(sizes) if sizes else None
+        refs: Optional[Dict[bytes, List[Tuple[str, int]]]] = None
+        changes = -1
+        for s, size in sorted(sizes.items()):
+            if s in retired or (stop is not None and stop.is_set()):
+                continue
+            with self.transaction(), self._writer() as con:
+                # One scan of the raw tables per run; repointing keeps (table, rowid) valid, so
+                # only writes committed by others since the last segment force a rescan
+                if refs is None or con.total_changes != changes:
+                    refs = self._segment_refs(con)
+                entries = con.execute(
+                    "SELECT digest, offset, length FROM segment_index WHERE segment=?", (s,)
+                ).fetchall()
+                con.executemany(
+                    "DELETE FROM segment_index WHERE digest=?",
+                    [(e[0],) for e in entries if e[0] not in refs],
+                )
+                live = [e for e in entries if e[0] in refs]
+                compact = s != active and size - sum(e[2] for e in live) >= size * min_dead_ratio
+                if compact:
+                    for key, offset, length in live:
+                        loc = (*seg.append(bytes(seg.read(s, offset, length))), length)
+                        con.execute(
+                            "UPDATE segment_index SET segment=?, offset=?, length=? WHERE digest=?",
+                            (*loc, key),
+                        )
+                        ref = codec.make_ref(key, *loc)
+                        for table, rowid in refs[key]:
+                            con.execute(
+                                f"UPDATE {table} SET raw_json=? WHERE rowid=?", (ref, rowid)
+                            )
+                        report["moved_bytes"] += length
+                changes = con.total_changes
+            if compact:
+                retired.append(s)
+                report["segments"] += 1
+        self.set_meta("segments:retired", ",".join(str(s) for s in retired))
+        return report
+
+    def recompress_report(self) -> Optional[Dict[str, Any]]:
+        raw = self.get_meta("codec:recompress")
+        try:
+            return codec.json_loads(raw) if raw else None
+        except Exception:
+            return None
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import codec
+
+# Typed per-(match, player) columns the match list serves without touching raw_json
+SUMMARY_FIELDS = (
+    "kills",
+    "deaths",
+    "assists",
+    "cs",
+    "gold",
+    "dmg_to_champs",
+    "vision_score",
+    "kp",
+    "win",
+)
+
+# Domain badge thresholds (inst score distance from 50 and the strongest metric z)
+BADGE_INST_LOW = 45.0
+BADGE_INST_HIGH = 55.0
+BADGE_Z = 0.7
+MAX_DOMAIN_BADGES = 3
+
+
+def summarize(match: Dict[str, Any], puuid: str) -> Optional[Dict[str, Any]]:
+    """Scoreboard line of ``puuid`` in a Match-V5 payload, or None if they are not in it."""
+    parts = (match or {}).get("info", {}).get("participants", []) or []
+    me = next((p for p in parts if p.get("puuid") == puuid), None)
+    if not me:
+        return None
+    team = int(me.get("teamId") or 0)
+    team_kills = sum(int(p.get("kills") or 0) for p in parts if int(p.get("teamId") or 0) == team)
+    kills, assists = int(me.get("kills") or 0), int(me.get("assists") or 0)
+    return {
+        "kills": kills,
+        "deaths": int(me.get("deaths") or 0),
+        "assists": assists,
+        "cs": int((me.get("totalMinionsKilled") or 0) + (me.get("neutralMinionsKilled") or 0)),
+        "gold": int(me.get("goldEarned") or 0),
+        "dmg_to_champs": int(me.get("totalDamageDealtToChampions") or 0),
+        "vision_score": int(me.get("visionScore") or 0),
+        "kp": round((kills + assists) / team_kills * 100.0, 1) if team_kills > 0 else 0.0,
+        "win": 1 if bool(me.get("win")) else 0,
+    }
+
+
+def domain_badges(rows: Iterable[Tuple[str, Optional[float], Any]]) -> List[str]:
+    """Badges like "Laning High" from (domain, inst_score, z_metrics) inst_contrib rows.
+
+    A domain qualifies when its inst score and its most extreme metric z agree
+    (≤45 with a z ≤ -0.7, or ≥55 with a z ≥ 0.7); the strongest three are kept.
+    """
+    scored: List[Tuple[str, float, float]] = []
+    for d, inst, z in rows:
+        inst = float(inst) if inst is not None else 50.0
+        if isinstance(z, (str, bytes)):
+            try:
+                z = codec.json_loads(z or "{}")
+            except Exception:
+                z = {}
+        zvals = [float(v) for v in (z or {}).values() if v is not None]
+        zmin = min(zvals) if zvals else 0.0
+        zmax = max(zvals) if zvals else 0.0
+        if inst <= BADGE_INST_LOW and zmin <= -BADGE_Z:
+            scored.append((d, inst - 50.0, -abs(zmin)))
+        elif inst >= BADGE_INST_HIGH and zmax >= BADGE_Z:
+            scored.append((d, inst - 50.0, abs(zmax)))
+    # Largest inst deviation first, then z magnitude
+    scored.sort(key=lambda x: (abs(x[1]), abs(x[2])), reverse=True)
+    return [
+        f"{d.capitalize()} {'High' if dv > 0 else 'Low'}" for d, dv, _ in scored[:MAX_DOMAIN_BADGES]
+    ]
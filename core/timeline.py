@@ -0,0 +1,189 @@
+"""A match timeline indexed once for every metric that reads it.
+
+ParsedTimeline walks the frames a single time and keeps:
+
+* the events, in timeline order, bucketed by type and by (type, acting participant);
+* participantId → team / role / champion (and puuid → participantId) from the match;
+* the per-participant frame arrays (FrameMatrix).
+
+compute_metrics, compute_extras, the GIS feature extractors and the advanced match
+view take one instead of each re-walking every frame and scanning the participant
+list per event. Lane opponents are resolved once per participant and cached; the
+match_context table persists them (context(), set_opponent()) so later readers
+never run the proximity search again.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .frames import FrameMatrix
+
+Event = Dict[str, Any]
+
+# Field naming the participant an event belongs to (first one present wins):
+# buyers/levellers, killers (champions, wards, monsters, buildings, plates), ward placers
+ACTOR_FIELDS = ("participantId", "killerId", "creatorId")
+
+# Window used to find a lane opponent by proximity when roles are missing (02:00–10:00)
+_LANE_WINDOW_MS = (120 * 1000, 600 * 1000)
+
+
+def timeline_events(timeline: Dict[str, Any]) -> List[Event]:
+    """All events of a timeline, flattened in frame order."""
+    return [
+        ev
+        for fr in (timeline or {}).get("info", {}).get("frames", []) or []
+        for ev in fr.get("events", []) or []
+    ]
+
+
+@dataclass
+class ParsedTimeline:
+    frames: FrameMatrix
+    events: List[Event]
+    by_type: Dict[str, List[Event]]
+    by_actor: Dict[Tuple[str, int], List[Event]]
+    deaths: Dict[int, List[Event]]  # CHAMPION_KILL events by victim
+    teams: Dict[int, int]
+    roles: Dict[int, Optional[str]]
+    champions: Dict[int, int]
+    pids: Dict[str, int]  # puuid → participantId
+    _opponents: Dict[int, Optional[int]] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def build(
+        cls, match: Dict[str, Any], timeline: Dict[str, Any], frames: Optional[FrameMatrix] = None
+    ) -> "ParsedTimeline":
+        """Index `timeline`; pass a stored FrameMatrix as `frames` to skip rebuilding it."""
+        events = timeline_events(timeline)
+        by_type: Dict[str, List[Event]] = {}
+        by_actor: Dict[Tuple[str, int], List[Event]] = {}
+        deaths: Dict[int, List[Event]] = {}
+        a1, a2, a3 = ACTOR_FIELDS
+        for ev in events:
+            get = ev.get
+            typ = get("type")
+            bucket = by_type.get(typ)
+            if bucket is None:
+                bucket = by_type[typ] = []
+            bucket.append(ev)
+            # Inlined first-present lookup over ACTOR_FIELDS (this loop is the hot part of a build)
+            actor = get(a1)
+            if actor is None:
+                actor = get(a2)
+                if actor is None:
+                    actor = get(a3)
+            if actor is not None:
+                by_actor.setdefault((typ, int(actor)), []).append(ev)
+            if typ == "CHAMPION_KILL" and get("victimId") is not None:
+                deaths.setdefault(int(get("victimId")), []).append(ev)
+        teams: Dict[int, int] = {}
+        roles: Dict[int, Optional[str]] = {}
+        champions: Dict[int, int] = {}
+        pids: Dict[str, int] = {}
+        for p in (match or {}).get("info", {}).get("participants", []) or []:
+            pid = int(p.get("participantId") or 0)
+            teams[pid] = int(p.get("teamId") or 0)
+            roles[pid] = p.get("teamPosition") or None
+            champions[pid] = int(p.get("championId") or 0)
+            if p.get("puuid"):
+                pids[p["puuid"]] = pid
+        return cls(
+            frames=frames if frames is not None else FrameMatrix.from_timeline(timeline),
+            events=events,
+            by_type=by_type,
+            by_actor=by_actor,
+            deaths=deaths,
+            teams=teams,
+            roles=roles,
+            champions=champions,
+            pids=pids,
+        )
+
+    # Events
+    def of_type(self, typ: str) -> List[Event]:
+        return self.by_type.get(typ, [])
+
+    def of(self, typ: str, pid: int) -> List[Event]:
+        """Events of `typ` whose actor (see ACTOR_FIELDS) is `pid`, in timeline order."""
+        return self.by_actor.get((typ, int(pid or 0)), [])
+
+    def deaths_of(self, pid: int) -> List[Event]:
+        return self.deaths.get(int(pid or 0), [])
+
+    # Participants
+    def team_of(self, pid: Optional[int]) -> Optional[int]:
+        return self.teams.get(int(pid or 0))
+
+    def position_at(self, ms: int, pid: int) -> Optional[Tuple[float, float]]:
+        """Position of `pid` at the frame nearest `ms`, or None when unknown."""
+        x = self.frames.value_at("x", ms, pid, default=math.nan)
+        y = self.frames.value_at("y", ms, pid, default=math.nan)
+        if math.isnan(x) or math.isnan(y):
+            return None
+        return x, y
+
+    def near(
+        self, pid: int, events: List[Event], radius: float, interpolate: bool = False
+    ) -> np.ndarray:
+        """Per event: whether `pid` was within `radius` of the event's position at its timestamp.
+
+        One batched distance query over pid's position track (nearest frame, or
+        interpolated); events without a position, or with pid's unknown, are False.
+        """
+        if not events:
+            return np.zeros(0, dtype=bool)
+        marks = [int(ev.get("timestamp") or 0) for ev in events]
+        pos = [ev.get("position") or {} for ev in events]
+        xs = [math.nan if p.get("x") is None else float(p["x"]) for p in pos]
+        ys = [math.nan if p.get("y") is None else float(p["y"]) for p in pos]
+        d = self.frames.distances_at(marks, pid, xs, ys, interpolate)
+        return d <= radius  # NaN compares False
+
+    def lane_opponent(self, pid: int) -> Optional[int]:
+        """Enemy in the same teamPosition, else the enemy closest (median) during 02:00–10:00."""
+        pid = int(pid)
+        if pid not in self._opponents:
+            self._opponents[pid] = self._find_opponent(pid)
+        return self._opponents[pid]
+
+    def set_opponent(self, pid: int, opponent: Optional[int]) -> None:
+        """Take a lane opponent resolved earlier (match_context) instead of searching for it."""
+        self._opponents[int(pid)] = int(opponent) if opponent else None
+
+    def context(self, puuid: str) -> Optional[Dict[str, Any]]:
+        """The match_context row of `puuid` (Store.upsert_match_context).
+
+        None when they did not play.
+        """
+        pid = self.pids.get(puuid)
+        if pid is None:
+            return None
+        opp = self.lane_opponent(pid)
+        return {
+            "participant_id": pid,
+            "team_id": self.teams.get(pid),
+            "role": self.roles.get(pid),
+            "opponent_id": opp,
+            "opponent_champion_id": self.champions.get(opp) if opp else None,
+        }
+
+    def _find_opponent(self, pid: int) -> Optional[int]:
+        my_team = self.teams.get(pid)
+        if my_team is None:
+            return None
+        my_pos = self.roles.get(pid)
+        if my_pos and my_pos != "UTILITY":
+            for eid, pos in self.roles.items():
+                if self.teams[eid] != my_team and pos == my_pos:
+                    return eid
+        enemies = [eid for eid in range(1, 11) if self.teams.get(eid) not in (None, my_team)]
+        meds = self.frames.median_distances(pid, enemies, *_LANE_WINDOW_MS)
+        if not enemies or np.isnan(meds).all():
+            return None
+        # nanargmin keeps the lowest participant id on ties
+        return enemies[int(np.nanargmin(meds))]
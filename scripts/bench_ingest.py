@@ -0,0 +1,97 @@
+"""Benchmark ingest against the local Riot stand-in (no network, no API key).
+
+Starts scripts/riot_standin.py in-process, points RiotClient/AsyncRiotClient at it
+and reports ingest throughput (per-stage stats), rate-limiter behavior (429s seen
+by the server, effective request rate) and bootstrap-style latency of the async
+client's verify_key + resolve_account round trip.
+
+    python scripts/bench_ingest.py --matches 100 --app-limit 500:10,30000:600 --latency-ms 40
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from riot_standin import Dataset, StandinServer  # noqa: E402
+
+from core.metrics import FETCH_WORKERS, IngestStats, ingest_and_compute_recent  # noqa: E402
+from core.riot import AsyncRiotClient, RiotClient, aclose_async_pool  # noqa: E402
+from core.store import Store  # noqa: E402
+
+
+async def _bootstrap_latency(base_url: str, puuid: str) -> dict:
+    arc = AsyncRiotClient(region="americas", platform="na1", api_key="standin", base_url=base_url)
+    t0 = time.perf_counter()
+    ok = await arc.verify_key()
+    t1 = time.perf_counter()
+    acct = await arc.resolve_account("Standin", "NA1")
+    t2 = time.perf_counter()
+    await aclose_async_pool()
+    return {
+        "verify_key_ok": ok,
+        "verify_key_ms": round((t1 - t0) * 1000, 2),
+        "resolve_account_ms": round((t2 - t1) * 1000, 2),
+        "puuid_match": acct.get("puuid") == puuid,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--matches", type=int, default=100)
+    ap.add_argument("--workers", type=int, default=FETCH_WORKERS)
+    ap.add_argument("--app-limit", default="500:10,30000:600")
+    ap.add_argument("--latency-ms", type=float, default=30.0)
+    ap.add_argument("--record-dir", default=None)
+    ap.add_argument("--db", default=None, help="SQLite path (default: fresh temp file)")
+    args = ap.parse_args()
+
+    ds = Dataset.recorded(args.record_dir) if args.record_dir else Dataset.synthetic(args.matches)
+    srv = StandinServer(("127.0.0.1", 0), ds, app_limits=args.app_limit, latency_ms=args.latency_ms)
+    srv.serve_in_thread()
+    try:
+        boot = asyncio.run(_bootstrap_latency(srv.base_url, ds.puuid))
+        with tempfile.TemporaryDirectory() as tmp:
+            store = Store(db_path=args.db or str(Path(tmp) / "bench.db"))
+            rc = RiotClient(
+                region="americas",
+                platform="na1",
+                api_key="standin",
+                kind="bg",
+                base_url=srv.base_url,
+            )
+            stats = IngestStats()
+            t0 = time.perf_counter()
+            n = ingest_and_compute_recent(
+                rc,
+                store,
+                ds.puuid,
+                count=min(100, len(ds.matches)),
+                workers=args.workers,
+                stats=stats,
+            )
+            wall = time.perf_counter() - t0
+        report = {
+            "ingested": n,
+            "wall_s": round(wall, 3),
+            "matches_per_s": round(n / wall, 2) if wall > 0 else None,
+            "stages": stats.as_dict(),
+            "server": dict(srv.stats),
+            "requests_per_s": round(srv.stats["requests"] / wall, 2) if wall > 0 else None,
+            "bootstrap": boot,
+        }
+        print(json.dumps(report, indent=2))
+    finally:
+        srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
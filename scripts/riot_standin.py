@@ -0,0 +1,430 @@
+"""Local stand-in for the Riot API, for reproducible ingest benchmarks.
+
+Serves Account-V1, Match-V5 (ids, match, timeline), champion-mastery and status
+responses from a directory of recorded JSON or from deterministic synthetic games,
+and enforces Riot-style application and method rate limits (X-*-Rate-Limit[-Count]
+headers, 429 with Retry-After and X-Rate-Limit-Type).
+
+Point the app at it with a `{route}` base-URL template, e.g.
+
+    python scripts/riot_standin.py --port 8999 --matches 200
+    LOLTRACK_RIOT_BASE_URL='http://127.0.0.1:8999/{route}' ...
+
+or `riot.base_url` in config.yaml. Recorded data layout (--record-dir):
+`matches/<id>.json`, `timelines/<id>.json` and optionally `account.json`.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+DEV_APP_LIMITS = "20:1,100:120"
+DEFAULT_METHOD_LIMITS = {
+    "match-v5.getMatchIdsByPUUID": "2000:10",
+    "match-v5.getMatch": "2000:10",
+    "match-v5.getTimeline": "2000:10",
+    "account-v1.getByRiotId": "1000:60",
+    "champion-mastery-v4.getAllChampionMasteriesByPUUID": "20000:10",
+    "lol-status-v4.getPlatformData": "20000:10",
+}
+STANDIN_PUUID = "STANDIN-PUUID-0000"
+
+_ROUTES: List[Tuple[str, "re.Pattern[str]"]] = [
+    (
+        "account-v1.getByRiotId",
+        re.compile(r"^/riot/account/v1/accounts/by-riot-id/([^/]+)/([^/]+)$"),
+    ),
+    ("match-v5.getMatchIdsByPUUID", re.compile(r"^/lol/match/v5/matches/by-puuid/([^/]+)/ids$")),
+    ("match-v5.getTimeline", re.compile(r"^/lol/match/v5/matches/([^/]+)/timeline$")),
+    ("match-v5.getMatch", re.compile(r"^/lol/match/v5/matches/([^/]+)$")),
+    (
+        "champion-mastery-v4.getAllChampionMasteriesByPUUID",
+        re.compile(r"^/lol/champion-mastery/v4/champion-masteries/by-puuid/([^/]+)$"),
+    ),
+    ("lol-status-v4.getPlatformData", re.compile(r"^/lol/status/v4/platform-data$")),
+]
+
+
+def _parse_limits(value: str) -> List[Tuple[int, int]]:
+    out = []
+    for part in value.split(","):
+        n, _, secs = part.strip().partition(":")
+        if n and secs:
+            out.append((int(n), int(secs)))
+    return out
+
+
+class _Window:
+    """Fixed-limit sliding windows for one scope, mirroring how Riot counts."""
+
+    def __init__(self, limits: List[Tuple[int, int]]) -> None:
+        self.limits = limits
+        self.hits: Dict[int, deque] = {secs: deque() for _, secs in limits}
+
+    def check(self, now: float) -> Optional[float]:
+        """Record a hit, or return the Retry-After seconds if any window is full."""
+        retry = 0.0
+        for n, secs in self.limits:
+            q = self.hits[secs]
+            while q and now - q[0] >= secs:
+                q.popleft()
+            if len(q) >= n:
+                retry = max(retry, secs - (now - q[0]))
+        if retry > 0:
+            return retry
+        for q in self.hits.values():
+            q.append(now)
+        return None
+
+    def header(self) -> str:
+        return ",".join(f"{n}:{secs}" for n, secs in self.limits)
+
+    def counts(self) -> str:
+        return ",".join(f"{len(self.hits[secs])}:{secs}" for _, secs in self.limits)
+
+
+# ---- Synthetic data ----
+
+
+def synthetic_match(
+    mid: str, puuid: str, creation_ms: int, rng: random.Random, queue_id: int = 420
+) -> Dict[str, Any]:
+    roles = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+    parts = []
+    for pid in range(1, 11):
+        parts.append(
+            {
+                "participantId": pid,
+                "puuid": puuid if pid == 1 else f"{mid}-P{pid}",
+                "teamId": 100 if pid <= 5 else 200,
+                "teamPosition": roles[(pid - 1) % 5],
+                "championId": rng.randint(1, 160),
+                "kills": rng.randint(0, 12),
+                "deaths": rng.randint(0, 10),
+                "assists": rng.randint(0, 15),
+                "goldEarned": rng.randint(7000, 16000),
+                "totalDamageDealtToChampions": rng.randint(5000, 40000),
+                "totalDamageTaken": rng.randint(8000, 35000),
+                "damageDealtToObjectives": rng.randint(0, 20000),
+                "damageDealtToTurrets": rng.randint(0, 8000),
+                "totalMinionsKilled": rng.randint(20, 260),
+                "neutralMinionsKilled": rng.randint(0, 150),
+                "visionScore": rng.randint(5, 80),
+                "wardsPlaced": rng.randint(3, 30),
+                "wardsKilled": rng.randint(0, 12),
+                "win": pid <= 5,
+            }
+        )
+    return {
+        "metadata": {"matchId": mid, "participants": [p["puuid"] for p in parts]},
+        "info": {
+            "queueId": queue_id,
+            "gameCreation": creation_ms,
+            "gameDuration": rng.randint(1500, 2400),
+            "gameVersion": "14.1.555.1234",
+            "participants": parts,
+        },
+    }
+
+
+def synthetic_timeline(mid: str, match: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    minutes = int(match["info"]["gameDuration"]) // 60 + 1
+    frames = []
+    gold = {pid: 500 for pid in range(1, 11)}
+    xp = {pid: 0 for pid in range(1, 11)}
+    cs = {pid: 0 for pid in range(1, 11)}
+    for minute in range(minutes):
+        ts = minute * 60_000
+        pfs = {}
+        for pid in range(1, 11):
+            gold[pid] += rng.randint(250, 450)
+            xp[pid] += rng.randint(300, 500)
+            cs[pid] += rng.randint(4, 9) if minute else 0
+            pfs[str(pid)] = {
+                "participantId": pid,
+                "totalGold": gold[pid],
+                "currentGold": rng.randint(0, 1500),
+                "xp": xp[pid],
+                "minionsKilled": cs[pid],
+                "jungleMinionsKilled": 0,
+                "position": {"x": rng.randint(500, 14000), "y": rng.randint(500, 14000)},
+            }
+        events = []
+        for _ in range(rng.randint(2, 8)):
+            pid = rng.randint(1, 10)
+            ets = ts + rng.randint(0, 59_999)
+            kind = rng.choice(["ITEM_PURCHASED", "WARD_PLACED", "CHAMPION_KILL", "WARD_KILL"])
+            ev: Dict[str, Any] = {"type": kind, "timestamp": ets}
+            if kind == "ITEM_PURCHASED":
+                ev.update(
+                    participantId=pid, itemId=rng.choice([1055, 2003, 3340, 2055, 6672, 3031])
+                )
+            elif kind == "WARD_PLACED":
+                ev.update(
+                    creatorId=pid,
+                    wardType=rng.choice(["YELLOW_TRINKET", "CONTROL_WARD", "SIGHT_WARD"]),
+                )
+            elif kind == "CHAMPION_KILL":
+                victim = rng.choice([v for v in range(1, 11) if (v <= 5) != (pid <= 5)])
+                ev.update(
+                    killerId=pid,
+                    victimId=victim,
+                    assistingParticipantIds=[],
+                    position={"x": rng.randint(500, 14000), "y": rng.randint(500, 14000)},
+                )
+            else:
+                ev.update(killerId=pid, wardType="YELLOW_TRINKET")
+            events.append(ev)
+        events.sort(key=lambda e: e["timestamp"])
+        frames.append({"timestamp": ts, "participantFrames": pfs, "events": events})
+    return {"metadata": {"matchId": mid}, "info": {"frameInterval": 60_000, "frames": frames}}
+
+
+class Dataset:
+    """Matches/timelines served by the stand-in, newest first."""
+
+    def __init__(self) -> None:
+        self.puuid = STANDIN_PUUID
+        self.account: Dict[str, Any] = {
+            "puuid": self.puuid,
+            "gameName": "Standin",
+            "tagLine": "NA1",
+        }
+        self.matches: Dict[str, Dict[str, Any]] = {}
+        self.timelines: Dict[str, Dict[str, Any]] = {}
+        self._raw: Dict[Tuple[str, str], bytes] = {}
+
+    @classmethod
+    def synthetic(cls, n: int, seed: int = 7, spacing_s: int = 6 * 3600) -> "Dataset":
+        ds = cls()
+        rng = random.Random(seed)
+        now_ms = int(time.time() * 1000)
+        for i in range(n):
+            mid = f"NA1_{9_000_000_000 + i}"
+            m = synthetic_match(mid, ds.puuid, now_ms - (i + 1) * spacing_s * 1000, rng)
+            ds.matches[mid] = m
+            ds.timelines[mid] = synthetic_timeline(mid, m, rng)
+        return ds
+
+    @classmethod
+    def recorded(cls, root: str) -> "Dataset":
+        ds = cls()
+        base = Path(root)
+        acct = base / "account.json"
+        if acct.exists():
+            ds.account = json.loads(acct.read_text(encoding="utf-8"))
+            ds.puuid = ds.account.get("puuid") or ds.puuid
+        for f in sorted((base / "matches").glob("*.json")):
+            ds.matches[f.stem] = json.loads(f.read_text(encoding="utf-8"))
+        for f in sorted((base / "timelines").glob("*.json")):
+            ds.timelines[f.stem] = json.loads(f.read_text(encoding="utf-8"))
+        return ds
+
+    def ids(
+        self, start: int, count: int, start_time: Optional[int], end_time: Optional[int]
+    ) -> List[str]:
+        rows = sorted(
+            self.matches.items(), key=lambda kv: -int(kv[1]["info"].get("gameCreation") or 0)
+        )
+        out = []
+        for mid, m in rows:
+            ts = int(m["info"].get("gameCreation") or 0) // 1000
+            if start_time is not None and ts < start_time:
+                continue
+            if end_time is not None and ts >= end_time:
+                continue
+            out.append(mid)
+        return out[start : start + count]
+
+    def raw(self, kind: str, mid: str) -> Optional[bytes]:
+        # Encode once so the server's own JSON cost stays out of the measurement
+        key = (kind, mid)
+        if key not in self._raw:
+            src = self.matches if kind == "match" else self.timelines
+            if mid not in src:
+                return None
+            self._raw[key] = json.dumps(src[mid]).encode("utf-8")
+        return self._raw[key]
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        addr: Tuple[str, int],
+        dataset: Dataset,
+        app_limits: str = DEV_APP_LIMITS,
+        method_limits: Optional[Dict[str, str]] = None,
+        latency_ms: float = 0.0,
+    ) -> None:
+        super().__init__(addr, _Handler)
+        self.dataset = dataset
+        self.app_limits = _parse_limits(app_limits)
+        self.method_limits = {
+            k: _parse_limits(v)
+            for k, v in {**DEFAULT_METHOD_LIMITS, **(method_limits or {})}.items()
+        }
+        self.latency_ms = latency_ms
+        self.lock = threading.Lock()
+        self.app_windows: Dict[str, _Window] = {}
+        self.method_windows: Dict[Tuple[str, str], _Window] = {}
+        self.stats: Dict[str, int] = {"requests": 0, "ok": 0, "429": 0, "404": 0}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/{{route}}"
+
+    def admit(self, route: str, method: str) -> Tuple[Optional[float], str, Dict[str, str]]:
+        now = time.monotonic()
+        with self.lock:
+            app = self.app_windows.setdefault(route, _Window(self.app_limits))
+            meth = self.method_windows.setdefault(
+                (route, method), _Window(self.method_limits.get(method, [(20000, 10)]))
+            )
+            retry_m = meth.check(now)
+            retry_a = None if retry_m is not None else app.check(now)
+            if retry_a is not None:
+                # The method hit counted above must not outlive a rejected request
+                for q in meth.hits.values():
+                    q.pop()
+            headers = {
+                "X-App-Rate-Limit": app.header(),
+                "X-App-Rate-Limit-Count": app.counts(),
+                "X-Method-Rate-Limit": meth.header(),
+                "X-Method-Rate-Limit-Count": meth.counts(),
+            }
+            self.stats["requests"] += 1
+            if retry_m is not None:
+                return retry_m, "method", headers
+            if retry_a is not None:
+                return retry_a, "application", headers
+            return None, "", headers
+
+    def serve_in_thread(self) -> threading.Thread:
+        th = threading.Thread(target=self.serve_forever, name="riot-standin", daemon=True)
+        th.start()
+        return th
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StandinServer
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real edge
+
+    def log_message(self, fmt: str, *args: Any) -> None:  # quiet
+        return
+
+    def _send(self, status: int, body: bytes, headers: Dict[str, str]) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802
+        srv = self.server
+        url = urlparse(self.path)
+        route, _, rest = url.path.lstrip("/").partition("/")
+        rest = "/" + rest
+        method, match = "", None
+        for name, pat in _ROUTES:
+            match = pat.match(rest)
+            if match:
+                method = name
+                break
+        if not match:
+            srv.stats["404"] += 1
+            self._send(404, b'{"status":{"status_code":404,"message":"Not found"}}', {})
+            return
+        retry, limit_type, headers = srv.admit(route, method)
+        if retry is not None:
+            srv.stats["429"] += 1
+            headers.update(
+                {"Retry-After": str(max(1, int(retry + 0.999))), "X-Rate-Limit-Type": limit_type}
+            )
+            self._send(
+                429, b'{"status":{"status_code":429,"message":"Rate limit exceeded"}}', headers
+            )
+            return
+        if srv.latency_ms:
+            time.sleep(srv.latency_ms / 1000.0)
+        body = self._body(method, match, parse_qs(url.query))
+        if body is None:
+            srv.stats["404"] += 1
+            self._send(404, b'{"status":{"status_code":404,"message":"Data not found"}}', headers)
+            return
+        srv.stats["ok"] += 1
+        self._send(200, body, headers)
+
+    def _body(
+        self, method: str, match: "re.Match[str]", qs: Dict[str, List[str]]
+    ) -> Optional[bytes]:
+        ds = self.server.dataset
+
+        def qint(name: str) -> Optional[int]:
+            v = qs.get(name)
+            return int(v[0]) if v else None
+
+        if method == "match-v5.getMatch":
+            return ds.raw("match", match.group(1))
+        if method == "match-v5.getTimeline":
+            return ds.raw("timeline", match.group(1))
+        if method == "match-v5.getMatchIdsByPUUID":
+            ids = ds.ids(
+                qint("start") or 0, qint("count") or 20, qint("startTime"), qint("endTime")
+            )
+            return json.dumps(ids if match.group(1) == ds.puuid else []).encode("utf-8")
+        if method == "account-v1.getByRiotId":
+            return json.dumps(ds.account).encode("utf-8")
+        if method == "champion-mastery-v4.getAllChampionMasteriesByPUUID":
+            return b"[]"
+        return b"{}"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8999)
+    ap.add_argument(
+        "--matches",
+        type=int,
+        default=200,
+        help="synthetic games to serve (ignored with --record-dir)",
+    )
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--record-dir", default=None)
+    ap.add_argument(
+        "--app-limit", default=DEV_APP_LIMITS, help='e.g. "500:10,30000:600" for a production key'
+    )
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="artificial per-request latency")
+    args = ap.parse_args()
+    ds = (
+        Dataset.recorded(args.record_dir)
+        if args.record_dir
+        else Dataset.synthetic(args.matches, seed=args.seed)
+    )
+    srv = StandinServer(
+        (args.host, args.port), ds, app_limits=args.app_limit, latency_ms=args.latency_ms
+    )
+    print(f"riot stand-in: {len(ds.matches)} matches for puuid={ds.puuid}")
+    print(f"  base_url template: {srv.base_url}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
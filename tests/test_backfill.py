@@ -0,0 +1,57 @@
+import threading
+import time
+
+import core.backfill as backfill
+from core.backfill import load_cursor, run_backfill
+from core.store import Store
+from tests.test_ingest import PUUID, FakeRiot
+
+
+class HistoryRiot(FakeRiot):
+    """Match-V5 id listing over a fixed history: newest first, [startTime, endTime) filtered."""
+
+    def __init__(self, history):
+        super().__init__([mid for mid, _ in history], latency=0.0)
+        self.history = sorted(history, key=lambda h: -h[1])
+        self.list_calls = 0
+
+    def match_ids_by_puuid(self, puuid, start=0, count=20, start_time=None, end_time=None):
+        self.list_calls += 1
+        ids = [mid for mid, ts in self.history
+               if (start_time is None or ts >= start_time) and (end_time is None or ts < end_time)]
+        return ids[start:start + count]
+
+    def budget(self, method):
+        return 10.0
+
+
+def test_backfill_pages_windows_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr(backfill, "PAGE_SIZE", 4)
+    now = int(time.time())
+    # 10 games in the newest 30-day window (forces paging), the rest spread over older windows
+    history = [(f"NA1_{i}", now - 3600 * (i + 1)) for i in range(10)]
+    history += [(f"NA1_{i}", now - 86400 * 10 * (i - 7)) for i in range(10, 25)]
+    rc = HistoryRiot(history)
+    store = Store(db_path=str(tmp_path / "t.db"))
+
+    stop = threading.Event()
+    seen_progress = []
+
+    def on_progress(p):
+        seen_progress.append(p)
+        if len(seen_progress) == 2:
+            stop.set()
+
+    cur = run_backfill(rc, store, PUUID, stop=stop, on_progress=on_progress)
+    assert not cur.done
+    assert cur.ingested == 8 and cur.start == 8
+    saved = load_cursor(store, PUUID)
+    assert saved is not None and saved.start == 8 and saved.end_time == cur.end_time
+    assert seen_progress[-1]["eta_s"] is not None
+
+    # A fresh run picks the checkpoint back up instead of starting over
+    cur = run_backfill(rc, store, PUUID)
+    assert cur.done
+    assert cur.ingested == 25
+    assert len(store.seen_match_ids()) == 25
+    assert load_cursor(store, PUUID).done
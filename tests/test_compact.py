@@ -0,0 +1,77 @@
+import sqlite3
+
+from core.compact import compact_frames_events, legacy_tables
+from core.store import Store
+
+FRAME = ("M1", 60000, 1, 800, 300, 7, 100, 1000.0, 1000.0)
+EVENTS = [
+    ("M1", 1000, "ITEM_PURCHASED", 1, None, None, 2003, None),
+    ("M1", 1000, "ITEM_PURCHASED", 1, None, None, 2003, None),  # two potions in the same ms
+    ("M1", 90000, "CHAMPION_KILL", None, 3, 7, None, None),
+]
+
+
+def _counts(store):
+    with store.connect() as con:
+        return tuple(
+            con.execute(f"SELECT COUNT(*) FROM {t} WHERE match_id='M1'").fetchone()[0]
+            for t in ("frames", "events")
+        )
+
+
+def _index_columns(store, table):
+    with store.connect() as con:
+        names = [r[1] for r in con.execute(f"PRAGMA index_list('{table}')")]
+        return {n: [r[2] for r in con.execute(f"PRAGMA index_info('{n}')")] for n in names}
+
+
+def test_frames_and_events_are_replaced_per_match(tmp_path):
+    store = Store(db_path=str(tmp_path / "t.db"))
+    for _ in range(3):  # forced refetches
+        store.insert_frames([FRAME, ("M1", 60000, 2, 700, 250, 5, 50, None, None)])
+        store.insert_events(EVENTS)
+    assert _counts(store) == (2, 3)
+    store.replace_match_events("M1", EVENTS[2:])
+    assert _counts(store) == (2, 1)
+
+
+def test_compaction_dedupes_pre_schema_9_tables(tmp_path):
+    fresh = str(tmp_path / "v8.db")
+    Store(db_path=fresh)
+    path = str(tmp_path / "old.db")
+    con = sqlite3.connect(path)
+    sqlite3.connect(fresh).backup(con)  # a schema 8 database...
+    con.execute("UPDATE meta SET value='8' WHERE key='schema_version'")
+    con.execute("DROP TABLE frames")  # ...whose frames/events had no key
+    con.execute("DROP TABLE events")
+    con.execute(
+        "CREATE TABLE frames (match_id TEXT, ts_ms INTEGER, participant_id INTEGER,"
+        " total_gold INTEGER,"
+        " xp INTEGER, cs INTEGER, current_gold INTEGER, x REAL, y REAL)"
+    )
+    con.execute(
+        "CREATE TABLE events (match_id TEXT, ts_ms INTEGER, type TEXT, participant_id INTEGER,"
+        " killer_id INTEGER, victim_id INTEGER, item_id INTEGER, ward_type TEXT)"
+    )
+    con.execute("CREATE INDEX idx_frames_match ON frames(match_id, ts_ms)")  # schema 7
+    con.execute("CREATE INDEX idx_events_match ON events(match_id, ts_ms)")
+    for _ in range(2):  # the same match ingested twice
+        con.execute("INSERT INTO frames VALUES(?,?,?,?,?,?,?,?,?)", FRAME)
+        con.executemany("INSERT INTO events VALUES(?,?,?,?,?,?,?,?)", EVENTS)
+    con.commit()
+    con.close()
+
+    store = Store(db_path=path)
+    assert legacy_tables(store) == ["events_legacy", "frames_legacy"]
+    assert _counts(store) == (0, 0)
+    for db in (
+        store,
+        Store(db_path=fresh),
+    ):  # migrated and fresh databases end up with the same indexes
+        assert _index_columns(db, "events")["idx_events_match"] == ["match_id", "ts_ms"]
+        assert _index_columns(db, "frames")["idx_frames_match"] == ["match_id", "ts_ms"]
+    assert "idx_events_legacy_match" in _index_columns(store, "events_legacy")
+    report = compact_frames_events(store, batch=1)
+    assert report["done"] and report["rows_before"] == 8 and report["rows_after"] == 4
+    assert _counts(store) == (1, 3)
+    assert legacy_tables(store) == []
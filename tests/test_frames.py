@@ -0,0 +1,123 @@
+import random
+import statistics
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from riot_standin import Dataset  # noqa: E402
+
+from core.frames import FrameMatrix, nearest_index  # noqa: E402
+from core.metrics import find_frame_at  # noqa: E402
+from core.store import Store  # noqa: E402
+
+
+def _timeline():
+    ds = Dataset.synthetic(1)
+    return next(iter(ds.timelines.values()))
+
+
+def test_matrix_matches_the_nested_frames():
+    tl = _timeline()
+    fm = FrameMatrix.from_timeline(tl)
+    assert fm.n_frames == len(tl["info"]["frames"]) and fm.n_participants == 10
+    rng = random.Random(3)
+    for _ in range(50):
+        ms, pid = rng.randint(0, 40 * 60_000), rng.randint(1, 10)
+        pf = find_frame_at(tl, ms)["participantFrames"][str(pid)]
+        assert fm.value_at("total_gold", ms, pid) == pf["totalGold"]
+        assert fm.value_at("cs", ms, pid) == pf["minionsKilled"] + pf["jungleMinionsKilled"]
+        assert fm.value_at("x", ms, pid) == pf["position"]["x"]
+    # Roam distance: same as walking the positions before 14:00
+    pts = [
+        (f["participantFrames"]["3"]["position"]["x"], f["participantFrames"]["3"]["position"]["y"])
+        for f in tl["info"]["frames"]
+        if f["timestamp"] <= 14 * 60_000
+    ]
+    walked = sum(
+        ((x1 - x0) ** 2 + (y1 - y0) ** 2) ** 0.5 for (x0, y0), (x1, y1) in zip(pts, pts[1:])
+    )
+    assert abs(fm.path_length(3, 14 * 60_000) - walked) < 1e-6
+    assert fm.diff_at("xp", 600_000, 1, None) == 0
+    assert FrameMatrix.from_timeline({}).value_at("cs", 600_000, 1) == 0
+
+
+def test_blob_round_trip_is_zero_copy(tmp_path):
+    fm = FrameMatrix.from_timeline(_timeline())
+    store = Store(db_path=str(tmp_path / "f.db"))
+    store.upsert_frame_matrix("M1", fm.to_blob())
+    got = store.load_frame_matrix("M1")
+    for name in ("ts", "total_gold", "xp", "cs", "current_gold", "x", "y"):
+        arr = getattr(got, name)
+        assert np.array_equal(arr, getattr(fm, name), equal_nan=True)
+        assert not arr.flags.owndata and not arr.flags.writeable
+    assert store.load_frame_matrix("missing") is None
+
+
+def test_bisected_lookup_matches_a_linear_scan():
+    ts = [0, 1000, 1000, 3000, 7000, 7000, 8000]
+    for ms in range(-500, 9000, 250):
+        want = min(range(len(ts)), key=lambda i: abs(ts[i] - ms))
+        assert nearest_index(ts, ms) == want, ms
+    assert nearest_index([], 5) is None
+    fm = FrameMatrix.from_timeline(_timeline())
+    marks = list(range(0, 30 * 60_000, 45_000))
+    assert fm.values_at("xp", marks, 4).tolist() == [fm.value_at("xp", ms, 4) for ms in marks]
+    assert fm.values_at("xp", marks, 11).tolist() == [0.0] * len(marks)
+
+
+def test_interpolated_lookup():
+    fm = FrameMatrix.from_timeline(_timeline())
+    g0, g1 = fm.value_at("total_gold", 60_000, 2), fm.value_at("total_gold", 120_000, 2)
+    assert fm.interp_at("total_gold", 60_000, 2) == g0
+    assert fm.interp_at("total_gold", 75_000, 2) == g0 + (g1 - g0) * 0.25
+    assert fm.interp_at("total_gold", -1, 2) == fm.value_at("total_gold", 0, 2)
+    assert fm.interp_at("total_gold", 10**9, 2) == fm.total_gold[-1, 1]
+    assert fm.values_at("total_gold", [75_000], 2, interpolate=True)[0] == g0 + (g1 - g0) * 0.25
+    assert FrameMatrix.from_timeline({}).interp_at("xp", 1000, 1, default=-1) == -1
+
+
+def test_position_tracks_answer_batched_distance_queries():
+    tl = _timeline()
+    fm = FrameMatrix.from_timeline(tl)
+    rng = random.Random(5)
+    marks = [rng.randint(0, 30 * 60_000) for _ in range(40)]
+    pts = [(rng.randint(0, 15000), rng.randint(0, 15000)) for _ in marks]
+    d = fm.distances_at(marks, 3, [p[0] for p in pts], [p[1] for p in pts])
+    for ms, (x, y), got in zip(marks, pts, d):
+        pos = find_frame_at(tl, ms)["participantFrames"]["3"]["position"]
+        assert got == ((pos["x"] - x) ** 2 + (pos["y"] - y) ** 2) ** 0.5
+    # Interpolated positions lie on the segment between the surrounding frames
+    t, xs, ys = fm.track(3)
+    px, _ = fm.positions_at([int(t[1] + (t[2] - t[1]) / 2)], 3, interpolate=True)
+    assert px[0] == (xs[1] + xs[2]) / 2
+    assert np.isnan(fm.positions_at([0], 12)[0]).all()
+
+
+def test_median_distance_to_each_enemy():
+    tl = _timeline()
+    fm = FrameMatrix.from_timeline(tl)
+    window = [
+        f["participantFrames"] for f in tl["info"]["frames"] if 120_000 <= f["timestamp"] <= 600_000
+    ]
+    got = fm.median_distances(2, [6, 7, 8, 9, 10, 11], 120_000, 600_000)
+    for k, eid in enumerate([6, 7, 8, 9, 10]):
+        want = statistics.median(
+            (
+                (pf["2"]["position"]["x"] - pf[str(eid)]["position"]["x"]) ** 2
+                + (pf["2"]["position"]["y"] - pf[str(eid)]["position"]["y"]) ** 2
+            )
+            ** 0.5
+            for pf in window
+        )
+        assert abs(got[k] - want) < 1e-9
+    assert np.isnan(got[5])
+    # A gap in one track only drops that frame from the pair's median
+    keep = (fm.ts >= 120_000) & (fm.ts <= 600_000)
+    i = int(np.flatnonzero(keep)[0])
+    fm.x[i, 5] = np.nan
+    keep[i] = False
+    d = np.hypot(fm.x[keep, 1] - fm.x[keep, 5], fm.y[keep, 1] - fm.y[keep, 5])
+    assert abs(fm.median_distances(2, [6], 120_000, 600_000)[0] - np.median(d)) < 1e-3
@@ -1,11 +1,9 @@
 import json
 import time
-
 import types
 
-from core.store import Store
 from core.gis import update_scores_for_match
-
+from core.store import Store
 
 PUUID = "P-TEST"
 
@@ -156,8 +154,15 @@ def test_patch_easing_meta_and_mastery_guardrail(monkeypatch):
         import core.gis as g
         monkeypatch.setattr(g, "_extract_features", lambda store, mid, puuid: ({"gd10": 0.0}, {"queue_id": 420, "role": "JUNGLE", "duration_s": 1800}))
         # Ensure low mastery triggers guardrail; patch standardize to force negative z
-        monkeypatch.setattr(g, "_standardize", lambda store, puuid, queue, role, metrics, huber_k=2.5: ({"gd10": -10.0}, {}))
-        monkeypatch.setattr(g, "_is_low_mastery", lambda puuid, champ_id: True)
+        monkeypatch.setattr(
+            g,
+            "_standardize",
+            lambda store, puuid, queue, role, metrics, huber_k=2.5, state=None: (
+                {"gd10": -10.0},
+                {},
+            ),
+        )
+        monkeypatch.setattr(g, "_is_low_mastery", lambda puuid, champ_id, store=None: True)
         res = update_scores_for_match(S, PUUID, mid)
         assert res is not None
         # Cap of 3.0 means laning domain cannot be < 47.0
@@ -166,3 +171,55 @@ def test_patch_easing_meta_and_mastery_guardrail(monkeypatch):
         key = f"patch_ease:{PUUID}:{420}:{'JUNGLE'}"
         meta = S.get_meta(key)
         assert meta is not None
+
+
+def test_standardize_reads_and_writes_baselines_in_bulk(monkeypatch):
+    from core import gis as g
+
+    S = make_store()
+    S.upsert_norm(PUUID, None, None, "gd10", 100.0, 400.0)  # only a global baseline exists
+    S.upsert_norm(PUUID, 420, "MIDDLE", "dpm", 500.0, 2500.0)
+    monkeypatch.setattr(g, "get_config", lambda: {})
+    calls = []
+    for name in ("load_norm", "upsert_norm", "load_domain_score", "upsert_domain_score"):
+        monkeypatch.setattr(S, name, lambda *a, _n=name: calls.append(_n))
+    z, states = g._standardize(S, PUUID, 420, "MIDDLE", {"gd10": 140.0, "dpm": 450.0, "cs10": 70.0})
+    assert calls == []
+    assert z["gd10"] == 2.0 and z["dpm"] == -1.0 and z["cs10"] == 0.0
+    gs = S.load_gis_state(PUUID, 420, "MIDDLE")
+    for m, (mu, var) in states.items():
+        assert gs.norms[(420, "MIDDLE", m)] == (mu, var)
+    # The relaxed baseline itself is left alone
+    assert gs.norms[(None, None, "gd10")] == (100.0, 400.0)
+
+
+def test_mastery_is_fetched_before_the_transaction(monkeypatch):
+    import core.gis as g
+
+    S = make_store()
+    S.upsert_match_raw("M1", PUUID, 420, 1000, 1800, "14.1", "JUNGLE", 7, json.dumps({}))
+    fetched = []
+
+    class FakeRiot:
+        def champion_masteries_by_puuid(self, puuid):
+            fetched.append(S.in_transaction())
+            return [{"championId": 7, "championLevel": 2, "championPoints": 10}]
+
+    monkeypatch.setattr(
+        g.RiotClient, "from_config", classmethod(lambda cls, cfg, kind=None: FakeRiot())
+    )
+    monkeypatch.setattr(
+        g,
+        "_extract_features",
+        lambda store, mid, puuid: (
+            {"gd10": 0.0},
+            {"queue_id": 420, "role": "JUNGLE", "duration_s": 1800},
+        ),
+    )
+    # A cache miss inside a transaction never waits on Riot
+    with S.transaction():
+        assert not g._is_low_mastery(PUUID, 7, S)
+    assert fetched == []
+    assert g.process_new_matches(S, PUUID) == 1
+    assert fetched == [False]
+    assert g._is_low_mastery(PUUID, 7, S)
@@ -0,0 +1,309 @@
+import threading
+import time
+
+from core.metrics import IngestStats, ingest_and_compute_recent, ingest_roster
+from core.store import Store
+
+PUUID = "P-TEST"
+
+
+def make_match(mid: str, duration_s: int = 1800, queue_id: int = 420) -> dict:
+    parts = []
+    for pid in range(1, 11):
+        parts.append({
+            "participantId": pid,
+            "puuid": PUUID if pid == 1 else f"OTHER-{pid}",
+            "teamId": 100 if pid <= 5 else 200,
+            "teamPosition": ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"][(pid - 1) % 5],
+            "championId": pid,
+            "kills": 1,
+            "deaths": 1,
+            "assists": 1,
+        })
+    return {
+        "metadata": {"matchId": mid, "participants": [p["puuid"] for p in parts]},
+        "info": {"queueId": queue_id, "gameCreation": 1_700_000_000_000, "gameDuration": duration_s,
+                 "gameVersion": "14.1.1", "participants": parts},
+    }
+
+
+def make_timeline(mid: str) -> dict:
+    frames = []
+    for minute in range(0, 16):
+        pfs = {
+            str(pid): {
+                "totalGold": 500 + 300 * minute,
+                "xp": 250 * minute,
+                "minionsKilled": 7 * minute,
+                "jungleMinionsKilled": 0,
+                "currentGold": 100,
+                "position": {"x": 1000 + pid, "y": 1000 + minute},
+            }
+            for pid in range(1, 11)
+        }
+        frames.append({"timestamp": minute * 60_000, "participantFrames": pfs, "events": []})
+    return {"metadata": {"matchId": mid}, "info": {"frames": frames}}
+
+
+class FakeRiot:
+    def __init__(self, ids, latency=0.05):
+        self.ids = ids
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _call(self, value):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+        return value
+
+    def match_ids_by_puuid(self, puuid, start=0, count=20, start_time=None):
+        return self.ids[start : start + count]
+
+    def get_match(self, mid):
+        return self._call(make_match(mid, duration_s=200 if mid.endswith("R") else 1800))
+
+    def get_timeline(self, mid):
+        return self._call(make_timeline(mid))
+
+
+def test_pipeline_ingests_concurrently_and_reports_stages(tmp_path):
+    store = Store(db_path=str(tmp_path / "t.db"))
+    ids = [f"NA1_{i}" for i in range(12)] + ["NA1_99R"]
+    rc = FakeRiot(ids)
+    stats = IngestStats()
+    n = ingest_and_compute_recent(rc, store, PUUID, count=50, workers=6, stats=stats)
+    assert n == 12
+    assert rc.max_in_flight > 1
+    d = stats.as_dict()
+    assert d["skipped"] == 1
+    assert d["fetch"]["items"] == 13
+    assert d["parse"]["items"] == 12
+    assert d["write"]["items"] == 12
+    assert store.seen_match_ids() == set(ids[:-1])
+    fm = store.load_frame_matrix("NA1_3")
+    assert fm.n_frames == 16 and fm.value_at("cs", 10 * 60_000, 1) == 70
+    # Second run sees everything already stored
+    assert ingest_and_compute_recent(rc, store, PUUID, count=50) == 0
+
+
+def test_pipeline_surfaces_fetch_errors(tmp_path):
+    store = Store(db_path=str(tmp_path / "t.db"))
+
+    class Boom(FakeRiot):
+        def get_timeline(self, mid):
+            raise RuntimeError("429 Client Error")
+
+    rc = Boom(["NA1_1", "NA1_2"])
+    try:
+        ingest_and_compute_recent(rc, store, PUUID, count=5)
+    except RuntimeError as e:
+        assert "429" in str(e)
+    else:
+        raise AssertionError("expected fetch failure to propagate")
+
+
+def test_roster_shares_one_fetch_per_game(tmp_path):
+    store = Store(db_path=str(tmp_path / "t.db"))
+    ids = [f"NA1_{i}" for i in range(6)]
+    rc = FakeRiot(ids, latency=0.0)
+    calls = []
+    get_match = rc.get_match
+    rc.get_match = lambda mid: calls.append(mid) or get_match(mid)
+    n = ingest_roster(rc, store, [PUUID, "OTHER-2"], count=50)
+    assert n == 6
+    assert sorted(calls) == sorted(ids)  # fetched once, not once per member
+    for pu in (PUUID, "OTHER-2"):
+        assert store.seen_match_ids(pu) == set(ids)
+        assert len(store.recent_metrics(pu)) == 6
+
+    # A member added later is served from stored games without API calls
+    calls.clear()
+    stats = IngestStats()
+    assert ingest_roster(rc, store, [PUUID, "OTHER-2", "OTHER-7"], count=50, stats=stats) == 6
+    assert calls == [] and stats.reused == 6
+    assert len(store.recent_metrics("OTHER-7")) == 6
+
+
+def test_recent_ingest_adds_roster_rows_to_games_stored_for_the_player(tmp_path):
+    store = Store(db_path=str(tmp_path / "t.db"))
+    ids = [f"NA1_{i}" for i in range(4)]
+    rc = FakeRiot(ids, latency=0.0)
+    assert ingest_and_compute_recent(rc, store, PUUID, count=10) == 4
+    calls = []
+    get_match = rc.get_match
+    rc.get_match = lambda mid: calls.append(mid) or get_match(mid)
+    stats = IngestStats()
+    # The live path: the player's rows exist, the roster mate's do not
+    assert (
+        ingest_and_compute_recent(rc, store, PUUID, count=10, stats=stats, roster=["OTHER-3"]) == 4
+    )
+    assert calls == [] and stats.reused == 4
+    assert store.seen_match_ids("OTHER-3") == set(ids)
+    # Nothing left to do once every roster mate who played has rows; absent members cost no refetch
+    assert (
+        ingest_and_compute_recent(rc, store, PUUID, count=10, roster=["OTHER-3", "NOT-IN-GAME"])
+        == 0
+    )
+
+
+def test_match_list_is_served_from_summary_columns(tmp_path, monkeypatch):
+    import json
+
+    from backend.server.routers import matches as r
+    from core import codec
+
+    store = Store(db_path=str(tmp_path / "t.db"))
+    ingest_and_compute_recent(FakeRiot(["NA1_1", "NA1_2"], latency=0.0), store, PUUID, count=5)
+    store.upsert_inst_contrib("NA1_1", PUUID, "laning", 62.0, json.dumps({"gd10": 1.2}))
+    store.upsert_inst_contrib("NA1_1", PUUID, "vision", 50.0, json.dumps({"vs": 0.1}))
+    monkeypatch.setattr(r, "Store", lambda: store)
+    monkeypatch.setattr(codec, "loads", None)  # the list must not decode payloads
+    rows = {
+        m["match_id"]: m
+        for m in r.list_matches(
+            limit=50, offset=0, queue=None, role=None, champion=None, patch=None, puuid=PUUID
+        )["data"]
+    }
+    assert set(rows) == {"NA1_1", "NA1_2"}
+    me = rows["NA1_1"]
+    assert (me["k"], me["d"], me["a"], me["cs"], me["kp"], me["result"]) == (
+        1,
+        1,
+        1,
+        0,
+        40.0,
+        "Lose",
+    )
+    assert me["badges"] == ["Laning High"] and rows["NA1_2"]["badges"] == []
+    assert {"queue_id", "champion_id", "dl14", "csm", "dpm"} <= set(me) and not {
+        "vpm",
+        "objp",
+        "domain_badges",
+    } & set(me)
+    # Clearing contributions clears the badge
+    store.upsert_inst_contrib("NA1_1", PUUID, "laning", 50.0, "{}")
+    with store.connect() as con:
+        assert (
+            con.execute(
+                "SELECT domain_badges FROM match_summary WHERE match_id='NA1_1'"
+            ).fetchone()[0]
+            == "[]"
+        )
+
+
+def test_retention_archives_derived_timelines_and_reads_them_back(tmp_path):
+    import os
+
+    store = Store(db_path=str(tmp_path / "t.db"))
+    ids = [f"NA1_{i}" for i in range(6)]
+    ingest_and_compute_recent(FakeRiot(ids, latency=0.0), store, PUUID, count=10)
+    for mid in ids[1:]:  # NA1_0 has no GIS rows yet, so it must stay
+        store.upsert_inst_contrib(mid, PUUID, "laning", 50.0, "{}")
+    assert store.archive_timelines(keep_days=0, keep_last=0)["archived"] == 0  # policy disabled
+
+    report = store.archive_timelines(
+        keep_days=30, keep_last=None, batch=2, now_ms=1_800_000_000_000
+    )
+    assert report["done"] and report["archived"] == 5
+    with store.connect() as con:
+        assert [r[0] for r in con.execute("SELECT match_id FROM timelines")] == ["NA1_0"]
+    assert os.path.exists(store.db_path + ".archive")
+    assert store.archive.stats()["timelines"] == 5
+    # Archived timelines are transparently rehydrated for readers and recomputes
+    assert len(store.load_timeline("NA1_3")["info"]["frames"]) == 16
+    # Queues GIS never scores (normals here) do not wait for inst_contrib rows
+    normals = FakeRiot(["NA1_N"], latency=0.0)
+    normals.get_match = lambda mid: make_match(mid, queue_id=400)
+    ingest_and_compute_recent(normals, store, PUUID, count=10)
+    report = store.archive_timelines(keep_days=30, keep_last=None, now_ms=1_800_000_000_000)
+    assert report["archived"] == 1 and store.archive.stats()["timelines"] == 6
+    vac = store.incremental_vacuum(pages=None)
+    assert vac["incremental"] and vac["freelist_pages"] == 0
+
+
+def test_vacuum_never_converts_a_legacy_database_implicitly(tmp_path, monkeypatch):
+    import sqlite3
+    from types import SimpleNamespace
+
+    from backend.server.cron import retention
+
+    path = str(tmp_path / "legacy.db")
+    with sqlite3.connect(path) as con:  # created before auto_vacuum=INCREMENTAL
+        con.execute("CREATE TABLE legacy (x)")
+    store = Store(db_path=path)
+    with store.connect() as con:
+        assert con.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+    vac = store.incremental_vacuum(pages=None)
+    assert not vac["incremental"] and vac["freed_pages"] == 0
+    with store.connect() as con:
+        assert con.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+
+    # The cron only vacuums after archiving something
+    calls = []
+    monkeypatch.setattr(retention, "_tick", lambda: (False, 0))
+    monkeypatch.setattr(retention, "_vacuum", lambda: calls.append(1) or False)
+
+    def sleep(s):
+        if s > 120:  # the daily wait: one pass is enough
+            raise SystemExit
+
+    monkeypatch.setattr(retention, "time", SimpleNamespace(sleep=sleep))
+    try:
+        retention._loop()
+    except SystemExit:
+        pass
+    assert calls == []
+
+    # Conversion is the explicit step
+    assert store.enable_incremental_vacuum() and not store.enable_incremental_vacuum()
+    assert sqlite3.connect(path).execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def test_match_context_is_stored_at_ingest_and_read_back(tmp_path):
+    from core.timeline import ParsedTimeline
+
+    store = Store(db_path=str(tmp_path / "t.db"))
+    rc = FakeRiot(["NA1_1", "NA1_2"], latency=0.0)
+    ingest_roster(rc, store, [PUUID, "OTHER-7"], count=50)
+    ctx = store.get_match_context("NA1_1", PUUID)
+    assert ctx == {
+        "participant_id": 1,
+        "team_id": 100,
+        "role": "TOP",
+        "opponent_id": 6,
+        "opponent_champion_id": 6,
+    }
+    assert store.get_match_context("NA1_2", "OTHER-7")["opponent_id"] == 2
+
+    # Rows from before schema 12 are resolved by the backfill
+    with store.transaction(), store._writer() as con:
+        con.execute("DELETE FROM match_context")
+    assert store.backfill_match_context() == 4
+    assert store.get_match_context("NA1_1", PUUID) == ctx
+
+    # Readers take the stored opponent instead of resolving it again
+    store.upsert_match_context("NA1_1", PUUID, {**ctx, "opponent_id": 8, "opponent_champion_id": 8})
+    pt = ParsedTimeline.build(make_match("NA1_1"), make_timeline("NA1_1"))
+    store.use_match_context("NA1_1", PUUID, pt)
+    assert pt.lane_opponent(1) == 8
+
+
+def test_ingest_counters_are_shared_safely_across_stage_threads():
+    stats = IngestStats()
+    workers = [
+        threading.Thread(target=lambda: [stats.count("skipped") for _ in range(2000)])
+        for _ in range(8)
+    ]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    stats.count("reused", 3)
+    assert (stats.skipped, stats.reused) == (16000, 3)
+    assert stats.as_dict()["skipped"] == 16000
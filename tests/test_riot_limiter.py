@@ -0,0 +1,129 @@
+import threading
+import time
+
+from core.riot import _parse_limits, _RateLimiter
+
+
+def test_parse_limits():
+    assert _parse_limits("20:1,100:120") == [(20, 1.0), (100, 120.0)]
+    assert _parse_limits(None) == []
+    assert _parse_limits("bogus,5:10") == [(5, 10.0)]
+
+
+def test_learns_limits_per_route_and_method():
+    rl = _RateLimiter()
+    rl.observe("americas", "match-v5.getMatch", {
+        "X-App-Rate-Limit": "500:10,30000:600",
+        "X-App-Rate-Limit-Count": "1:10,1:600",
+        "X-Method-Rate-Limit": "2000:10",
+        "X-Method-Rate-Limit-Count": "1:10",
+    })
+    assert rl.budget("americas", "match-v5.getMatch", "fg") == 50.0
+    # Other routing values keep the dev-key defaults until they see headers
+    assert (
+        rl.budget("na1", "champion-mastery-v4.getAllChampionMasteriesByPUUID", "fg") == 100 / 120.0
+    )
+
+
+def _probe(rl, kind, route, method):
+    # One non-blocking scheduling attempt
+    with rl._cond:
+        t = rl._enqueue(kind, route, method, None)
+        granted, timeout, _ = rl._try_grant(t)
+        if not granted:
+            rl._waiting.remove(t)
+    return granted, timeout
+
+
+def test_bg_leaves_headroom_for_fg():
+    rl = _RateLimiter(app_limits=[(5, 60.0)], headroom={"bg": 0.4})
+    for _ in range(3):
+        rl.acquire("bg", "americas", "m")
+    # bg is out of budget (3 of 5) but foreground still gets through immediately
+    granted, timeout = _probe(rl, "bg", "americas", "m")
+    assert not granted and timeout > 0
+    t0 = time.monotonic()
+    rl.acquire("fg", "americas", "m")
+    assert time.monotonic() - t0 < 0.1
+
+
+def test_waiter_wakes_when_limits_grow():
+    rl = _RateLimiter(app_limits=[(1, 60.0)])
+    rl.acquire("fg", "americas", "m")
+    done = threading.Event()
+
+    def worker():
+        rl.acquire("fg", "americas", "m")
+        done.set()
+
+    th = threading.Thread(target=worker, daemon=True)
+    th.start()
+    time.sleep(0.05)
+    assert not done.is_set()
+    rl.observe("americas", "m", {"X-App-Rate-Limit": "100:1", "X-App-Rate-Limit-Count": "1:1"})
+    assert done.wait(1.0)
+
+
+def test_penalize_blocks_only_named_bucket():
+    rl = _RateLimiter()
+    rl.penalize(
+        "americas", "match-v5.getTimeline", {"Retry-After": "5", "X-Rate-Limit-Type": "method"}
+    )
+    granted, timeout = _probe(rl, "fg", "americas", "match-v5.getTimeline")
+    assert not granted and timeout > 1
+    assert _probe(rl, "fg", "americas", "match-v5.getMatch")[0]
+
+
+def test_fg_overtakes_queued_bg_and_classes_stay_fifo():
+    rl = _RateLimiter(app_limits=[(1, 0.2)], headroom={"bg": 0.0, "bulk": 0.0})
+    rl.acquire("fg", "americas", "m")
+    order = []
+
+    def worker(kind, tag):
+        rl.acquire(kind, "americas", "m")
+        order.append(tag)
+
+    threads = []
+    for tag in ("bulk1", "bg1", "bg2"):
+        threads.append(threading.Thread(target=worker, args=(tag.rstrip("12"), tag)))
+        threads[-1].start()
+        time.sleep(0.02)
+    threads.append(threading.Thread(target=worker, args=("fg", "fg1")))
+    threads[-1].start()
+    for th in threads:
+        th.join(3.0)
+    assert order == ["fg1", "bg1", "bg2", "bulk1"]
+    st = rl.stats()
+    assert st["bg"]["granted"] == 2 and st["bg"]["queued"] == 0
+    assert st["fg"]["max_wait_ms"] < st["bulk"]["max_wait_ms"]
+
+
+def test_other_routes_are_not_blocked_by_a_busy_one():
+    rl = _RateLimiter(app_limits=[(1, 60.0)])
+    rl.acquire("fg", "americas", "m")
+    th = threading.Thread(target=rl.acquire, args=("fg", "americas", "m"), daemon=True)
+    th.start()
+    time.sleep(0.02)
+    t0 = time.monotonic()
+    rl.acquire("bg", "europe", "m")
+    assert time.monotonic() - t0 < 0.1
+
+
+def test_async_pool_is_kept_per_loop_and_closed_on_shutdown():
+    import asyncio
+
+    from core import riot
+
+    async def grab():
+        return riot._async_pool()
+
+    first_loop = asyncio.new_event_loop()
+    try:
+        first = first_loop.run_until_complete(grab())
+        second = asyncio.run(grab())  # another loop gets its own client...
+        assert second is not first and not first.is_closed  # ...without orphaning the first
+        assert first_loop.run_until_complete(grab()) is first
+        first_loop.run_until_complete(riot.aclose_async_pool())
+        assert first.is_closed and len(riot._ASYNC_POOLS) == 0
+    finally:
+        first_loop.close()
@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from riot_standin import Dataset, StandinServer  # noqa: E402
+
+from core.riot import _RATE_LIMITER, RiotClient  # noqa: E402
+
+
+def test_client_talks_to_standin_and_learns_limits():
+    ds = Dataset.synthetic(5)
+    srv = StandinServer(("127.0.0.1", 0), ds, app_limits="3:1,50:60")
+    srv.serve_in_thread()
+    try:
+        rc = RiotClient(
+            region="standin-route", platform="standin-plat", api_key="x", base_url=srv.base_url
+        )
+        ids = rc.match_ids_by_puuid(ds.puuid, count=10)
+        assert ids == ds.ids(0, 10, None, None)
+        m = rc.get_match(ids[0])
+        assert m["metadata"]["matchId"] == ids[0]
+        assert rc.get_timeline(ids[0])["info"]["frames"]
+        # Limits came from the stand-in's headers; four calls under 3/s means we waited, not 429'd
+        assert rc.budget("match-v5.getMatch") == 50 / 60
+        rc.get_match(ids[1])
+        assert srv.stats["429"] == 0 and srv.stats["ok"] == 4
+    finally:
+        srv.shutdown()
+        _RATE_LIMITER._app.pop("standin-route", None)
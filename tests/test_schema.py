@@ -0,0 +1,35 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from riot_standin import Dataset  # noqa: E402
+
+from core import schema  # noqa: E402
+from core.metrics import compute_metrics  # noqa: E402
+from core.metrics_extras import compute_extras  # noqa: E402
+
+
+def test_typed_subset_drops_unused_fields_and_keeps_metrics():
+    ds = Dataset.synthetic(1)
+    mid = next(iter(ds.matches))
+    match, tl = ds.matches[mid], ds.timelines[mid]
+    match["info"]["participants"][0]["challenges"] = {"kda": 3.5}
+    tl["info"]["frames"][1]["participantFrames"]["1"]["championStats"] = {"armor": 30}
+    m = schema.decode_match(json.dumps(match))
+    t = schema.decode_timeline(json.dumps(tl).encode("utf-8"))
+    if schema._msgspec is not None:  # without msgspec the payload is parsed whole
+        assert "challenges" not in m["info"]["participants"][0]
+        assert "championStats" not in t["info"]["frames"][1]["participantFrames"]["1"]
+    assert t["info"]["frames"][1]["events"] == tl["info"]["frames"][1]["events"]
+    for p in match["info"]["participants"][:3]:
+        pu = p["puuid"]
+        assert compute_metrics(m, t, pu) == compute_metrics(match, tl, pu)
+        assert compute_extras(m, t, None, pu) == compute_extras(match, tl, None, pu)
+
+
+def test_off_schema_payloads_decode_in_full():
+    raw = json.dumps({"info": {"gameDuration": 1800.5, "extra": 1}})
+    assert schema.decode_match(raw) == {"info": {"gameDuration": 1800.5, "extra": 1}}
+    assert schema.decode_timeline("{}") == {}
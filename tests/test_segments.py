@@ -0,0 +1,109 @@
+import json
+import os
+
+from core import codec
+from core.store import Store, close_pools
+from scripts.riot_standin import Dataset
+
+
+def test_large_payloads_live_in_mapped_segments_once(tmp_path):
+    ds = Dataset.synthetic(3)
+    store = Store(db_path=str(tmp_path / "s.db"))
+    mid = next(iter(ds.matches))
+    text = json.dumps(ds.timelines[mid])
+    store.upsert_timeline_raw(mid, text)
+    store.upsert_timeline_raw("COPY", text)  # same content, stored once
+    store.upsert_match_raw(mid, "A", 420, 1, 1800, "14.1", None, 1, json.dumps(ds.matches[mid]))
+    with store.connect() as con:
+        refs = [r[0] for r in con.execute("SELECT raw_json FROM timelines")]
+        small = con.execute("SELECT raw_json FROM matches").fetchone()[0]
+        n_index = con.execute("SELECT COUNT(*) FROM segment_index").fetchone()[0]
+    assert all(codec.ref_location(v) and len(v) < 40 for v in refs) and refs[0] == refs[1]
+    assert n_index == 1
+    assert codec.is_packed(small)  # a page-sized payload stays inline
+    assert isinstance(store.raw_bytes(refs[0]), memoryview)
+    assert store.load_timeline(mid) == store.load_timeline("COPY") == ds.timelines[mid]
+    assert store.load_match(mid) == ds.matches[mid]
+
+    # Survives closing every map and connection
+    close_pools()
+    assert Store(db_path=store.db_path).load_timeline(mid) == ds.timelines[mid]
+    assert os.listdir(store.db_path + ".segments") == ["seg-000001.dat"]
+
+
+def test_inline_rows_are_moved_to_segments(tmp_path):
+    import sqlite3
+
+    ds = Dataset.synthetic(5)
+    path = str(tmp_path / "old.db")
+    store = Store(db_path=path)
+    con = sqlite3.connect(path)
+    for mid, tl in ds.timelines.items():  # written before schema 11: packed but inline
+        con.execute(
+            "INSERT INTO timelines(match_id, raw_json) VALUES(?,?)",
+            (mid, codec.pack(json.dumps(tl))),
+        )
+    con.commit()
+    con.close()
+    report = store.segment_raw(batch=2)
+    assert report["done"] and report["rows"] == 5
+    assert store.segment_raw()["rows"] == 0  # resumes from its cursor
+    for mid, tl in ds.timelines.items():
+        assert store.load_timeline(mid) == tl
+
+
+def test_segments_are_synced_once_per_commit(tmp_path, monkeypatch):
+    from core import segments
+
+    ds = Dataset.synthetic(4)
+    store = Store(db_path=str(tmp_path / "f.db"))
+    synced = []
+    monkeypatch.setattr(segments.os, "fsync", lambda fd: synced.append(fd))
+    with store.transaction():
+        for mid, tl in ds.timelines.items():
+            store.upsert_timeline_raw(mid, json.dumps(tl))
+        assert synced == []  # appends are only flushed until the batch commits
+    assert len(synced) == 1
+    store.upsert_timeline_raw("SOLO", json.dumps(ds.timelines[mid] | {"solo": 1}))
+    assert len(synced) == 2
+    for mid, tl in ds.timelines.items():
+        assert store.load_timeline(mid) == tl
+
+
+def test_compaction_reclaims_archived_payloads(tmp_path, monkeypatch):
+    from core import segments
+
+    ds = Dataset.synthetic(4)
+    store = Store(db_path=str(tmp_path / "c.db"))
+    ids = list(ds.timelines)
+    for i, mid in enumerate(ids):
+        if i == 2:
+            monkeypatch.setattr(
+                segments, "SEGMENT_MAX_BYTES", 1
+            )  # from here on, one payload per segment
+        store.upsert_timeline_raw(mid, json.dumps(ds.timelines[mid]))
+    store.upsert_timeline_raw("COPY", json.dumps(ds.timelines[ids[1]]))
+    seg_dir = store.db_path + ".segments"
+    assert len(os.listdir(seg_dir)) == 3
+    with store.transaction(), store._writer() as con:  # as archive_timelines does
+        con.execute("DELETE FROM timelines WHERE match_id=?", (ids[0],))
+    stats = store.segment_stats()
+    assert stats["dead_bytes"] > 0 and stats["live_bytes"] + stats["dead_bytes"] == stats["bytes"]
+
+    monkeypatch.setattr(segments, "SEGMENT_MAX_BYTES", 256 * 1024 * 1024)
+    scans = []
+    refs = store._segment_refs
+    monkeypatch.setattr(store, "_segment_refs", lambda con: scans.append(1) or refs(con))
+    report = store.compact_segments(min_dead_ratio=0.3)
+    assert len(scans) == 1  # one reference scan per run, not per segment
+    assert (
+        report["segments"] == 1 and report["moved_bytes"] > 0
+    )  # ids[1] and its COPY move to the active segment
+    assert store.load_timeline("COPY") == store.load_timeline(ids[1]) == ds.timelines[ids[1]]
+    assert store.compact_segments()["freed_bytes"] > 0  # the retired file goes on the next pass
+    assert sorted(os.listdir(seg_dir)) == ["seg-000002.dat", "seg-000003.dat"]
+    assert store.segment_stats()["dead_bytes"] == 0
+    close_pools()
+    store = Store(db_path=store.db_path)
+    for mid in ids[1:]:
+        assert store.load_timeline(mid) == ds.timelines[mid]
@@ -0,0 +1,243 @@
+import pytest
+
+from core.store import SCHEMA_VERSION, Store, pool_stats
+
+
+def _count(store: Store) -> int:
+    with store.connect() as con:
+        return con.execute("SELECT COUNT(*) FROM meta WHERE key LIKE 't:%'").fetchone()[0]
+
+
+def test_transaction_groups_writes_across_store_instances(tmp_path):
+    path = str(tmp_path / "t.db")
+    a = Store(db_path=path)
+    b = Store(db_path=path)
+    with a.transaction():
+        a.set_meta("t:1", "x")
+        # Another Store on the same DB joins the open unit of work (and sees its writes)
+        b.set_meta("t:2", "y")
+        with b.transaction():
+            b.set_meta("t:3", "z")
+        assert b.get_meta("t:1") == "x"
+    assert _count(Store(db_path=path)) == 3
+
+
+def test_transaction_rolls_back_on_error(tmp_path):
+    store = Store(db_path=str(tmp_path / "t.db"))
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.set_meta("t:1", "x")
+            store.upsert_timeline_raw("M1", "{}")
+            raise RuntimeError("boom")
+    assert _count(store) == 0
+    assert store.load_timeline("M1") is None
+    # Outside a transaction every write still commits on its own
+    store.set_meta("t:2", "y")
+    assert _count(Store(db_path=store.db_path)) == 1
+
+
+def test_pre_roster_tables_are_rekeyed_per_player(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.db")
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    con.execute("INSERT INTO meta VALUES('schema_version','4')")
+    con.execute(
+        "CREATE TABLE matches (match_id TEXT PRIMARY KEY, puuid TEXT, queue_id INTEGER,"
+        " game_creation_ms INTEGER,"
+        " game_duration_s INTEGER, patch TEXT, role TEXT, champion_id INTEGER, raw_json TEXT)"
+    )
+    con.execute(
+        "CREATE TABLE metrics (match_id TEXT PRIMARY KEY, puuid TEXT, queue_id INTEGER,"
+        " patch TEXT, role TEXT,"
+        " champion_id INTEGER, gd10 INTEGER, xpd10 INTEGER, game_creation_ms INTEGER)"
+    )
+    con.execute(
+        "INSERT INTO matches(match_id, puuid, queue_id, raw_json) VALUES('M1','A',420,'{}')"
+    )
+    con.execute("INSERT INTO metrics(match_id, puuid, gd10) VALUES('M1','A',150)")
+    con.commit()
+    con.close()
+
+    store = Store(db_path=path)
+    assert store.get_meta("schema_version") == str(SCHEMA_VERSION)
+    assert store.seen_match_ids("A") == {"M1"}
+    store.upsert_metrics("M1", {"match_id": "M1", "puuid": "B", "gd10": -80})
+    rows = {r["puuid"]: r["gd10"] for r in store.recent_metrics("A") + store.recent_metrics("B")}
+    assert rows == {"A": 150, "B": -80}
+    with store.connect() as con:
+        assert con.execute("SELECT COUNT(*) FROM v_lane_diffs_10").fetchone()[0] == 2
+
+
+def test_known_match_ids_probes_only_candidates(tmp_path):
+    store = Store(db_path=str(tmp_path / "t.db"))
+    for i in range(1200):
+        store.upsert_match_raw(f"M{i}", "A" if i % 2 else "B", 420, i, 1800, "14.1", None, 1, "{}")
+    cands = [f"M{i}" for i in range(0, 1200, 100)] + ["missing"]
+    assert store.known_match_ids(cands) == set(cands) - {"missing"}
+    assert store.known_match_ids(cands, "A") == set()  # every candidate is even -> player B
+    assert store.known_match_ids(["M1", "M2", "M3"], "A") == {"M1", "M3"}
+    assert store.known_match_ids([]) == set()
+    with store.connect() as con:
+        plan = " ".join(
+            r[-1]
+            for r in con.execute(
+                "EXPLAIN QUERY PLAN SELECT match_id FROM matches"
+                " WHERE match_id IN (?,?) AND puuid=?",
+                ("M1", "M2", "A"),
+            ).fetchall()
+        )
+    assert "USING" in plan and "SCAN matches" not in plan
+
+
+def test_migrations_run_once_per_process_and_add_hot_path_indexes(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "v5.db")
+    Store(db_path=path)
+    with sqlite3.connect(path) as con:
+        names = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        assert {
+            "idx_matches_puuid_queue_time",
+            "idx_metrics_puuid_queue_time",
+            "idx_frames_match",
+            "idx_events_match",
+        } <= names
+        plan = " ".join(
+            r[-1]
+            for r in con.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM metrics"
+                " WHERE puuid=? AND queue_id=? ORDER BY game_creation_ms DESC",
+                ("A", 420),
+            ).fetchall()
+        )
+        assert "idx_metrics_puuid_queue_time" in plan and "TEMP B-TREE" not in plan
+
+    # Later constructions on the same database issue no statements at all
+    traced = []
+    orig = sqlite3.connect
+
+    def spy(*a, **kw):
+        con = orig(*a, **kw)
+        con.set_trace_callback(traced.append)
+        return con
+
+    sqlite3.connect = spy
+    try:
+        Store(db_path=path)
+    finally:
+        sqlite3.connect = orig
+    assert traced == []
+
+
+def test_pooled_connections_are_opened_once_and_readers_are_read_only(tmp_path):
+    import sqlite3
+    import threading
+
+    store = Store(db_path=str(tmp_path / "p.db"))
+    store.set_meta("t:0", "w")
+    for _ in range(20):
+        store.get_meta("t:0")
+        store.set_meta("t:0", "w")
+    assert pool_stats()[store.db_path] == {"opened": 2, "readers": 1, "writer": True}
+    with store.connect() as con:
+        with pytest.raises(sqlite3.OperationalError):
+            con.execute("DELETE FROM meta")
+
+    # Each thread gets its own reader; writes from any thread land on the single writer
+    def work(i):
+        Store(db_path=store.db_path).set_meta(f"t:{i}", "x")
+        assert store.get_meta(f"t:{i}") == "x"
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(1, 5)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    assert _count(store) == 5
+    assert pool_stats()[store.db_path]["opened"] == 6
+
+
+def test_memory_stores_are_private_and_persistent():
+    a, b = Store(db_path=":memory:"), Store(db_path=":memory:")
+    a.set_meta("t:1", "x")
+    assert a.get_meta("t:1") == "x"
+    assert b.get_meta("t:1") is None
+
+
+def test_schema_10_backfills_match_summary_and_badges(tmp_path):
+    import json
+    import sqlite3
+
+    fresh = str(tmp_path / "v9.db")
+    Store(db_path=fresh)
+    path = str(tmp_path / "old.db")
+    con = sqlite3.connect(path)
+    sqlite3.connect(fresh).backup(con)
+    con.execute("UPDATE meta SET value='9' WHERE key='schema_version'")
+    con.execute("DROP TABLE match_summary")
+    parts = [
+        {
+            "puuid": "A",
+            "teamId": 100,
+            "kills": 3,
+            "assists": 1,
+            "win": True,
+            "totalMinionsKilled": 150,
+        },
+        {"puuid": "B", "teamId": 100, "kills": 5},
+    ]
+    con.execute(
+        "INSERT INTO matches(match_id, puuid, raw_json) VALUES('M1','A',?)",
+        (json.dumps({"info": {"participants": parts}}),),
+    )
+    con.execute(
+        "INSERT INTO inst_contrib VALUES('M1','A','vision',40.0,?)", (json.dumps({"vs": -1.1}),)
+    )
+    con.commit()
+    con.close()
+
+    store = Store(db_path=path)
+    with store.connect() as con:
+        row = con.execute(
+            "SELECT kills, cs, kp, win, domain_badges FROM match_summary WHERE match_id='M1'"
+        ).fetchone()
+    assert tuple(row) == (3, 150, 50.0, 1, '["Vision Low"]')
+
+
+def test_decoded_payloads_are_cached_until_upserted(tmp_path):
+    from core.decoded import DecodedCache, decoded_cache
+
+    store = Store(db_path=str(tmp_path / "t.db"))
+    cache = decoded_cache()
+    store.upsert_timeline_raw("M1", '{"info": {"frameInterval": 1}}')
+    hits = cache.hits
+    first = store.load_timeline("M1")
+    assert store.load_timeline("M1") is first and cache.hits == hits + 1
+    # Upserts invalidate, also when the write commits later through transaction()
+    store.upsert_timeline_raw("M1", '{"info": {"frameInterval": 2}}')
+    assert store.load_timeline("M1") == {"info": {"frameInterval": 2}}
+    with store.transaction():
+        store.upsert_timeline_raw("M1", '{"info": {"frameInterval": 3}}')
+        assert store.load_timeline("M1") == {"info": {"frameInterval": 3}}
+    assert store.load_timeline("M1") == {"info": {"frameInterval": 3}}
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.upsert_timeline_raw("M1", '{"info": {"frameInterval": 4}}')
+            assert store.load_timeline("M1") == {"info": {"frameInterval": 4}}
+            raise RuntimeError("boom")
+    assert store.load_timeline("M1") == {"info": {"frameInterval": 3}}
+    assert store.load_match("M1") is None
+
+    # A reader that fetched before an invalidation cannot re-insert the old payload;
+    # size bound is LRU
+    small = DecodedCache(max_bytes=100)
+    epoch = small.epoch()
+    small.invalidate(("db", "match", "a"))
+    small.put(("db", "match", "a"), {"old": True}, 4, epoch)
+    assert small.get(("db", "match", "a"), None) is None
+    for k in "abcd":
+        small.put(("db", "match", k), {k: 1}, 6, small.epoch())
+    small.get(("db", "match", "b"))
+    small.put(("db", "match", "e"), {"e": 1}, 6, small.epoch())
+    assert [k for k in "abcde" if small.get(("db", "match", k), None)] == ["b", "d", "e"]
+    assert small.stats()["evictions"] == 2 and small.stats()["bytes_est"] == 90
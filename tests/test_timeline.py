@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from riot_standin import Dataset  # noqa: E402
+
+from core.metrics import compute_metrics  # noqa: E402
+from core.metrics_extras import compute_extras  # noqa: E402
+from core.timeline import ParsedTimeline  # noqa: E402
+
+
+def _game():
+    ds = Dataset.synthetic(1)
+    mid = next(iter(ds.matches))
+    return ds.matches[mid], ds.timelines[mid]
+
+
+def test_index_matches_a_walk_over_the_frames():
+    match, tl = _game()
+    pt = ParsedTimeline.build(match, tl)
+    walked = [ev for fr in tl["info"]["frames"] for ev in fr["events"]]
+    assert pt.events == walked
+    for pid in range(1, 11):
+        assert pt.of("ITEM_PURCHASED", pid) == [
+            e for e in walked if e["type"] == "ITEM_PURCHASED" and e["participantId"] == pid
+        ]
+        assert pt.of("WARD_PLACED", pid) == [
+            e for e in walked if e["type"] == "WARD_PLACED" and e["creatorId"] == pid
+        ]
+        assert pt.deaths_of(pid) == [
+            e for e in walked if e["type"] == "CHAMPION_KILL" and e["victimId"] == pid
+        ]
+        assert pt.team_of(pid) == (100 if pid <= 5 else 200)
+    assert pt.of_type("CHAMPION_KILL") == [e for e in walked if e["type"] == "CHAMPION_KILL"]
+    assert pt.team_of(0) is None and pt.of("ITEM_PURCHASED", 99) == []
+    pf = tl["info"]["frames"][3]["participantFrames"]["4"]["position"]
+    assert pt.position_at(tl["info"]["frames"][3]["timestamp"], 4) == (pf["x"], pf["y"])
+    # Batched proximity: on top of pid 4, 2 units away, 30 units away, and no position at all
+    ts = tl["info"]["frames"][3]["timestamp"]
+    evs = [
+        {"timestamp": ts, "position": {"x": pf["x"] + dx, "y": pf["y"]}} for dx in (0, 2, 30)
+    ] + [{"timestamp": ts}]
+    assert pt.near(4, evs, 25).tolist() == [True, True, False, False]
+    assert pt.near(4, [], 25).size == 0
+
+
+def test_lane_opponent_by_role_then_by_proximity():
+    match, tl = _game()
+    pt = ParsedTimeline.build(match, tl)
+    assert [pt.lane_opponent(pid) for pid in (1, 3, 7)] == [6, 8, 2]
+    # Without roles the nearest enemy over 02:00–10:00 wins: park pid 9 on top of pid 2
+    for p in match["info"]["participants"]:
+        p["teamPosition"] = ""
+    for fr in tl["info"]["frames"]:
+        fr["participantFrames"]["9"]["position"] = dict(fr["participantFrames"]["2"]["position"])
+    pt = ParsedTimeline.build(match, tl)
+    assert pt.lane_opponent(2) == 9 and pt.lane_opponent(9) == 2
+
+
+def test_metrics_share_one_parsed_timeline():
+    match, tl = _game()
+    pt = ParsedTimeline.build(match, tl)
+    for p in match["info"]["participants"][:3]:
+        pu = p["puuid"]
+        assert compute_metrics(match, tl, pu, parsed=pt) == compute_metrics(match, tl, pu)
+        assert compute_extras(match, tl, None, pu, parsed=pt) == compute_extras(match, tl, None, pu)
@@ -1,4 +1,6 @@
-import json, os, tempfile
+import json
+import os
+import tempfile
 
 from backend.server.routers import gis as r
 
@@ -54,3 +56,21 @@ def test_weights_put_partial_rejected(monkeypatch):
     res = r.put_weights({"roles": roles})
     assert res["ok"] is False
     assert res["error"]["message"].startswith("missing role")
+
+
+def test_custom_weights_file_is_applied(monkeypatch):
+    from core import gis
+
+    fd, path = tempfile.mkstemp(prefix="lt_weights_", suffix=".json")
+    os.close(fd)
+    monkeypatch.setenv("LOLTRACK_WEIGHTS_PATH", path)
+    roles = {"MID": {"Laning": 0.5, "Economy": 0.5}}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"roles": roles}, f)
+    w = gis.load_role_weights()
+    assert w != gis._DEFAULT_ROLE_WEIGHTS
+    assert w["MIDDLE"] == {"laning": 0.5, "economy": 0.5}
+    # A broken file falls back to the defaults
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    assert gis.load_role_weights() == gis._DEFAULT_ROLE_WEIGHTS